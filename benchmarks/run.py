@@ -0,0 +1,272 @@
+"""
+Throughput benchmarks of the simulation hot paths.
+Every benchmark runs with a fixed seed and reports operations per second (best of `repeat` runs).
+Results are written as JSON and compared with a stored baseline, a benchmark slower than
+the baseline by more than the tolerance is a regression and makes the runner exit with 1.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --only dojo --repeat 1
+    python -m benchmarks.run --save-baseline
+"""
+import argparse
+import importlib
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass, asdict
+from typing import Callable, Optional, Union
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from models import rng  # noqa: E402
+from models.agent import Agent  # noqa: E402
+from models.card import Card, Rank, Suit  # noqa: E402
+from models.dealer import Dealer  # noqa: E402
+from models.deck import Deck  # noqa: E402
+from models.dojo import Dojo, LearnMode  # noqa: E402
+from models.hand import Hand  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SEED = 2024
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    ops: int
+    seconds: float
+    ops_per_sec: float
+    unit: str
+
+
+@dataclass
+class Benchmark:
+    name: str
+    # runs the workload once, returns the number of operations done
+    run: Callable[[], Union[int, "Timed"]]
+    unit: str
+
+
+@dataclass
+class Timed:
+    """
+    Returned by a workload that times only part of its run.
+    """
+    ops: int
+    seconds: float
+
+
+class Skipped(Exception):
+    """
+    A benchmark that cannot run here, e.g. a missing optional dependency.
+    """
+
+
+# ============================== Workloads ==============================
+
+def deck_construction() -> int:
+    for _ in range(200):
+        Deck(8)
+    return 200
+
+
+def deck_dealing() -> int:
+    dealt = 0
+    for _ in range(20):
+        deck = Deck(8)
+        for _ in range(len(deck)):
+            deck.deal_card()
+        dealt += 8 * 52 - 1
+    return dealt
+
+
+def hand_points() -> int:
+    cards = [Card(Suit.Spades, rank) for rank in (Rank.ACE, Rank.TWO, Rank.THREE, Rank.ACE,
+                                                 Rank.FOUR, Rank.TWO, Rank.ACE, Rank.THREE)]
+    reads = 0
+    for _ in range(5000):
+        hand = Hand(cards[:2])
+        for card in cards[2:]:
+            hand.add_card(card)
+            hand.points
+            hand.is_soft
+            reads += 1
+    return reads
+
+
+def dealer_hits() -> int:
+    dealer = Dealer()
+    deck = Deck(8)
+    for _ in range(20000):
+        if len(deck) < 30:
+            deck = Deck(8)
+        dealer.reset()
+        dealer.init_hand([deck.deal_card(), deck.deal_card()])
+        dealer.hits(deck)
+    return 20000
+
+
+def new_dojo() -> Dojo:
+    agent = Agent("benchmark", bank=10000)
+    return Dojo(agent, report_every=0, progress_sink=lambda stats: None)
+
+
+def dojo_test() -> Timed:
+    dojo = new_dojo()
+    dojo.train(5000, LearnMode.MCE, 0.1)
+    start = time.perf_counter()
+    dojo.test(10000)
+    # only the test run is timed
+    return Timed(10000, time.perf_counter() - start)
+
+
+def dojo_train_mces() -> int:
+    dojo = new_dojo()
+    dojo.train(start_mode=LearnMode.MCES)
+    return dojo.progress.episodes
+
+
+def dojo_train_mce() -> int:
+    dojo = new_dojo()
+    dojo.train(20000, LearnMode.MCE, 0.1)
+    return 20000
+
+
+def load_simulation(module_name: str):
+    try:
+        return importlib.import_module(module_name)
+    except ImportError as e:
+        raise Skipped(f"{module_name} cannot be imported: {e}")
+
+
+def full_simulation_mc_control() -> int:
+    full_simulation = load_simulation("full_simulation")
+    full_simulation.rng = rng.RandomStream(SEED)
+    full_simulation.env = full_simulation.BlackjackEnv()
+    full_simulation.mc_control(20000, epsilon=0.1)
+    return 20000
+
+
+def full_simulation_mc_control_vectorized() -> int:
+    full_simulation = load_simulation("full_simulation")
+    full_simulation.mc_control_vectorized(200000, epsilon=0.1, seed=SEED)
+    return 200000
+
+
+def easy_simulate_mc_control() -> int:
+    easy_simulate = load_simulation("easy_simulate")
+    easy_simulate.rng = rng.RandomStream(SEED)
+    easy_simulate.env = easy_simulate.BlackjackEnv()
+    easy_simulate.mc_control(50000)
+    return 50000
+
+
+BENCHMARKS = [
+    Benchmark("deck_construction", deck_construction, "decks"),
+    Benchmark("deck_dealing", deck_dealing, "cards"),
+    Benchmark("hand_points", hand_points, "reads"),
+    Benchmark("dealer_hits", dealer_hits, "hands"),
+    Benchmark("dojo_test", dojo_test, "episodes"),
+    Benchmark("dojo_train_mces", dojo_train_mces, "episodes"),
+    Benchmark("dojo_train_mce", dojo_train_mce, "episodes"),
+    Benchmark("full_simulation_mc_control", full_simulation_mc_control, "episodes"),
+    Benchmark("full_simulation_mc_control_vectorized", full_simulation_mc_control_vectorized, "episodes"),
+    Benchmark("easy_simulate_mc_control", easy_simulate_mc_control, "episodes"),
+]
+
+
+# ============================== Runner ==============================
+
+def run_benchmark(benchmark: Benchmark, repeat: int) -> BenchmarkResult:
+    best: Optional[BenchmarkResult] = None
+    for _ in range(repeat):
+        rng.seed(SEED)
+        # progress bars and prints of the simulators are not part of the report
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            start = time.perf_counter()
+            ops = benchmark.run()
+            seconds = time.perf_counter() - start
+        if isinstance(ops, Timed):
+            ops, seconds = ops.ops, ops.seconds
+        result = BenchmarkResult(benchmark.name, ops, seconds, ops / seconds, benchmark.unit)
+        if best is None or result.ops_per_sec > best.ops_per_sec:
+            best = result
+    return best
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """
+    :return: names of the benchmarks slower than the baseline by more than `tolerance`.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:40s} {result['ops_per_sec']:14.0f} {result['unit']}/s  (no baseline)")
+            continue
+        ratio = result["ops_per_sec"] / baseline[name]["ops_per_sec"]
+        regressed = ratio < 1 - tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"{name:40s} {result['ops_per_sec']:14.0f} {result['unit']}/s  "
+              f"{ratio:6.2f}x baseline{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def machine_info() -> dict:
+    import numpy
+    return {"python": platform.python_version(), "numpy": numpy.__version__,
+            "platform": platform.platform(), "processor": platform.processor()}
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="benchmark_results.json", help="results file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown, 0.2 is 20%%")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, the best one is kept")
+    parser.add_argument("--only", nargs="*", default=None, help="run benchmarks whose name contains one of these")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    results: dict[str, dict] = {}
+    skipped: dict[str, str] = {}
+    for benchmark in BENCHMARKS:
+        if args.only and not any(part in benchmark.name for part in args.only):
+            continue
+        try:
+            results[benchmark.name] = asdict(run_benchmark(benchmark, args.repeat))
+        except Skipped as e:
+            skipped[benchmark.name] = str(e)
+            print(f"{benchmark.name:40s} skipped: {e}")
+
+    report = {"seed": SEED, "machine": machine_info(), "results": results, "skipped": skipped}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,17 @@
-import random
 from collections import defaultdict
-import matplotlib.pyplot as plt
 import numpy as np
+from models.rng import RandomStream
 
 # -----------------------------
 # Blackjack 环境实现
 # -----------------------------
 
+# 发牌和探索共用的随机数流，可用 seed 复现
+rng = RandomStream()
+
+
 def draw_card():
-    card = random.randint(1, 13)
+    card = rng.rank() + 1
     return min(card, 10)  # J, Q, K 视为 10
 
 def draw_hand():
@@ -67,8 +70,8 @@ def generate_episode(env, policy, epsilon=0.1):
     episode = []
     state = env.reset()
     while True:
-        if random.random() < epsilon or state not in policy:
-            action = random.choice([0, 1])
+        if rng.random() < epsilon or state not in policy:
+            action = rng.choice([0, 1])
         else:
             action = policy[state]
         next_state, reward, done, _ = env.step(action)
@@ -105,6 +108,9 @@ def mc_control(num_episodes=500000):
 # -----------------------------
 
 def plot_policy(policy):
+    # matplotlib 只在需要画图时导入
+    import matplotlib.pyplot as plt
+
     player_sum = np.arange(12, 22)
     dealer_show = np.arange(1, 11)
     usable = np.zeros((10, 10))
@@ -1,10 +1,12 @@
-import random
 from collections import defaultdict
-from utils import plot_policy_sns
+import numpy as np
 from tqdm import tqdm
 from enum import Enum
 
 from dataclasses import dataclass
+from models.dealer_cache import DealerOutcomeCache, expected_hand_reward
+from models.solver import DEALER_TOTALS, BLACKJACK
+from models.rng import RandomStream
 # -----------------------------
 # Blackjack 环境（支持 Split + Double）
 # -----------------------------
@@ -28,30 +30,47 @@ class Action(Enum):
 
 
 
+# 发牌和探索共用的随机数流，可用 seed 复现
+rng = RandomStream()
+
+
 def draw_card():
-    card = random.randint(1, 13)
+    card = rng.rank() + 1
     return min(card, 10)
 
+# 手牌记录为扁平元组 (hard, has_ace, n_cards, is_pair, first)：
+# hard 为 A 记 1 的点数和，每次要牌时更新，判断点数、爆牌时不再遍历手牌
+HARD, HAS_ACE, N_CARDS, IS_PAIR, FIRST = range(5)
+
+
+def make_hand(card1, card2):
+    return (card1 + card2, card1 == 1 or card2 == 1, 2, card1 == card2, card1)
+
+def add_card(hand, card):
+    hard, has_ace, n_cards, _, first = hand
+    return (hard + card, has_ace or card == 1, n_cards + 1, False, first)
+
 def draw_hand():
-    return [draw_card(), draw_card()]
+    return make_hand(draw_card(), draw_card())
 
 def usable_ace(hand):
-    return 1 in hand and sum(hand) + 10 <= 21
+    return hand[HAS_ACE] and hand[HARD] + 10 <= 21
 
 def sum_hand(hand):
-    s = sum(hand)
-    if usable_ace(hand):
-        return s + 10
-    return s
+    hard = hand[HARD]
+    if hand[HAS_ACE] and hard + 10 <= 21:
+        return hard + 10
+    return hard
 
 def is_bust(hand):
-    return sum_hand(hand) > 21
+    # A 只有在不爆牌时才记 11，所以看 hard 即可
+    return hand[HARD] > 21
 
 def score(hand):
-    return 0 if is_bust(hand) else sum_hand(hand)
+    return 0 if hand[HARD] > 21 else sum_hand(hand)
 
 def is_pair(hand):
-    return len(hand) == 2 and hand[0] == hand[1]
+    return hand[IS_PAIR]
 
 
 def can_double(hand):
@@ -63,30 +82,45 @@ def can_double(hand):
     - 有些赌场允许任意两张牌加倍，有些仅限特定点数范围（如 9, 10, 11）
 
     参数:
-        hand: list[int]，玩家当前的手牌点数，如 [8, 3] 表示初始牌
+        hand: 手牌记录，如 make_hand(8, 3) 表示初始牌
 
     返回:
         bool: 是否可以加倍
     """
-    if len(hand) != 2:
+    if hand[N_CARDS] != 2:
         return False
 
-    total = sum(hand)
     # 如果有A算作11再判断
-    if 1 in hand and total + 10 <= 21:
-        total += 10
+    total = sum_hand(hand)
 
     # 允许加倍的总点数范围，可以根据规则定制
     return total in range(2, 21)
 
 
 def is_blackjack(hand, hand_idx: int):
-    return hand_idx == 0 and 1 in hand and 10 in hand
+    return hand_idx == 0 and hand[N_CARDS] == 2 and hand[HAS_ACE] and hand[HARD] == 11
+
+
+# 庄家最终点数分布缓存（无限副牌，只取决于明牌）
+dealer_cache = DealerOutcomeCache()
+
+
+def dealer_outcomes(dealer_card):
+    """
+    明牌为 dealer_card 时庄家最终结果的分布。
+    本环境不区分庄家 Blackjack，按 21 点计算。
+    """
+    dist = dealer_cache.get(11 if dealer_card == 1 else dealer_card).copy()
+    dist[DEALER_TOTALS.index(21)] += dist[BLACKJACK]
+    dist[BLACKJACK] = 0.0
+    return dist
 
 class BlackjackEnv:
     def reset(self):
-        self.dealer = draw_hand()
-        self.hands = [[draw_card(), draw_card()]]
+        hole_card, up_card = draw_card(), draw_card()
+        self.dealer = make_hand(hole_card, up_card)
+        self.dealer_up = up_card  # 第二张牌是明牌
+        self.hands = [draw_hand()]
         self.finished = [False]
         self.doubled = [False]
         self.current = 0
@@ -96,10 +130,10 @@ class BlackjackEnv:
         hand = self.hands[self.current]
         return (
             sum_hand(hand),
-            self.dealer[0],
+            self.dealer[FIRST],
             usable_ace(hand),
-            is_pair(hand) and len(self.hands) < 4,
-            len(hand) == 2
+            hand[IS_PAIR] and len(self.hands) < 4,
+            hand[N_CARDS] == 2
         )
 
     def step(self, action):
@@ -127,20 +161,21 @@ class BlackjackEnv:
             self.finished[self.current] = True
 
         elif action == Action.Hit:  # Hit（要牌）
-            hand.append(draw_card())
-            if is_bust(hand):
+            hand = add_card(hand, draw_card())
+            self.hands[self.current] = hand
+            if hand[HARD] > 21:
                 self.finished[self.current] = True  # 若爆牌，结束当前手
 
         elif action == Action.Double:  # Double（双倍下注后只摸一张牌）
-            if len(hand) == 2:
-                hand.append(draw_card())
+            if hand[N_CARDS] == 2:
+                self.hands[self.current] = add_card(hand, draw_card())
                 self.finished[self.current] = True  # 不论爆不爆牌都结束
                 self.doubled[self.current] = True
 
         elif action == Action.Split:  # Split（拆牌）
-            if is_pair(hand) and len(self.hands) < 4:
-                new_hand1 = [hand[0], draw_card()]
-                new_hand2 = [hand[1], draw_card()]
+            if hand[IS_PAIR] and len(self.hands) < 4:
+                new_hand1 = make_hand(hand[FIRST], draw_card())
+                new_hand2 = make_hand(hand[FIRST], draw_card())
                 self.hands[self.current] = new_hand1
                 self.hands.insert(self.current + 1, new_hand2)
                 self.finished.insert(self.current + 1, False)
@@ -170,21 +205,30 @@ class BlackjackEnv:
 
         return self._get_obs(), reward, done, {}
 
-    def finish(self):
+    def finish(self, expected=False):
         """
         执行庄家流程，结算所有手牌的最终 reward。
         仅在所有手牌都完成后调用。
+
+        参数:
+            expected (bool): 不再模拟庄家补牌，按庄家结果分布计算每手牌的期望 reward
         """
+        if expected:
+            dist = dealer_outcomes(self.dealer_up)
+            self.hand_results = [
+                expected_hand_reward(dist, sum_hand(hand), False, self.doubled[idx])
+                for idx, hand in enumerate(self.hands)]
+            return self.hand_results
 
         while sum_hand(self.dealer) < 17:
-            self.dealer.append(draw_card())
+            self.dealer = add_card(self.dealer, draw_card())
         dealer_score = score(self.dealer)
 
         self.hand_results = []
         for idx, hand in enumerate(self.hands):
             player_score = score(hand)
 
-            if is_bust(hand):
+            if hand[HARD] > 21:
                 result = -1.0
             else:
                 result = float(player_score > dealer_score) - float(player_score < dealer_score)
@@ -196,7 +240,7 @@ class BlackjackEnv:
 
     # ====================== Utilty Functions =====================================
     def can_split(self):
-        return is_pair(self.hands[self.current]) and len(self.hands) < 4
+        return self.hands[self.current][IS_PAIR] and len(self.hands) < 4
 
     def get_possible_actions(self):
         res = [Action.Stand, Action.Hit]
@@ -211,23 +255,26 @@ class BlackjackEnv:
 # -----------------------------
 
 
-def generate_sub_episodes(env: BlackjackEnv, policy, epsilon=0.01, learning=True):
+def generate_sub_episodes(env: BlackjackEnv, policy, epsilon=0.01, learning=True, expected=False):
     env.reset()
     sub_episodes = []
 
-    for i in range(len(env.hands)):
+    # 拆牌会增加手牌，每轮都重新取 len(env.hands)
+    i = 0
+    while i < len(env.hands):
         env.current = i
         hand = env.hands[i]
         finished = env.finished[i]
         episode = []
 
         if is_blackjack(hand, i):
+            i += 1
             continue
 
         while not finished:
             state = BaseState(
                 sum_hand(hand),
-                env.dealer[1],  # deal 第二张牌是明牌
+                env.dealer_up,  # deal 第二张牌是明牌
                 usable_ace(hand),
                 env.can_split(),
                 can_double(hand)
@@ -235,8 +282,8 @@ def generate_sub_episodes(env: BlackjackEnv, policy, epsilon=0.01, learning=True
             # print(f"Current hand idx:{env.current}")
             # print(state)
 
-            if (learning and random.random() < epsilon) or (state not in policy):
-                action = random.choice(env.get_possible_actions())
+            if (learning and rng.random() < epsilon) or (state not in policy):
+                action = rng.choice(env.get_possible_actions())
                 # print(ACTIONS[action], "chosed randomly")
             else:
                 action = policy[state]
@@ -251,9 +298,10 @@ def generate_sub_episodes(env: BlackjackEnv, policy, epsilon=0.01, learning=True
             hand = env.hands[i]
 
         sub_episodes.append(episode)
+        i += 1
 
     # 所有手牌打完后，dealer处理，返回每手 reward
-    rewards = env.finish()
+    rewards = env.finish(expected)
     return sub_episodes, rewards
 
 
@@ -294,14 +342,245 @@ def mc_control(num_episodes=200000, epsilon=0.01):
     return policy, Q
 
 
-def test(env: BlackjackEnv, policy: dict, num_episodes=10000):
+# -----------------------------
+# 向量化 Monte Carlo：成批的 episode 同步推进
+# -----------------------------
+
+MAX_HANDS = 4
+N_SUMS = 22  # 决策时点数不超过 21
+N_DEALER = 11  # 明牌 1..10
+N_STATES = N_SUMS * N_DEALER * 8
+N_ACTIONS = 4  # Stand, Hit, Double, Split
+NO_ACTION = -1
+CARD_VALUES = np.array([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10], dtype=np.int16)
+
+
+def state_index(total, dealer_card, ace, splitable, double):
+    return (((total * N_DEALER + dealer_card) * 2 + ace) * 2 + splitable) * 2 + double
+
+
+def index_state(index: int) -> BaseState:
+    index, double = divmod(int(index), 2)
+    index, splitable = divmod(index, 2)
+    index, ace = divmod(index, 2)
+    total, dealer_card = divmod(index, N_DEALER)
+    return BaseState(total, dealer_card, bool(ace), bool(splitable), bool(double))
+
+
+def draw_cards(rng: np.random.Generator, size):
+    return CARD_VALUES[rng.integers(0, len(CARD_VALUES), size)]
+
+
+def play_batch(policy_table: np.ndarray, n: int, epsilon: float, rng: np.random.Generator, learning=True):
+    """
+    同时模拟 n 个 episode，规则与 BlackjackEnv.step / finish 相同。
+    每手牌只保存硬点数（A 记 1）、是否有 A、牌数和前两张牌，
+    拆牌产生的每一手都会被打完并单独作为一个 sub episode。
+
+    参数:
+        policy_table: 以 state_index 为下标的动作表，NO_ACTION 表示策略中没有该状态
+        learning: 为 True 时以 epsilon 概率随机探索
+
+    返回:
+        hand_ids (lane * MAX_HANDS + slot), states, actions: 每一次决策
+        rewards: (n, MAX_HANDS) 每手牌的 reward
+        played: (n, MAX_HANDS) 实际存在的手牌
+    """
+    hard = np.zeros((n, MAX_HANDS), dtype=np.int16)
+    ace = np.zeros((n, MAX_HANDS), dtype=bool)
+    n_cards = np.zeros((n, MAX_HANDS), dtype=np.int16)
+    first = np.zeros((n, MAX_HANDS), dtype=np.int16)
+    second = np.zeros((n, MAX_HANDS), dtype=np.int16)
+    finished = np.zeros((n, MAX_HANDS), dtype=bool)
+    doubled = np.zeros((n, MAX_HANDS), dtype=bool)
+    n_hands = np.ones(n, dtype=np.int16)
+    current = np.zeros(n, dtype=np.int16)
+    all_lanes = np.arange(n)
+
+    def new_hand(lanes, slots, card1, card2):
+        hard[lanes, slots] = card1 + card2
+        ace[lanes, slots] = (card1 == 1) | (card2 == 1)
+        n_cards[lanes, slots] = 2
+        first[lanes, slots] = card1
+        second[lanes, slots] = card2
+
+    def totals(lanes, slots):
+        usable = ace[lanes, slots] & (hard[lanes, slots] + 10 <= 21)
+        return hard[lanes, slots] + 10 * usable, usable
+
+    dealer = draw_cards(rng, (2, n))
+    cards = draw_cards(rng, (2, n))
+    new_hand(all_lanes, current, cards[0], cards[1])
+    # 第一手 Blackjack 不做决策
+    finished[:, 0] = ace[:, 0] & (hard[:, 0] == 11)
+    current[finished[:, 0]] = 1
+
+    decisions = []
+    while True:
+        lanes = np.flatnonzero(current < n_hands)
+        if len(lanes) == 0:
+            break
+        slots = current[lanes]
+        total, usable = totals(lanes, slots)
+        two_cards = n_cards[lanes, slots] == 2
+        splitable = two_cards & (first[lanes, slots] == second[lanes, slots]) & (n_hands[lanes] < MAX_HANDS)
+        double = two_cards & (total >= 2) & (total <= 20)
+        states = state_index(total, dealer[1, lanes], usable, splitable, double)
+
+        # 随机动作在 Stand, Hit, [Double], [Split] 中均匀选择
+        actions = policy_table[states]
+        explore = actions == NO_ACTION
+        if learning:
+            explore |= rng.random(len(lanes)) < epsilon
+        if explore.any():
+            pick = (rng.random(len(lanes)) * (2 + double + splitable)).astype(np.int8)
+            pick = np.where((pick == 2) & ~double, Action.Split.value, pick)
+            actions = np.where(explore, pick, actions)
+        decisions.append((lanes * MAX_HANDS + slots, states, actions))
+
+        stand = actions == Action.Stand.value
+        finished[lanes[stand], slots[stand]] = True
+
+        hit = actions == Action.Hit.value
+        hit_lanes, hit_slots = lanes[hit], slots[hit]
+        card = draw_cards(rng, len(hit_lanes))
+        hard[hit_lanes, hit_slots] += card
+        ace[hit_lanes, hit_slots] |= card == 1
+        n_cards[hit_lanes, hit_slots] += 1
+
+        # 同 step：只有两张牌时 Double 才生效
+        dbl = (actions == Action.Double.value) & two_cards
+        dbl_lanes, dbl_slots = lanes[dbl], slots[dbl]
+        card = draw_cards(rng, len(dbl_lanes))
+        hard[dbl_lanes, dbl_slots] += card
+        ace[dbl_lanes, dbl_slots] |= card == 1
+        n_cards[dbl_lanes, dbl_slots] += 1
+        finished[dbl_lanes, dbl_slots] = True
+        doubled[dbl_lanes, dbl_slots] = True
+
+        split = (actions == Action.Split.value) & splitable
+        if split.any():
+            split_lanes, split_slots = lanes[split], slots[split]
+            pair_card = first[split_lanes, split_slots]
+            new_slots = n_hands[split_lanes]
+            split_cards = draw_cards(rng, (2, len(split_lanes)))
+            new_hand(split_lanes, split_slots, pair_card, split_cards[0])
+            new_hand(split_lanes, new_slots, pair_card, split_cards[1])
+            n_hands[split_lanes] += 1
+
+        # 若爆牌，结束当前手
+        busted = hit | dbl
+        bust_lanes, bust_slots = lanes[busted], slots[busted]
+        finished[bust_lanes, bust_slots] |= hard[bust_lanes, bust_slots] > 21
+
+        # 切换到下一手未完成的牌
+        for _ in range(MAX_HANDS):
+            pending = current < n_hands
+            advance = pending & finished[all_lanes, np.minimum(current, MAX_HANDS - 1)]
+            if not advance.any():
+                break
+            current[advance] += 1
+
+    # 庄家补牌到 17 点以上（软 17 停牌）
+    dealer_hard = dealer[0] + dealer[1]
+    dealer_ace = (dealer[0] == 1) | (dealer[1] == 1)
+    while True:
+        dealer_total = dealer_hard + 10 * (dealer_ace & (dealer_hard + 10 <= 21))
+        hitting = np.flatnonzero(dealer_total < 17)
+        if len(hitting) == 0:
+            break
+        card = draw_cards(rng, len(hitting))
+        dealer_hard[hitting] += card
+        dealer_ace[hitting] |= card == 1
+    dealer_score = np.where(dealer_total > 21, 0, dealer_total)[:, None]
+
+    player_total = hard + 10 * (ace & (hard + 10 <= 21))
+    rewards = np.where(player_total > 21, -1.0, np.sign(player_total - dealer_score))
+    rewards = np.where(doubled, 2 * rewards, rewards)
+    played = np.arange(MAX_HANDS) < n_hands[:, None]
+    rewards = np.where(played, rewards, 0.0)
+
+    if decisions:
+        hand_ids, states, actions = (np.concatenate(column) for column in zip(*decisions))
+    else:
+        hand_ids = states = actions = np.zeros(0, dtype=np.int64)
+    return hand_ids, states, actions, rewards, played
+
+
+def first_visit_returns(hand_ids, states, actions, rewards):
+    """
+    play_batch 结果中每手牌 (state, action) 第一次出现时的回报之和与次数。
+
+    返回:
+        returns_sum, returns_count: (N_STATES, N_ACTIONS)
+    """
+    # 每手牌中 (state, action) 第一次出现的位置
+    pairs = states.astype(np.int64) * N_ACTIONS + actions
+    _, first_visit = np.unique(hand_ids.astype(np.int64) * N_STATES * N_ACTIONS + pairs,
+                               return_index=True)
+    pairs = pairs[first_visit]
+    returns_sum = np.bincount(pairs, weights=rewards.ravel()[hand_ids[first_visit]],
+                              minlength=N_STATES * N_ACTIONS).reshape(N_STATES, N_ACTIONS)
+    returns_count = np.bincount(pairs, minlength=N_STATES * N_ACTIONS).reshape(N_STATES, N_ACTIONS)
+    return returns_sum, returns_count
+
+
+def mc_control_vectorized(num_episodes=200000, epsilon=0.01, batch_size=4096, seed=None):
+    """
+    mc_control 的向量化版本：每批 batch_size 个 episode 同步模拟，
+    first-visit 回报用 bincount 累加，策略在每批结束后更新。
+
+    返回:
+        policy, Q: 与 mc_control 相同的字典
+    """
+    generator = RandomStream(seed).generator
+    returns_sum = np.zeros((N_STATES, N_ACTIONS))
+    returns_count = np.zeros((N_STATES, N_ACTIONS), dtype=np.int64)
+    policy_table = np.full(N_STATES, NO_ACTION, dtype=np.int8)
+
+    total_reward = 0.0
+    wins = 0
+    sub_episodes_count = 0
+    with tqdm(total=num_episodes) as bar:
+        for start in range(0, num_episodes, batch_size):
+            n = min(batch_size, num_episodes - start)
+            hand_ids, states, actions, rewards, played = play_batch(policy_table, n, epsilon, generator)
+
+            total_reward += float(rewards.sum())
+            wins += int((rewards > 0).sum())
+            sub_episodes_count += int(played.sum())
+
+            batch_sum, batch_count = first_visit_returns(hand_ids, states, actions, rewards)
+            returns_sum += batch_sum
+            returns_count += batch_count
+
+            touched = np.unique(states)
+            counts = returns_count[touched]
+            Q = np.where(counts > 0, returns_sum[touched] / np.maximum(counts, 1), -np.inf)
+            policy_table[touched] = np.argmax(Q, axis=1)
+            bar.update(n)
+
+    print(f"Finish {sub_episodes_count} sub episodes, avg rwd:{total_reward / sub_episodes_count}, "
+          f"win_rate:{wins / sub_episodes_count}")
+
+    policy: dict[BaseState, Action] = {}
+    Q: dict[BaseState, dict[Action, float]] = {}
+    for index in np.flatnonzero(policy_table != NO_ACTION):
+        state = index_state(index)
+        policy[state] = Action(int(policy_table[index]))
+        Q[state] = {Action(action): returns_sum[index, action] / returns_count[index, action]
+                    for action in np.flatnonzero(returns_count[index])}
+    return policy, Q
+
+
+def test(env: BlackjackEnv, policy: dict, num_episodes=10000, expected=False):
     avg_rewards = 0
     win_rate = 0
     sub_episodes_count = 0
 
     for i in range(num_episodes):
         _, rewards = generate_sub_episodes(
-            env, policy, learning=False)  # use optimal policy
+            env, policy, learning=False, expected=expected)  # use optimal policy
 
         avg_rewards += sum(rewards)
         win_rate += sum(1 for r in rewards if r > 0)
@@ -315,7 +594,7 @@ def test(env: BlackjackEnv, policy: dict, num_episodes=10000):
 
 if __name__ == "__main__":
     env:BlackjackEnv = BlackjackEnv()
-    policy, Q = mc_control(epsilon=0.1)
+    policy, Q = mc_control_vectorized(epsilon=0.1)
     print("Finish training.")
 
     test(env=BlackjackEnv(), policy=policy)
@@ -4,13 +4,13 @@ import numpy as np
 from .player import Player
 from .utils import Action, BaseState
 from .deck import Deck
-import pickle
+from .qtable import QTable, StateActionView, PolicyView, ActionSpaceView, ACTIONS, NO_ACTION, FILE_ARRAYS
+from .policy import CompiledPolicy
+from .rng import RandomStream, default_stream
 
 import logging
 import os
-from collections import defaultdict
 from dataclasses import dataclass
-from random import choice
 
 
 @dataclass
@@ -24,41 +24,54 @@ class Agent(Player):
     Smart player that can learn policies
     """
 
-    def __init__(self, name: str, bank: float = 1e100):
-        super().__init__(42, bank)
+    def __init__(self, name: str, bank: float = 1e100, reuse: bool = False,
+                 rng: RandomStream = None, counting: bool = False):
+        """
+        :param reuse: Reset hands and episode histories in place between episodes, see `Player`.
+        :param rng: Stream for exploration, the default stream when not given.
+        :param counting: Learn a policy per true count bucket, see `Dojo(count_states=True)`.
+        """
+        super().__init__(42, bank, reuse)
         self.name = name
+        self.rng: RandomStream = rng if rng is not None else default_stream()
 
-        self.policy: dict[BaseState, Action] = {}  # state -> action mapping
-        self.Q: dict[BaseState, dict[Action, float]
-                     ] = defaultdict(lambda: defaultdict(float))
-        # state-action -> count mapping, count how many times the agent has taken this action in this state
-        self.state_action_count: dict[BaseState,
-                                      dict[Action, int]] = defaultdict(lambda: defaultdict(int))
-        self.state_action_space: dict[BaseState,
-                                      list[Action]] = defaultdict(set)
+        # all learned values live in dense arrays, the attributes below are dict-like views on them
+        self.tables: QTable = QTable(counting)
+        self.__bind_views()
 
         # record the state-action pairs for each episode
         self.current_hand_history: EpisodeHistory = EpisodeHistory([], 0)
         self.all_histories: list[EpisodeHistory] = []
+        # spare histories for the reuse mode
+        self.__history_pool: list[EpisodeHistory] = []
+
+        # inference mode, see `freeze`
+        self.compiled_policy: CompiledPolicy = None
 
     def done_with_hand(self):
         super().done_with_hand()
         # deal with episode history
         self.all_histories.append(self.current_hand_history)
-        self.current_hand_history = EpisodeHistory([], 0)
+        self.current_hand_history = self.__new_history()
 
     def clear_episode_history(self):
         """
         Clear the episode history.
         This is called at the end of each episode.
         """
-        self.current_hand_history = EpisodeHistory([], 0)
-        self.all_histories = []
+        if self.reuse:
+            self.__history_pool.extend(self.all_histories)
+            self.all_histories.clear()
+            self.current_hand_history.state_action_history.clear()
+            self.current_hand_history.terminal_return = 0
+        else:
+            self.current_hand_history = EpisodeHistory([], 0)
+            self.all_histories = []
 
     def first_play(self, state: BaseState, init_action: Action, deck: Deck) -> bool:
         possible_actions = self.__get_possible_actions(state)
         if state not in self.state_action_space:
-            self.state_action_space[state] = set(possible_actions)
+            self.state_action_space[state] = possible_actions
         if init_action not in possible_actions:
             return False
 
@@ -70,17 +83,24 @@ class Agent(Player):
         """
         Play the game with the given state.
         Choose an action based on the policy or explore.
+        A frozen agent only looks the action up in its compiled policy.
         """
+        if self.compiled_policy is not None:
+            self.__play(state, self.compiled_policy.action(state, self.can_double()), deck)
+            return
+
         possible_actions = self.__get_possible_actions(state)
-        if state not in self.state_action_space:
-            self.state_action_space[state] = set(possible_actions)
+        index = state.id
+        if not self.tables.action_space[index].any():
+            self.state_action_space[state] = possible_actions
 
-        if state not in self.policy:
+        action = self.tables.policy[index]
+        if action == NO_ACTION:
             # If we don't have a policy, choose a random action
-            action = choice(possible_actions)
+            action = self.rng.choice(possible_actions)
         else:
             # Otherwise, follow the policy
-            action = self.policy[state]
+            action = ACTIONS[action]
 
         self.__play(state, action, deck)
 
@@ -94,64 +114,124 @@ class Agent(Player):
         for i, reward in enumerate(rewards):
             self.all_histories[i].terminal_return = reward
 
+    def freeze(self, fallback: dict[BaseState, Action] = None) -> CompiledPolicy:
+        """
+        Switch to inference mode: play from a policy compiled from the current tables
+        and leave the tables untouched until `unfreeze`.
+        :param fallback: Actions for states the agent has not learned, see `CompiledPolicy.compile`.
+        """
+        self.compiled_policy = CompiledPolicy.compile(self.tables, fallback)
+        return self.compiled_policy
+
+    def unfreeze(self):
+        self.compiled_policy = None
+
+    @property
+    def frozen(self) -> bool:
+        return self.compiled_policy is not None
+
     def learn_exploring_starts(self):
+        self.__check_not_frozen()
         # Use first-visit Monte Carlo method to update the policy
-
-        # iterate over the state-action pairs in the episode
-        # run the iteration in reverse order to compute the return
-        for history in self.all_histories:
-            state_action_histroy = history.state_action_history
-            episode_return = history.terminal_return
-            first_vist = set()
-            for state, action in state_action_histroy:
-                if (state, action) in first_vist:
-                    continue
-                first_vist.add((state, action))
-                # Update the state-action count
-                self.state_action_count[state][action] += 1
-                # Update the Q value using the return
-                self.Q[state][action] += (episode_return -
-                                          self.Q[state][action]) / self.state_action_count[state][action]
-
-                # Update the policy, equal to argmax_a Q(s, a)
-                if state not in self.policy or self.Q[state][action] > self.Q[state][self.policy[state]]:
-                    self.policy[state] = action
-                # if state not in self.policy:
-                #     self.policy[state] = action
-                # else:
-                # self.policy[state] = self.__get_max_q_acion(state)
+        for state, action, episode_return in self.__first_visits():
+            # Update the state-action count and the Q value using the return
+            self.tables.add_return(state, action, episode_return)
+            # Update the policy, equal to argmax_a Q(s, a)
+            self.tables.policy[state] = self.tables.greedy_action(state)
 
     def learn_epsilon_greedy(self, epsilon=0.01):
+        self.__check_not_frozen()
         # Use first-visit Monte Carlo method to update the policy
         # Because we have split hands, we may meet the same state-action pair multiple times in an episode
+        for state, action, episode_return in self.__first_visits():
+            # Update the state-action count and the Q value using the return
+            self.tables.add_return(state, action, episode_return)
 
-        # iterate over the state-action pairs in the episode
-        # run the iteration in reverse order to compute the return
-        for history in self.all_histories:
-            state_action_histroy = history.state_action_history
-            episode_return = history.terminal_return
-            first_visit = set()  # to keep track of the first visit state-action pairs
-            for state, action in state_action_histroy:
-                if (state, action) in first_visit:
-                    continue
-                first_visit.add((state, action))
-                # Update the state-action count
-                self.state_action_count[state][action] += 1
-                # Update the Q value using the return
-                self.Q[state][action] += (episode_return -
-                                          self.Q[state][action]) / self.state_action_count[state][action]
+            if self.rng.random() < (1-epsilon):
+                self.tables.policy[state] = self.tables.greedy_action(state)
+            else:
+                self.tables.policy[state] = self.rng.choice(
+                    np.flatnonzero(self.tables.action_space[state]))
 
-                greedy_action = self.__get_max_q_acion(state)
+    def get_tables(self) -> QTable:
+        """
+        Copy of the learned tables, can be pickled to worker processes.
+        """
+        return self.tables.copy()
 
-                if np.random.rand() < (1-epsilon):
-                    self.policy[state] = greedy_action
-                else:
-                    self.policy[state] = choice(
-                        list(self.state_action_space[state]))
+    def set_tables(self, tables: QTable):
+        """
+        Replace the learned tables with a copy from `get_tables`.
+        """
+        self.tables.load(tables)
+
+    def merge_tables(self, base: QTable, worker_tables: list[QTable]):
+        """
+        Merge tables learned by workers that all started from `base`, see `QTable.merge`.
+        """
+        self.tables.merge(base, worker_tables)
+
+    def save(self, path: str = None, values_dtype: str = FILE_ARRAYS["values"]) -> str:
+        """
+        Write the learned tables to a binary table file, see `QTable.save`.
+        :param path: Defaults to results/agent_<name>/tables.bin.
+        :param values_dtype: dtype of the stored Q values, pass "<f4" for a smaller float32 file.
+        :return: the path written.
+        """
+        if path is None:
+            path = os.path.join("results", f"agent_{self.name}", "tables.bin")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.tables.save(path, {"name": self.name}, values_dtype)
+        logging.info("Saved agent tables to %s", path)
+        return path
+
+    def load(self, path: str, mmap: bool = False):
+        """
+        Replace the learned tables with the ones in a file written by `save`.
+        :param mmap: Map the file copy-on-write, processes loading the same file share its memory.
+        """
+        tables = QTable.open(path, mmap)
+        if mmap or tables.counting != self.tables.counting:
+            self.tables = tables
+            self.__bind_views()
+        else:
+            self.tables.load(tables)
 
     # ============================== Helper methods ==============================
-    def __get_max_q_acion(self, state: BaseState):
-        return max(self.Q[state].items(), key=lambda item: item[1])[0]
+    def __bind_views(self):
+        self.policy: PolicyView = PolicyView(self.tables.policy)  # state -> action mapping
+        self.Q: StateActionView = StateActionView(self.tables.values, self.tables.seen)
+        # state-action -> count mapping, count how many times the agent has taken this action in this state
+        self.state_action_count: StateActionView = StateActionView(
+            self.tables.counts, self.tables.seen)
+        self.state_action_space: ActionSpaceView = ActionSpaceView(self.tables.action_space)
+
+    def __check_not_frozen(self):
+        if self.frozen:
+            raise RuntimeError("Agent is frozen for inference, call unfreeze() before learning.")
+
+    def __new_history(self) -> EpisodeHistory:
+        if not self.__history_pool:
+            return EpisodeHistory([], 0)
+        history = self.__history_pool.pop()
+        history.state_action_history.clear()
+        history.terminal_return = 0
+        return history
+
+    def __first_visits(self) -> list[tuple[int, int, float]]:
+        """
+        First visit (state code, action code) pairs of every hand in the episode, with the hand's return.
+        """
+        visits = []
+        for history in self.all_histories:
+            first_visit = set()
+            for state, action in history.state_action_history:
+                key = (state.id, action.value)
+                if key in first_visit:
+                    continue
+                first_visit.add(key)
+                visits.append((key[0], key[1], history.terminal_return))
+        return visits
 
     def __get_possible_actions(self, state: BaseState) -> list[Action]:
         actions = [Action.Stand, Action.Hit]
@@ -181,23 +261,8 @@ class Agent(Player):
         else:
             raise ValueError("Invalid action")
 
-        logging.debug(
-            f"Agent Chose action {action} in state {state}")
+        logging.debug("Agent Chose action %s in state %s", action, state)
 
         # judge if hit 21 or bust
         if not self.is_all_done() and self.get_hand().points >= 21:
             self.done_with_hand()
-
-
-    def __del__(self):
-        logging.info(f"Saving agent policy and Q values to disk")
-        # Save the policy and Q values to disk using pickle
-        save_dir = f"results/agent_{self.name}/"
-        os.makedirs(save_dir, exist_ok=True)
-        with open(os.path.join(save_dir, "policy.pkl"), "wb") as f:
-            pickle.dump(dict(self.policy), f)
-        with open(os.path.join(save_dir, "Q.pkl"), "wb") as f:
-            self.Q = dict(self.Q)
-            for k in self.Q:
-                self.Q[k] = dict(self.Q[k])
-            pickle.dump(dict(self.Q), f)
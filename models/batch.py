@@ -0,0 +1,192 @@
+"""
+Vectorized policy evaluation.
+Plays many episodes at once with NumPy arrays instead of Agent/Dealer/Hand objects,
+following the same rules and rewards as `Dojo.test`.
+"""
+import numpy as np
+
+from .player import MAX_SPLIT_NUM
+from .utils import Action, BaseState
+
+UNKNOWN_ACTION = -1
+MAX_HANDS = MAX_SPLIT_NUM + 1
+MAX_POINTS = 32
+MAX_DEALER_CARD = 12
+
+# card points of the 13 ranks, aces are 11
+RANK_POINTS = np.array([2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 11], dtype=np.int16)
+
+
+def compile_policy(policy: dict[BaseState, Action]) -> np.ndarray:
+    """
+    Turn a state -> action mapping into a dense lookup table
+    indexed by [player_sum, dealer_card, usible_ace, splitable].
+    States missing from the policy are UNKNOWN_ACTION.
+    """
+    if hasattr(policy, "array"):
+        # PolicyView already stores the same layout, the shoe is infinite so the true count is 0
+        return policy.array[:MAX_POINTS * MAX_DEALER_CARD * 4].reshape(MAX_POINTS, MAX_DEALER_CARD, 2, 2).copy()
+    table = np.full((MAX_POINTS, MAX_DEALER_CARD, 2, 2),
+                    UNKNOWN_ACTION, dtype=np.int8)
+    for state, action in policy.items():
+        if state.player_sum < MAX_POINTS and state.dealer_card < MAX_DEALER_CARD:
+            table[state.player_sum, state.dealer_card,
+                  int(state.usible_ace), int(state.splitable)] = action.value
+    return table
+
+
+def draw_points(rng: np.random.Generator, size) -> np.ndarray:
+    """
+    Draw card points from an infinite shoe.
+    """
+    return RANK_POINTS[rng.integers(0, len(RANK_POINTS), size)]
+
+
+def hand_points(hard_total: np.ndarray, ace_count: np.ndarray) -> np.ndarray:
+    return hard_total + 10 * ((ace_count > 0) & (hard_total <= 11))
+
+
+def play_batch(table: np.ndarray, episodes: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Play `episodes` episodes in lockstep.
+    Each episode only acts on its current hand, split hands are played last in first out,
+    the same order as `Player`.
+    :return: rewards of shape (episodes, MAX_HANDS) and the mask of hands that were played.
+    """
+    n = episodes
+    hard = np.zeros((n, MAX_HANDS), dtype=np.int16)
+    aces = np.zeros((n, MAX_HANDS), dtype=np.int16)
+    n_cards = np.zeros((n, MAX_HANDS), dtype=np.int16)
+    first = np.zeros((n, MAX_HANDS), dtype=np.int16)
+    second = np.zeros((n, MAX_HANDS), dtype=np.int16)
+    initial = np.zeros((n, MAX_HANDS), dtype=bool)
+    doubled = np.zeros((n, MAX_HANDS), dtype=bool)
+    done = np.zeros((n, MAX_HANDS), dtype=bool)
+    n_hands = np.ones(n, dtype=np.int16)
+    splits_left = np.full(n, MAX_SPLIT_NUM, dtype=np.int16)
+    current = np.zeros(n, dtype=np.int16)
+    slot_ids = np.arange(MAX_HANDS)
+
+    def reset_hand(lanes, slots, card1, card2):
+        hard[lanes, slots] = np.where(card1 == 11, 1, card1) + np.where(card2 == 11, 1, card2)
+        aces[lanes, slots] = (card1 == 11).astype(np.int16) + (card2 == 11)
+        n_cards[lanes, slots] = 2
+        first[lanes, slots] = card1
+        second[lanes, slots] = card2
+
+    def add_card(lanes, slots, card):
+        hard[lanes, slots] += np.where(card == 11, 1, card)
+        aces[lanes, slots] += card == 11
+        n_cards[lanes, slots] += 1
+
+    def move_to_next_hand(lanes):
+        # pop the newest unfinished hand, -1 when the episode has no hand left
+        pending = ~done[lanes] & (slot_ids < n_hands[lanes, None])
+        newest = MAX_HANDS - 1 - np.argmax(pending[:, ::-1], axis=1)
+        current[lanes] = np.where(pending.any(axis=1), newest, -1)
+
+    # deal, same order as Dojo: player, dealer hidden, player, dealer face
+    cards = draw_points(rng, (4, n))
+    all_lanes = np.arange(n)
+    reset_hand(all_lanes, current, cards[0], cards[2])
+    initial[:, 0] = True
+    dealer_face = cards[3]
+
+    while True:
+        lanes = np.flatnonzero(current >= 0)
+        if len(lanes) == 0:
+            break
+        slots = current[lanes]
+        points = hand_points(hard[lanes, slots], aces[lanes, slots])
+
+        # hands with 21 or more are done without a decision
+        stop = points >= 21
+        done[lanes[stop], slots[stop]] = True
+
+        lanes, slots, points = lanes[~stop], slots[~stop], points[~stop]
+        soft = (aces[lanes, slots] > 0) & (hard[lanes, slots] <= 11)
+        splitable = (n_cards[lanes, slots] == 2) & (
+            first[lanes, slots] == second[lanes, slots]) & (splits_left[lanes] > 0)
+        actions = table[points, dealer_face[lanes], soft.astype(np.int8), splitable.astype(np.int8)]
+
+        # unseen states: uniform over Stand, Hit, [Split], [Double]
+        unknown = actions == UNKNOWN_ACTION
+        if unknown.any():
+            can_split = splitable[unknown]
+            can_double = initial[lanes[unknown], slots[unknown]]
+            choice = (rng.random(unknown.sum()) * (2 + can_split + can_double)).astype(np.int8)
+            choice = np.where((choice == 2) & ~can_split, Action.Double.value, choice)
+            choice = np.where(choice == 3, Action.Double.value, choice)
+            choice = np.where(choice == 2, Action.Split.value, choice)
+            actions[unknown] = choice
+
+        stand = actions == Action.Stand.value
+        done[lanes[stand], slots[stand]] = True
+
+        hit = actions == Action.Hit.value
+        add_card(lanes[hit], slots[hit], draw_points(rng, hit.sum()))
+        initial[lanes[hit], slots[hit]] = False
+
+        double = actions == Action.Double.value
+        add_card(lanes[double], slots[double], draw_points(rng, double.sum()))
+        doubled[lanes[double], slots[double]] = True
+        done[lanes[double], slots[double]] = True
+
+        split = actions == Action.Split.value
+        if split.any():
+            split_lanes, split_slots = lanes[split], slots[split]
+            pair_card = first[split_lanes, split_slots]
+            new_slots = n_hands[split_lanes]
+            split_cards = draw_points(rng, (2, len(split_lanes)))
+            reset_hand(split_lanes, new_slots, pair_card, split_cards[0])
+            initial[split_lanes, new_slots] = True
+            reset_hand(split_lanes, split_slots, pair_card, split_cards[1])
+            n_hands[split_lanes] += 1
+            splits_left[split_lanes] -= 1
+
+        finished = np.flatnonzero(done[all_lanes, np.maximum(current, 0)] & (current >= 0))
+        move_to_next_hand(finished)
+
+    # dealer stands on soft 17
+    dealer_hard = np.where(cards[1] == 11, 1, cards[1]) + np.where(cards[3] == 11, 1, cards[3])
+    dealer_aces = (cards[1] == 11).astype(np.int16) + (cards[3] == 11)
+    dealer_points = hand_points(dealer_hard, dealer_aces)
+    dealer_blackjack = dealer_points == 21
+    while True:
+        hitting = np.flatnonzero(dealer_points < 17)
+        if len(hitting) == 0:
+            break
+        card = draw_points(rng, len(hitting))
+        dealer_hard[hitting] += np.where(card == 11, 1, card)
+        dealer_aces[hitting] += card == 11
+        dealer_points[hitting] = hand_points(dealer_hard[hitting], dealer_aces[hitting])
+
+    played = slot_ids < n_hands[:, None]
+    points = hand_points(hard, aces)
+    blackjack = (n_cards == 2) & (points == 21)
+    dealer_points = dealer_points[:, None]
+    dealer_blackjack = dealer_blackjack[:, None]
+    rewards = np.where(
+        blackjack, np.where(dealer_blackjack, 0.0, 1.5),
+        np.where(dealer_blackjack | (points > 21), -1.0,
+                 np.where(dealer_points > 21, 1.0, np.sign(points - dealer_points))))
+    rewards = np.where(doubled, 2 * rewards, rewards)
+    return np.where(played, rewards, 0.0), played
+
+
+def evaluate(table: np.ndarray, episodes: int, batch_size: int = 100000,
+             rng: np.random.Generator = None) -> tuple[float, float, int]:
+    """
+    Evaluate a compiled policy over `episodes` episodes.
+    :return: total reward, number of won hands, number of hands.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    total_reward = 0.0
+    wins = 0
+    hands = 0
+    for start in range(0, episodes, batch_size):
+        rewards, played = play_batch(table, min(batch_size, episodes - start), rng)
+        total_reward += float(rewards.sum())
+        wins += int((rewards > 0).sum())
+        hands += int(played.sum())
+    return total_reward, wins, hands
@@ -52,8 +52,8 @@ class BlackJackGame(object):
         self.state_action_history = []
 
     def __add_splitable_init(self):
-        self.deck.cards.insert(0, Card(Suit.Clubs, Rank.TEN))
-        self.deck.cards.insert(2, Card(Suit.Clubs, Rank.TEN))
+        self.deck.insert_card(0, Card(Suit.Clubs, Rank.TEN))
+        self.deck.insert_card(2, Card(Suit.Clubs, Rank.TEN))
 
 
     def __init_player(self):
@@ -106,27 +106,30 @@ class BlackJackGame(object):
 
     def _get_hand_reward(self, player_hand: PlayerHand) -> float:
         main_bet_reward = 0
+        dealer_blackjack = self.dealer.is_blackjack()
+        dealer_points = self.dealer.reveal_hand()
+        points = player_hand.points
         # blackjack
         if player_hand.is_blackjack():
-            if self.dealer.is_blackjack():
+            if dealer_blackjack:
                 main_bet_reward = 0
             else:
                 main_bet_reward = 1.5
-        elif self.dealer.is_blackjack():
+        elif dealer_blackjack:
             main_bet_reward = -1
         # bust
-        elif player_hand.is_bust():
+        elif points > 21:
             main_bet_reward = -1
         # win
-        elif self.dealer.is_bust():
+        elif dealer_points > 21:
             main_bet_reward = 1
-        elif player_hand.points > self.dealer.reveal_hand():
+        elif points > dealer_points:
             main_bet_reward = 1
         # lose
-        elif player_hand.points < self.dealer.reveal_hand():
+        elif points < dealer_points:
             main_bet_reward = -1
         # push
-        elif player_hand.points == self.dealer.reveal_hand():
+        else:
             main_bet_reward = 0
         # double
         if player_hand.doubled:
@@ -195,7 +198,7 @@ class BlackJackGame(object):
         print("Game ended.")
 
     def reset(self):
-        if len(self.deck.cards) < 20:
+        if len(self.deck) < 20:
             self.deck = Deck(6)
         if self.player.get_bank_amount() == 0:
             self.__init_player()
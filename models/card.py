@@ -1,5 +1,5 @@
 from enum import Enum
-from random import choice
+from .rng import default_stream
 
 
 class Suit(Enum):
@@ -24,40 +24,72 @@ class Rank(Enum):
     ACE = 'A'
     
 
+# rank -> point, aces count as 11
+RANK_POINTS: dict[Rank, int] = {
+    rank: 11 if rank is Rank.ACE else 10 if rank in (Rank.JACK, Rank.QUEEN, Rank.KING) else int(rank.value)
+    for rank in Rank}
+
 
 class Card(object):
-    suit = None
-    rank = None
-    point = None
-
-    def __init__(self, suit:Suit, rank:Rank):
-        self.suit: Suit = suit
-        self.rank: Rank = rank
-        self.point: int = Card.get_point(rank)
-    
+    """
+    Immutable playing card.
+    There is only one instance per (suit, rank), `Card(suit, rank)` returns the shared one.
+    """
+    __slots__ = ("suit", "rank", "point", "code")
+    __interned: dict[tuple[Suit, Rank], "Card"] = {}
+
+    def __new__(cls, suit: Suit, rank: Rank):
+        try:
+            return cls.__interned[(suit, rank)]
+        except KeyError:
+            raise ValueError(f"Invalid card {suit!r}, {rank!r}") from None
+
+    @classmethod
+    def _intern(cls, suit: Suit, rank: Rank, code: int) -> "Card":
+        card = object.__new__(cls)
+        object.__setattr__(card, "suit", suit)
+        object.__setattr__(card, "rank", rank)
+        object.__setattr__(card, "point", RANK_POINTS[rank])
+        object.__setattr__(card, "code", code)
+        cls.__interned[(suit, rank)] = card
+        return card
+
     @staticmethod
     def get_point(rank: Rank) -> int:
-        if rank == Rank.ACE:
-            return 11
-        elif rank in [Rank.JACK, Rank.QUEEN, Rank.KING]:
-            return 10
-        else:
-            return int(rank.value)
+        return RANK_POINTS[rank]
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Card is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Card is immutable")
+
+    def __reduce__(self):
+        return Card, (self.suit, self.rank)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __eq__(self, other):
-        if not isinstance(other, Card):
-            return False
-        return self.suit == other.suit and self.rank == other.rank
+        return self is other
 
     def __hash__(self):
-        return hash((self.suit, self.rank))
+        return self.code
 
     def __str__(self):
         return f"{self.suit.value}{self.rank.value}"
 
 
+# all 52 cards, indexed by card code
+CARDS: tuple[Card, ...] = tuple(Card._intern(suit, rank, code)
+                                for code, (suit, rank) in enumerate((suit, rank) for suit in Suit for rank in Rank))
+
+
 def get_random_card():
-    return Card(choice([suit for suit in Suit]), choice([rank for rank in Rank]))
+    return default_stream().choice(CARDS)
 
 
 
@@ -66,4 +98,4 @@ if __name__ == "__main__":
         print(rank.value)
 
     # card = Card()
-    # print(card)
\ No newline at end of file
+    # print(card)
@@ -0,0 +1,105 @@
+"""
+Checkpoints of a training run.
+A checkpoint is a Q table file (see `QTable.save`) whose metadata holds everything else
+needed to continue the run exactly: RNG states, the undealt cards, the episode index
+and the running stats. Checkpoints are written on a background thread.
+"""
+import os
+import threading
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+from .qtable import QTable
+
+
+@dataclass
+class TrainingCheckpoint:
+    mode: str
+    # episodes done, the run resumes with this episode index
+    episode: int
+    total_episodes: int
+    tables: QTable
+    rng_state: dict
+    agent_rng_state: dict
+    deck_state: dict
+    # ProgressReporter totals: episodes, hands, reward_sum, wins
+    progress: dict
+    # state of the exploring starts of a MCES run, see `ExploringStarts.get_state`
+    starts: Optional[dict] = None
+    # exploration rate of a MCE run
+    epsilon: Optional[float] = None
+
+    def save(self, path: str):
+        metadata = asdict(self)
+        del metadata["tables"]
+        # Q values are kept exact so a resumed run matches an uninterrupted one
+        self.tables.save(path, {"checkpoint": metadata}, values_dtype="<f8")
+
+    @classmethod
+    def load(cls, path: str) -> "TrainingCheckpoint":
+        tables, header = QTable.open_with_header(path)
+        metadata = header["metadata"].get("checkpoint")
+        if metadata is None:
+            raise ValueError(f"{path} is not a training checkpoint.")
+        return cls(tables=tables, **metadata)
+
+
+class CheckpointWriter(object):
+    """
+    Write checkpoints to `path` on a background thread, the file is replaced atomically.
+    The training loop only hands over a snapshot, if the previous one is still being written
+    the older pending snapshot is dropped in favour of the newer one.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.written = 0
+        self.__pending: Optional[TrainingCheckpoint] = None
+        self.__closed = False
+        self.__error: Optional[BaseException] = None
+        self.__condition = threading.Condition()
+        self.__thread = threading.Thread(target=self.__run, name="checkpoint-writer", daemon=True)
+        self.__thread.start()
+
+    def submit(self, checkpoint: TrainingCheckpoint):
+        with self.__condition:
+            self.__raise_error()
+            self.__pending = checkpoint
+            self.__condition.notify()
+
+    def close(self):
+        """
+        Write the pending checkpoint and stop the thread.
+        """
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify()
+        self.__thread.join()
+        self.__raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                while self.__pending is None and not self.__closed:
+                    self.__condition.wait()
+                checkpoint, self.__pending = self.__pending, None
+                if checkpoint is None:
+                    return
+            try:
+                checkpoint.save(self.path)
+                self.written += 1
+            except BaseException as e:
+                with self.__condition:
+                    self.__error = e
+                return
+
+    def __raise_error(self):
+        if self.__error is not None:
+            raise RuntimeError(f"Writing checkpoint {self.path} failed.") from self.__error
@@ -1,24 +1,38 @@
-from .hand import Hand
+from .hand import Hand, HandSnapshot
 from .card import Card
 from .deck import Deck
-from copy import deepcopy
 
 class Dealer(object):
     __hand: Hand = None
     __hiden_card: Card = None
 
+    def __init__(self, reuse: bool = False):
+        """
+        :param reuse: Keep the hand on `reset` and refill it in place on the next `init_hand`.
+        """
+        self.reuse = reuse
+        self.__spare_hand: Hand = None
+        # snapshot returned by get_hand, dropped whenever the hand changes
+        self.__snapshot: HandSnapshot = None
+
     def __add_hiden_back(self):
         if self.__hiden_card is not None:
-            self.__hand.cards.insert(0, self.__hiden_card)
+            self.__hand.insert_card(0, self.__hiden_card)
             self.__hiden_card = None
+            self.__snapshot = None
 
     def init_hand(self, cards: list[Card]):
         if len(cards) != 2:
             raise ValueError("Dealer's hand must have exactly 2 cards.")
         if not all(isinstance(card, Card) for card in cards):
             raise ValueError("All cards must be instances of Card class.")
-        self.__hand = Hand(cards)
-        self.__hiden_card = self.__hand.cards.pop(0)
+        if self.__spare_hand is not None:
+            self.__hand, self.__spare_hand = self.__spare_hand, None
+            self.__hand.reset(cards)
+        else:
+            self.__hand = Hand(cards)
+        self.__hiden_card = self.__hand.pop_card(0)
+        self.__snapshot = None
 
     def hits(self, deck: Deck, hit_soft17=False):
         self.__add_hiden_back()
@@ -31,6 +45,7 @@ class Dealer(object):
                 self.__hand.add_card(deck.deal_card())
             else:
                 break
+        self.__snapshot = None
 
     def is_blackjack(self):
         return self.__hiden_card is None and self.__hand and self.__hand.is_blackjack()
@@ -46,10 +61,17 @@ class Dealer(object):
         return self.__hand.cards[0].point
 
     def get_face_card(self):
-        return deepcopy(self.__hand.cards[0]) if self.__hand else None
+        return self.__hand.cards[0] if self.__hand else None
 
-    def get_hand(self):
-        return deepcopy(self.__hand) if self.__hand else None
+    def get_hand(self) -> HandSnapshot:
+        """
+        Read-only snapshot of the visible cards, shared between calls until the hand changes.
+        """
+        if self.__hand is None:
+            return None
+        if self.__snapshot is None:
+            self.__snapshot = self.__hand.snapshot()
+        return self.__snapshot
 
     def is_bust(self):
         if self.__hand is None:
@@ -57,11 +79,14 @@ class Dealer(object):
         return self.__hand.is_bust()
 
     def reset(self):
+        if self.reuse and self.__hand is not None:
+            self.__spare_hand = self.__hand
         self.__hand = None
         self.__hiden_card = None
+        self.__snapshot = None
 
     def get_hiden_card(self):
-        return deepcopy(self.__hiden_card) if self.__hiden_card else None
+        return self.__hiden_card
 
     def __get_hand_length(self):
         return len(self.__hand.cards) if self.__hand else 0
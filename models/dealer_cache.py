@@ -0,0 +1,174 @@
+"""
+Dealer outcome distributions for a known shoe composition.
+The dealer's play only depends on the up card and the cards left in the shoe,
+so distributions are computed once per composition and kept in an LRU cache.
+Consecutive rounds of a shoe rarely repeat a composition, the work they share is
+the enumeration of the dealer's draws (`DealerDraws`), which is kept per up card.
+"""
+import sys
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from .solver import (add_card, card_probabilities, dealer_distribution, POINTS,
+                     DEALER_TOTALS, BUST, BLACKJACK, N_OUTCOMES)
+
+
+class DealerDraws(object):
+    """
+    Every way the dealer can finish from one up card, grouped by the multiset of cards drawn.
+    The probability of drawing a given sequence without replacement only depends on its multiset,
+    so these tables do not depend on the shoe and are built once per (up card, hit_soft17).
+    - cards: cards drawn per point (2..11), one row per finished multiset.
+    - ways: number of drawing orders that reach the row without finishing earlier.
+    - outcomes: dealer outcome of the row, indexed like `solver.DEALER_TOTALS` then BUST and BLACKJACK.
+    """
+
+    def __init__(self, up_card: int, hit_soft17: bool = False):
+        finished: dict[tuple[tuple, int], int] = {}
+        up_total, up_soft = add_card(0, False, up_card)
+        # drawn cards per point -> (number of orders, total, soft) of the hands still drawing
+        drawing = {(0,) * len(POINTS): (1, up_total, up_soft)}
+        two_cards = True
+        while drawing:
+            next_drawing: dict[tuple, tuple[int, int, bool]] = {}
+            for drawn, (ways, total, soft) in drawing.items():
+                for i, card in enumerate(POINTS):
+                    cards = drawn[:i] + (drawn[i] + 1,) + drawn[i + 1:]
+                    next_total, next_soft = add_card(total, soft, card)
+                    if two_cards and next_total == 21:
+                        outcome = BLACKJACK
+                    elif next_total > 21:
+                        outcome = BUST
+                    elif next_total > 17 or (next_total == 17 and not (next_soft and hit_soft17)):
+                        outcome = next_total - DEALER_TOTALS[0]
+                    else:
+                        previous = next_drawing.get(cards, (0, next_total, next_soft))[0]
+                        next_drawing[cards] = (previous + ways, next_total, next_soft)
+                        continue
+                    finished[cards, outcome] = finished.get((cards, outcome), 0) + ways
+            drawing = next_drawing
+            two_cards = False
+        self.cards = np.array([cards for cards, _ in finished], dtype=np.int64)
+        self.ways = np.array(list(finished.values()), dtype=np.float64)
+        self.outcomes = np.array([outcome for _, outcome in finished], dtype=np.int64)
+        self.__sizes = self.cards.sum(axis=1)
+        self.__depth = int(self.cards.max()) + 1
+        # position of every (row, point) in a flattened (point, count) table
+        self.__flat_index = np.arange(len(POINTS)) * self.__depth + self.cards
+
+    def distribution(self, counts: np.ndarray) -> np.ndarray:
+        """
+        Distribution of the dealer's final outcome for the cards left per point, indexed by point.
+        """
+        left = np.asarray(counts, dtype=np.float64)[POINTS[0]:POINTS[-1] + 1]
+        # falling factorials count * (count - 1) * ... of every point and of the whole shoe
+        steps = np.arange(self.__depth - 1)
+        per_point = np.ones((len(POINTS), self.__depth))
+        per_point[:, 1:] = np.cumprod(np.maximum(left[:, None] - steps, 0), axis=1)
+        shoe = np.ones(self.__sizes.max() + 1)
+        shoe[1:] = np.cumprod(np.maximum(left.sum() - np.arange(len(shoe) - 1), 0))
+        drawn = per_point.take(self.__flat_index).prod(axis=1)
+        probs = np.divide(drawn, shoe[self.__sizes], out=np.zeros_like(drawn), where=drawn > 0)
+        dist = np.bincount(self.outcomes, weights=self.ways * probs, minlength=N_OUTCOMES)
+        # a shoe running out mid-hand leaves some orders without a finish
+        if not np.isclose(dist.sum(), 1.0):
+            raise ValueError("Not enough cards left for the dealer to finish.")
+        return dist
+
+
+def exact_dealer_distribution(up_card: int, counts: np.ndarray, hit_soft17: bool = False,
+                              draws: Optional[DealerDraws] = None) -> np.ndarray:
+    """
+    Distribution of the dealer's final outcome, drawing without replacement.
+    :param counts: Cards left per point, indexed by point like `Deck.remaining_counts`.
+        The hole card is unknown, so it must still be part of the counts.
+    :param draws: `DealerDraws` of this up card and rule, built when not given.
+    """
+    if draws is None:
+        draws = DealerDraws(up_card, hit_soft17)
+    return draws.distribution(counts)
+
+
+def expected_hand_reward(dist: np.ndarray, points: int, is_blackjack: bool, doubled: bool = False) -> float:
+    """
+    Expected reward of a finished hand against a dealer outcome distribution, same rules as `Dojo`.
+    """
+    if is_blackjack:
+        reward = 1.5 * (1 - dist[BLACKJACK])
+    elif points > 21:
+        reward = -1.0
+    else:
+        reward = dist[BUST] - dist[BLACKJACK]
+        for i, dealer_total in enumerate(DEALER_TOTALS):
+            reward += dist[i] * np.sign(points - dealer_total)
+    return float(2 * reward if doubled else reward)
+
+
+class DealerOutcomeCache(object):
+    """
+    LRU cache of dealer outcome distributions keyed by (up card, hit_soft17, cards left per point).
+    A miss only weights the cached `DealerDraws` of the up card by the composition,
+    `draw_hits`/`draw_misses` count how often those were reused.
+    :param max_bytes: Approximate memory cap, least recently used entries are evicted beyond it.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.draw_hits = 0
+        self.draw_misses = 0
+        self.__draws: dict[tuple[int, bool], DealerDraws] = {}
+        self.__entries: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self.__infinite: dict[tuple[int, bool], np.ndarray] = {}
+
+    def get(self, up_card: int, counts: Optional[np.ndarray] = None, hit_soft17: bool = False) -> np.ndarray:
+        """
+        Dealer outcome distribution, indexed like `solver.DEALER_TOTALS` then BUST and BLACKJACK.
+        :param counts: Cards left per point including the hole card, None for an infinite deck.
+        """
+        if counts is None:
+            key = (up_card, hit_soft17)
+            if key not in self.__infinite:
+                self.__infinite[key] = dealer_distribution(up_card, card_probabilities(), hit_soft17)
+            return self.__infinite[key]
+
+        key = (up_card, hit_soft17, np.asarray(counts, dtype=np.uint16).tobytes())
+        dist = self.__entries.get(key)
+        if dist is not None:
+            self.hits += 1
+            self.__entries.move_to_end(key)
+            return dist
+
+        self.misses += 1
+        dist = exact_dealer_distribution(up_card, counts, hit_soft17, self.__get_draws(up_card, hit_soft17))
+        dist.flags.writeable = False
+        self.__entries[key] = dist
+        self.nbytes += self.__entry_size(key, dist)
+        while self.nbytes > self.max_bytes and len(self.__entries) > 1:
+            old_key, old_dist = self.__entries.popitem(last=False)
+            self.nbytes -= self.__entry_size(old_key, old_dist)
+        return dist
+
+    def clear(self):
+        self.__entries.clear()
+        self.nbytes = 0
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __get_draws(self, up_card: int, hit_soft17: bool) -> DealerDraws:
+        draws = self.__draws.get((up_card, hit_soft17))
+        if draws is not None:
+            self.draw_hits += 1
+            return draws
+        self.draw_misses += 1
+        draws = self.__draws[up_card, hit_soft17] = DealerDraws(up_card, hit_soft17)
+        return draws
+
+    @staticmethod
+    def __entry_size(key: tuple, dist: np.ndarray) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(key[2]) + sys.getsizeof(dist)
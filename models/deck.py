@@ -1,40 +1,143 @@
-from .card import Card, Suit, Rank
+from .card import Card, CARDS
+from .rng import RandomStream, default_stream
+from .utils import MAX_TRUE_COUNT
+import math
 import numpy as np
 
+# card code -> point, aces count as 11
+CARD_POINTS: np.ndarray = np.array([card.point for card in CARDS], dtype=np.int8)
+# card code -> Hi-Lo tag: +1 for 2-6, 0 for 7-9, -1 for tens and aces
+HI_LO: tuple[int, ...] = tuple(1 if point <= 6 else -1 if point >= 10 else 0 for point in CARD_POINTS.tolist())
+CARDS_PER_DECK = 52
+_HI_LO_TAGS: np.ndarray = np.array(HI_LO, dtype=np.int64)
+
 
 class Deck(object):
-    def __init__(self, deck_num=6):
-        self.cards: list[Card] = [Card(suit, rank)
-                      for suit in Suit for rank in Rank]*deck_num
+    """
+    Shoe of `deck_num` decks.
+    Cards are stored as an int8 array of card codes, dealing moves a cursor forward
+    instead of shifting the remaining cards.
+    The Hi-Lo running count of the dealt cards is updated as each card is dealt,
+    the burned card is not seen and not counted.
+    """
+
+    def __init__(self, deck_num=6, rng: RandomStream = None):
+        """
+        :param rng: Stream used to shuffle, the default stream when not given.
+        """
+        self.__rng: RandomStream = rng if rng is not None else default_stream()
+        # unshuffled shoe, the starting order of every shuffle
+        self.__full_shoe: np.ndarray = np.tile(
+            np.arange(len(CARDS), dtype=np.int8), deck_num)
+        self.__codes: np.ndarray = self.__full_shoe.copy()
+        self.__cursor: int = 0
+        self.__running_count: int = 0
+        self.__shuffle()
+        self.__burn_out()
+
+    def reshuffle(self):
+        """
+        Put every card back, shuffle and burn the top card, the count starts over.
+        Same as a new Deck with the same stream state, without allocating one.
+        """
+        if len(self.__codes) == len(self.__full_shoe):
+            self.__codes[:] = self.__full_shoe
+        else:
+            # cards were inserted or the state was set
+            self.__codes = self.__full_shoe.copy()
+        self.__cursor = 0
+        self.__running_count = 0
         self.__shuffle()
         self.__burn_out()
 
-    def deal_card(self):
-        return self.cards.pop(0)
+    def deal_card(self) -> Card:
+        if self.__cursor >= len(self.__codes):
+            raise IndexError("deal from empty deck")
+        code = self.__codes[self.__cursor]
+        self.__cursor += 1
+        self.__running_count += HI_LO[code]
+        return CARDS[code]
+
+    def discard(self, n: int):
+        """
+        Deal `n` cards nobody plays with, they are counted like cards of earlier rounds.
+        """
+        if n > len(self):
+            raise IndexError("discard more cards than left in the deck")
+        dealt = self.__codes[self.__cursor:self.__cursor + n]
+        self.__cursor += n
+        self.__running_count += int(_HI_LO_TAGS[dealt].sum())
+
+    @property
+    def rng(self) -> RandomStream:
+        return self.__rng
+
+    @property
+    def running_count(self) -> int:
+        return self.__running_count
+
+    def true_count(self) -> float:
+        """
+        Running count per deck left in the shoe.
+        """
+        return self.__running_count * CARDS_PER_DECK / max(len(self), 1)
+
+    def true_count_bucket(self) -> int:
+        """
+        True count rounded down, clamped to -MAX_TRUE_COUNT..MAX_TRUE_COUNT.
+        """
+        return max(-MAX_TRUE_COUNT, min(MAX_TRUE_COUNT, math.floor(self.true_count())))
+
+    def insert_card(self, index: int, card: Card):
+        """
+        Put a card into the undealt part of the shoe, `index` counts from the next card to deal.
+        """
+        remaining = np.insert(self.__codes[self.__cursor:], index, card.code)
+        self.__codes = remaining.astype(np.int8)
+        self.__cursor = 0
+        # a card back in the shoe is no longer counted
+        self.__running_count -= HI_LO[card.code]
+
+    def remaining_counts(self) -> np.ndarray:
+        """
+        Number of undealt cards per point, indexed by point (2..11).
+        """
+        return np.bincount(CARD_POINTS[self.__codes[self.__cursor:]], minlength=12)
+
+    def get_state(self) -> dict:
+        """
+        Codes of the undealt cards in dealing order and the running count.
+        """
+        return {"codes": self.__codes[self.__cursor:].tolist(), "running_count": self.__running_count}
+
+    def set_state(self, state: dict):
+        """
+        Restore the undealt cards and the count from `get_state`.
+        """
+        self.__codes = np.array(state["codes"], dtype=np.int8)
+        self.__cursor = 0
+        self.__running_count = state["running_count"]
 
     def __shuffle(self):
-        np.random.shuffle(self.cards)
+        self.__rng.shuffle(self.__codes)
 
     def __burn_out(self):
         # delete the top card
-        del self.cards[0]
+        self.__cursor += 1
 
     def __str__(self):
         res = ""
-        for card in self.cards:
-            res+=card.__str__()
-            res+='\n'
+        for code in self.__codes[self.__cursor:]:
+            res += CARDS[code].__str__()
+            res += '\n'
         return res
 
     def __len__(self):
-        return len(self.cards)
+        return len(self.__codes) - self.__cursor
+
 
 if __name__ == "__main__":
     deck = Deck()
     print(deck)
-    deck.shuffle()
-    print(deck)
-    deck.burn_out()
-    print(deck)
     print(deck.deal_card())
     print(deck.deal_card())
@@ -1,22 +1,196 @@
 from .agent import Agent
 from .deck import Deck
-from .hand import PlayerHand, Hand
+from .hand import PlayerHand, Hand, HandSnapshot
 from .dealer import Dealer
-from .card import Card, Rank, Suit, get_random_card
-from .utils import BaseState, Action
-
+from .card import Card, Rank, Suit, CARDS
+from .utils import BaseState, Action, MAX_TRUE_COUNT, intern_state
+from .qtable import QTable, N_COUNT_BUCKETS
+from .metrics import ProgressReporter, ProgressStats
+from .dealer_cache import DealerOutcomeCache, expected_hand_reward
+from .checkpoint import TrainingCheckpoint, CheckpointWriter
+from .episode_log import EpisodeLogWriter
+from .rng import RandomStream, EpisodeStreams
+from .policy import CompiledPolicy
+from .profiling import Profiler
+from . import batch
+
+from contextlib import contextmanager, nullcontext
 from enum import Enum
-from random import choice, choices
-from itertools import product
-
+from dataclasses import dataclass
+from typing import Callable
+from concurrent.futures import ProcessPoolExecutor
+import os
+import tempfile
 import logging
+from time import perf_counter
+import numpy as np
 
 
 class LearnMode(Enum):
     MCES = "MCES"
     MCE = "MCE"  # exploring with epsilon greedy
 
-# TODO put back, card counting
+# canonical exploring starts, built on first use
+_exploring_start_table: tuple = None
+# the shoe is replaced once fewer cards are left at the start of a round
+RESHUFFLE_AT = 30
+
+
+def exploring_start_table() -> tuple[tuple[tuple[Card, Card, Card], Action], ...]:
+    """
+    One ((player card, player card, dealer up card), action) start for every distinct
+    starting BaseState and every action allowed in it.
+    Cards with the same points give the same state, so suits and J/Q/K are left out.
+    """
+    global _exploring_start_table
+    if _exploring_start_table is None:
+        # one card per point, 2..10 and ace
+        cards = [Card(Suit.Spades, rank) for rank in Rank
+                 if rank not in (Rank.JACK, Rank.QUEEN, Rank.KING)]
+        player_hands: dict[tuple[int, bool, bool], tuple[Card, Card]] = {}
+        for i, first in enumerate(cards):
+            for second in cards[i:]:
+                hand = PlayerHand([first, second], 1)
+                player_hands.setdefault((hand.points, hand.is_soft, hand.has_pair()), (first, second))
+        starts = []
+        for (_, _, pair), (first, second) in player_hands.items():
+            actions = [Action.Stand, Action.Hit, Action.Double] + ([Action.Split] if pair else [])
+            for dealer_card in cards:
+                starts.extend(((first, second, dealer_card), action) for action in actions)
+        _exploring_start_table = tuple(starts)
+    return _exploring_start_table
+
+
+class ExploringStarts(object):
+    """
+    Stream of exactly `episodes` exploring starts drawn from `table`.
+    The table is cycled through, in a new random order every cycle.
+    :param episodes: Number of starts, -1 for one pass over the table.
+    :param table: Starts to draw from, `exploring_start_table()` by default.
+    :param shuffle: Shuffle every cycle, otherwise the table order is kept.
+    """
+
+    def __init__(self, rng: RandomStream, episodes: int = -1, table: tuple = None, shuffle: bool = True):
+        self.table = table if table is not None else exploring_start_table()
+        if not self.table:
+            raise ValueError("Exploring starts table is empty.")
+        self.total = len(self.table) if episodes < 0 else episodes
+        self.done = 0
+        self.__rng = rng
+        self.__shuffle = shuffle
+        # table indices left in the current cycle, the next one last
+        self.__cycle: list[int] = []
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> tuple[tuple[Card, Card, Card], Action]:
+        if self.done >= self.total:
+            raise StopIteration
+        if not self.__cycle:
+            order = np.arange(len(self.table) - 1, -1, -1)
+            if self.__shuffle:
+                self.__rng.shuffle(order)
+            self.__cycle = order.tolist()
+        self.done += 1
+        return self.table[self.__cycle.pop()]
+
+    def get_state(self) -> dict:
+        return {"done": self.done, "total": self.total, "cycle": list(self.__cycle)}
+
+    def set_state(self, state: dict):
+        """
+        Continue from `get_state`, the table must be the same.
+        """
+        self.done = state["done"]
+        self.total = state["total"]
+        self.__cycle = list(state["cycle"])
+
+
+@dataclass
+class EpisodeReplay:
+    """
+    One episode played again by `Dojo.replay`.
+    """
+    episode: int
+    # true count bucket the round started with
+    true_count: int
+    dealer: HandSnapshot
+    # player's finished hands, split hands in play order
+    hands: list[HandSnapshot]
+    # (state, action) pairs of every hand
+    histories: list[list[tuple[BaseState, Action]]]
+    rewards: list[float]
+
+
+@dataclass
+class _TrainJob:
+    """
+    Work sent to one training worker process.
+    """
+    tables: QTable
+    start_mode: LearnMode
+    episodes: int
+    starts: list
+    epsilon: float
+    seed: int
+    count_states: bool
+
+
+def _train_worker(job: _TrainJob) -> tuple[QTable, int, int, float, int]:
+    """
+    Train a copy of the agent in a worker process.
+    :return: learned tables, episodes, played hands, total reward, won hands.
+    """
+    rng = RandomStream(job.seed)
+    agent = Agent(name="worker", bank=10000, reuse=True, rng=rng, counting=job.tables.counting)
+    agent.set_tables(job.tables)
+    # the parent reports progress of the whole run
+    dojo = Dojo(agent, report_every=0, progress_sink=lambda stats: None, reuse=True,
+                count_states=job.count_states)
+    if job.start_mode == LearnMode.MCES:
+        dojo.train_exploring_starts(starts=job.starts)
+    else:
+        dojo.train_exploring_greedy(job.episodes, job.epsilon)
+    progress = dojo.progress
+    return agent.get_tables(), progress.episodes, progress.hands, progress.reward_sum, progress.wins
+
+
+@dataclass
+class _TestJob:
+    """
+    Work sent to one testing worker process.
+    """
+    tables_path: str
+    episodes: int
+    expected_value: bool
+    seed: int
+    count_states: bool
+    # policy of a frozen agent
+    compiled_policy: CompiledPolicy = None
+    # run seed of a Dojo with per-episode seeding, and the index of the job's first episode
+    episode_seed: int = None
+    first_episode: int = 0
+
+
+def _test_worker(job: _TestJob) -> tuple[int, int, float, int, np.ndarray, np.ndarray]:
+    """
+    Test the agent saved at `job.tables_path` in a worker process, the tables are memory mapped.
+    :return: episodes, played hands, total reward, won hands, reward and episodes per true count.
+    """
+    rng = RandomStream(job.seed)
+    agent = Agent(name="worker", bank=10000, reuse=True, rng=rng)
+    agent.load(job.tables_path, mmap=True)
+    agent.compiled_policy = job.compiled_policy
+    dojo = Dojo(agent, report_every=0, progress_sink=lambda stats: None, reuse=True,
+                count_states=job.count_states, seed=job.episode_seed)
+    dojo.test(job.episodes, expected_value=job.expected_value, first_episode=job.first_episode)
+    progress = dojo.progress
+    return (progress.episodes, progress.hands, progress.reward_sum, progress.wins,
+            dojo.count_rewards, dojo.count_episodes)
 
 
 class Dojo:
@@ -24,179 +198,412 @@ class Dojo:
     The Dojo class is responsible for managing the training environment for the agent.
     """
 
-    def __init__(self, agent: Agent):
+    def __init__(self, agent: Agent, report_every: int = 10000,
+                 progress_sink: Callable[[ProgressStats], None] = None,
+                 dealer_cache: DealerOutcomeCache = None, reuse: bool = False,
+                 rng: RandomStream = None, episode_log: EpisodeLogWriter = None,
+                 count_states: bool = False, profiler: Profiler = None, seed: int = None):
+        """
+        :param report_every: Episodes between progress reports, 0 only reports when a run finishes.
+        :param progress_sink: Receives the progress reports, logged at INFO level by default.
+        :param dealer_cache: Dealer outcome distributions used by `test(expected_value=True)`.
+        :param reuse: Reset the dealer's hand in place between episodes,
+            create the agent with `reuse=True` to do the same for its hands and histories.
+        :param rng: Stream for shuffling and exploring starts, the agent's stream when not given.
+        :param episode_log: Records every episode played in this process, the caller closes it.
+        :param count_states: Add the Hi-Lo true count bucket at the start of each round to the states,
+            the agent must be created with `counting=True`.
+        :param profiler: Times the phases of every episode played in this process, its summary is logged
+            at the end of each run. Phases: refill_deck (getting the shoe ready), agent_play (the player's hands),
+            build_state, dealer_hits, reward (reward computation and pay out) and learn.
+            Counters: cards_dealt, deck_refills, splits, doubles and busts.
+        :param seed: Run seed for per-episode seeding. Every episode then plays from its own stream
+            and freshly shuffled shoe cut at a random point, both derived from (seed, episode index) only,
+            so any episode can be played again on its own with `replay`.
+            During a run the agent draws from the episode streams, its own stream is put back afterwards.
+            Moving the stream and shuffling the shoe add about 40us to every episode,
+            most of it the shuffle, which is about twice the cost of an unseeded episode.
+        """
         self.agent = agent
+        self.report_every = report_every
+        self.progress_sink = progress_sink
+        self.dealer_cache = dealer_cache if dealer_cache is not None else DealerOutcomeCache()
         self.agent.clear_episode_history()
+        self.rng: RandomStream = rng if rng is not None else agent.rng
+        self.episode_log = episode_log
+        self.seed = seed
+        self.__streams = EpisodeStreams(seed) if seed is not None else None
+        # the agent's own stream while it plays from the episode streams, see `__seeded_run`
+        self.__agent_rng: RandomStream = None
+        if count_states and not agent.tables.counting:
+            raise ValueError("Counting states need an agent created with counting=True.")
+        self.count_states = count_states
 
         # deck initialization
-        self.deck = Deck(8)
+        self.deck = Deck(8, self.rng)
+        # true count bucket when the current round started
+        self.__true_count = 0
+        # total reward and episodes of the last test run per true count bucket, see `ev_by_count`
+        self.count_rewards = np.zeros(N_COUNT_BUCKETS)
+        self.count_episodes = np.zeros(N_COUNT_BUCKETS, dtype=np.int64)
 
         # init dealer
-        self.dealer = Dealer()
+        self.dealer = Dealer(reuse)
 
-    def train_exploring_starts(self, episodes: int = -1):
+        # running totals of the last train or test run
+        self.progress: ProgressReporter = self.__new_progress("Idle", 0)
+
+        self.profiler = profiler
+        # cards in the shoe at the last update of the profiler's cards_dealt
+        self.__shoe_cards = len(self.deck)
+
+    def train_exploring_starts(self, episodes: int = -1, starts: list = None,
+                               checkpoint_path: str = None, checkpoint_every: int = 10000, resume: bool = False):
         """
         Train the agent using exploring starts.
-        This method generates a set of starting hands and trains the agent on them.
+        Every episode starts from one (cards, action) pair of `ExploringStarts`.
+        :param episodes: Number of episodes, -1 for one pass over the starts.
+        :param starts: Starts to play once in this order, instead of the canonical table.
+        :param checkpoint_path: Write a checkpoint to this file every `checkpoint_every` episodes and at the end.
+        :param resume: Continue from the checkpoint at `checkpoint_path` if it exists,
+            the result is the same as a run that was never interrupted.
         """
-        starts = self.__generate_exploring_starts()
+        if starts is None:
+            stream = ExploringStarts(self.rng, episodes)
+        else:
+            stream = ExploringStarts(self.rng, table=starts, shuffle=False)
+        checkpoint = self.__load_checkpoint(checkpoint_path, LearnMode.MCES, len(stream)) if resume else None
+        progress = self.__new_progress("Training MCES", len(stream))
+        if checkpoint is not None:
+            self.__restore_checkpoint(checkpoint, progress)
+            stream.set_state(checkpoint.starts)
         logging.info(
-            f"Training with exploring starts, running total {len(starts)} episodes...")
-
-        avg_reward = 0
-        win_rate = 0
-        sub_episode_count = 0  # related to split
-
-        i = 0
-        for start_cards, start_action in starts:
-            self.__refill_deck()
+            f"Training with exploring starts, running total {len(stream)} episodes...")
 
-            self.agent.clear_episode_history()
-            self.agent.set_bank_amount(1e10)  # reset bank amount
+        writer = CheckpointWriter(checkpoint_path) if checkpoint_path else None
+        profiler = self.profiler
+        # a failing run still writes its last checkpoint and stops the writer thread
+        with self.__seeded_run(), writer or nullcontext():
+            for start_cards, start_action in stream:
+                rng = self.__start_episode(stream.done - 1)
 
-            self.dealer.reset()
+                self.agent.clear_episode_history()
+                self.agent.set_bank_amount(1e10)  # reset bank amount
 
-            self.__init_hands(
-                [start_cards[0], get_random_card(), start_cards[1], start_cards[2]])
-            self.agent.first_play(
-                self.__build_current_state(), start_action, self.deck)
-            i += 1
+                self.dealer.reset()
 
-            # run the game until the player has no hands left
-            while not self.agent.is_all_done():
-                self.agent.play(self.__build_current_state(), self.deck)
+                self.__init_hands(
+                    [start_cards[0], rng.choice(CARDS), start_cards[1], start_cards[2]])
+                # run the game until the player has no hands left
+                self.__play_hands(start_action)
+                self.__dealer_hits()
 
-            self.dealer.hits(self.deck)
+                # compute the rewards, insurance are ignored
+                rewards = self.__compute_reward()
+                self.agent.set_episodes_return(rewards)
 
-            # compute the rewards, insurance are ignored
-            rewards = self.__compute_reward()
-            self.agent.set_episodes_return(rewards)
-
-            sub_episode_count += len(rewards)
-            avg_reward += sum(rewards)
-            win_rate += sum(1 for r in rewards if r > 0)
+                progress.update(rewards)
+                if profiler is not None:
+                    start = perf_counter()
+                self.agent.learn_exploring_starts()
+                if profiler is not None:
+                    profiler.add("learn", start)
 
-            logging.info(
-                f"Episode {i} finished with rewards {rewards}")
-            self.agent.learn_exploring_starts()
+                if writer and (stream.done % checkpoint_every == 0 or stream.done == stream.total):
+                    writer.submit(self.__checkpoint(LearnMode.MCES, stream.done, stream.total, progress,
+                                                    stream.get_state()))
 
-        avg_reward /= sub_episode_count
-        win_rate /= sub_episode_count
+        return self.__finish_progress(progress)
 
-        logging.info(
-            f"Training finished, total episodes:{sub_episode_count}, average reward: {avg_reward}, win rate: {win_rate}.")
-        return avg_reward, win_rate
-
-    def train_exploring_greedy(self, episodes: int, epsilon: float = 0.001):
+    def train_exploring_greedy(self, episodes: int, epsilon: float = 0.001,
+                               checkpoint_path: str = None, checkpoint_every: int = 10000, resume: bool = False):
         """
         Train the agent using exploring starts.
         This method generates a set of starting hands and trains the agent on them.
+        :param checkpoint_path: Write a checkpoint to this file every `checkpoint_every` episodes and at the end.
+        :param resume: Continue from the checkpoint at `checkpoint_path` if it exists,
+            the result is the same as a run that was never interrupted.
         """
         logging.info(
             f"Training MC epsilon greedy, running total {episodes} episodes...")
 
-        avg_reward = 0
-        win_rate = 0
-        sub_episode_count = 0  # related to split
-
-        for i in range(episodes):
-            self.__refill_deck()
+        progress = self.__new_progress("Training MCE", episodes)
+        checkpoint = self.__load_checkpoint(checkpoint_path, LearnMode.MCE, episodes, epsilon) if resume else None
+        first_episode = self.__restore_checkpoint(checkpoint, progress) if checkpoint else 0
+        writer = CheckpointWriter(checkpoint_path) if checkpoint_path else None
+        profiler = self.profiler
+        # a failing run still writes its last checkpoint and stops the writer thread
+        with self.__seeded_run(), writer or nullcontext():
+            for i in range(first_episode, episodes):
+                self.__start_episode(i)
 
-            self.agent.clear_episode_history()
-            self.agent.set_bank_amount(1e10)  # reset bank amount
+                self.agent.clear_episode_history()
+                self.agent.set_bank_amount(1e10)  # reset bank amount
 
-            self.dealer.reset()
+                self.dealer.reset()
 
-            self.__init_hands(
-                [self.deck.deal_card() for _ in range(4)])
+                self.__init_hands(
+                    [self.deck.deal_card() for _ in range(4)])
 
-            # run the game until the player has no hands left
-            while not self.agent.is_all_done():
-                self.agent.play(self.__build_current_state(), self.deck)
+                # run the game until the player has no hands left
+                self.__play_hands()
+                self.__dealer_hits()
 
-            self.dealer.hits(self.deck)
+                # compute the rewards, insurance are ignored
+                rewards = self.__compute_reward()
+                self.agent.set_episodes_return(rewards)
 
-            # compute the rewards, insurance are ignored
-            rewards = self.__compute_reward()
-            self.agent.set_episodes_return(rewards)
+                progress.update(rewards)
+                if profiler is not None:
+                    start = perf_counter()
+                self.agent.learn_epsilon_greedy(epsilon)
+                if profiler is not None:
+                    profiler.add("learn", start)
 
-            sub_episode_count += len(rewards)
-            avg_reward += sum(rewards)
-            win_rate += sum(1 for r in rewards if r > 0)
+                if writer and ((i + 1) % checkpoint_every == 0 or i + 1 == episodes):
+                    writer.submit(self.__checkpoint(LearnMode.MCE, i + 1, episodes, progress, epsilon=epsilon))
 
-            logging.info(
-                f"Episode {i} finished with rewards {rewards}")
-            self.agent.learn_epsilon_greedy(epsilon)
-
-        avg_reward /= sub_episode_count
-        win_rate /= sub_episode_count
-
-        logging.info(
-            f"Training finished, total episodes:{sub_episode_count}, average reward: {avg_reward}, win rate: {win_rate}.")
-        return avg_reward, win_rate
+        return self.__finish_progress(progress)
 
-    def train(self, episodes: int = 1000, start_mode: LearnMode = LearnMode.MCES, epsilon=0.001):
+    def train(self, episodes: int = 1000, start_mode: LearnMode = LearnMode.MCES, epsilon=0.001,
+              workers: int = 1, sync_every: int = 10000, seed: int = None,
+              checkpoint_path: str = None, checkpoint_every: int = 10000, resume: bool = False):
         """
         Train the agent for a given number of episodes.
         :param episodes: Number of training episodes.
         :param deck_init_mode: Mode to initialize the deck.
+        :param workers: Number of worker processes, 1 trains in this process.
+        :param sync_every: Episodes each worker plays before the tables are merged and shared again.
+        :param seed: Seed for the worker processes.
+        :param checkpoint_path: Checkpoint file, see `train_exploring_greedy`. Only with workers=1.
+        :param resume: Continue from the checkpoint if it exists.
         """
+        if workers > 1:
+            if checkpoint_path:
+                raise ValueError("Checkpoints are only supported when training with workers=1.")
+            return self.__train_parallel(episodes, start_mode, epsilon, workers, sync_every, seed)
         if start_mode == LearnMode.MCES:
-            self.train_exploring_starts(episodes)
+            return self.train_exploring_starts(episodes, checkpoint_path=checkpoint_path,
+                                               checkpoint_every=checkpoint_every, resume=resume)
         elif start_mode == LearnMode.MCE:
-            self.train_exploring_greedy(episodes, epsilon)
+            return self.train_exploring_greedy(episodes, epsilon, checkpoint_path=checkpoint_path,
+                                               checkpoint_every=checkpoint_every, resume=resume)
         else:
             pass
 
-    def test(self, episodes: int = 1000, verbose=False):
+    def __train_parallel(self, episodes: int, start_mode: LearnMode, epsilon: float,
+                         workers: int, sync_every: int, seed: int):
+        """
+        Split the episodes over a process pool.
+        Every round each worker trains a copy of the current tables on `sync_every` episodes,
+        then the copies are merged back into the agent.
+        """
+        if start_mode == LearnMode.MCES:
+            starts = list(ExploringStarts(self.rng, episodes))
+            total = len(starts)
+        else:
+            starts = None
+            total = episodes
+        logging.info(
+            f"Training {start_mode.name} with {workers} workers, running total {total} episodes...")
+
+        round_size = workers * sync_every
+        n_jobs = -(-total // sync_every)
+        seeds = [int(child.generate_state(1)[0])
+                 for child in np.random.SeedSequence(seed).spawn(n_jobs)]
+
+        progress = self.__new_progress(f"Training {start_mode.name}", total)
+        job_idx = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for round_start in range(0, total, round_size):
+                base = self.agent.get_tables()
+                jobs = []
+                for lo in range(round_start, min(round_start + round_size, total), sync_every):
+                    hi = min(lo + sync_every, total)
+                    jobs.append(_TrainJob(base, start_mode, hi - lo, starts[lo:hi] if starts else None,
+                                          epsilon, seeds[job_idx], self.count_states))
+                    job_idx += 1
+                results = list(pool.map(_train_worker, jobs))
+                self.agent.merge_tables(base, [result[0] for result in results])
+                for _, n_episodes, hands, reward_sum, wins in results:
+                    progress.add(n_episodes, hands, reward_sum, wins)
+
+        return self.__finish_progress(progress)
+
+    def test(self, episodes: int = 1000, verbose=False, expected_value=False,
+             workers: int = 1, seed: int = None, first_episode: int = 0):
         """
         Test the agent for a given number of episodes.
         :param episodes: Number of testing episodes.
+        :param expected_value: Score each hand by its expected reward against the dealer outcome
+            distribution of the remaining shoe instead of playing the dealer's hand out.
+            A hand then counts as won when its expected reward is positive.
+            A shoe rarely repeats a composition, so each round weights the dealer's draws by
+            the shoe again: about 0.1 ms per round, a few times the cost of a plain test.
+        :param workers: Number of worker processes, they all memory map one saved copy of the tables.
+        :param seed: Seed for the worker processes, not used when the Dojo has a run seed.
+        :param first_episode: Index of the first episode, with a run seed episodes
+            `first_episode .. first_episode + episodes - 1` are played.
         """
+        if workers > 1:
+            return self.__test_parallel(episodes, expected_value, workers, seed, first_episode)
         logging.info(f"Testing agent for {episodes} episodes...")
-        avg_reward = 0
-        win_rate = 0
-        sub_episode_count = 0
+        progress = self.__new_progress("Testing", episodes)
+        self.__reset_count_stats()
 
-        for _ in range(episodes):
-            self.__refill_deck()
+        with self.__seeded_run():
+            for i in range(first_episode, first_episode + episodes):
+                self.__start_episode(i)
+                self.__play_test_hands()
+                rewards = self.__test_rewards(expected_value, verbose)
 
-            self.agent.clear_episode_history()
-            self.agent.set_bank_amount(1e10)
-            self.dealer.reset()
-
-            # deal initial cards
-            self.__init_hands([self.deck.deal_card() for _ in range(4)])
-            # run the game until the player has no hands left
-            while not self.agent.is_all_done():
-                if self.agent.get_hand().points >= 21:
-                    self.agent.done_with_hand()
-                    continue
-                self.agent.play(self.__build_current_state(), self.deck)
-            self.dealer.hits(self.deck)
-            if verbose:
-                self.__print_final_state()
+                progress.update(rewards)
+                self.count_rewards[self.__true_count + MAX_TRUE_COUNT] += sum(rewards)
+                self.count_episodes[self.__true_count + MAX_TRUE_COUNT] += 1
 
-            # compute the reward
-            rewards = self.__compute_reward()
-            if verbose:
-                print(f"Gain reward:{sum(rewards)}")
-                print("=======================")
+        return self.__finish_progress(progress)
+
+    def __test_parallel(self, episodes: int, expected_value: bool, workers: int, seed: int, first_episode: int):
+        """
+        Split the episodes over a process pool. With a run seed every worker plays its own range
+        of episode indices, so the result does not depend on the number of workers.
+        """
+        logging.info(f"Testing agent for {episodes} episodes with {workers} workers...")
+        chunk = -(-episodes // workers)
+        seeds = [int(child.generate_state(1)[0])
+                 for child in np.random.SeedSequence(seed).spawn(workers)]
+        progress = self.__new_progress("Testing", episodes)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = self.agent.save(os.path.join(tmp_dir, "tables.bin"))
+            jobs = [_TestJob(path, min(chunk, episodes - start), expected_value, seeds[i], self.count_states,
+                             self.agent.compiled_policy, self.seed, first_episode + start)
+                    for i, start in enumerate(range(0, episodes, chunk))]
+            self.__reset_count_stats()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for *result, count_rewards, count_episodes in pool.map(_test_worker, jobs):
+                    progress.add(*result)
+                    self.count_rewards += count_rewards
+                    self.count_episodes += count_episodes
+
+        return self.__finish_progress(progress)
+
+    def replay(self, episode: int, expected_value: bool = False, verbose: bool = False) -> EpisodeReplay:
+        """
+        Play test episode `episode` of this run again on its own, with the same shoe and exploration
+        draws as in `test`. The agent plays its current tables or compiled policy,
+        so the episode is the same as in a test of the same agent.
+        Progress, count stats and the episode log are left untouched.
+        """
+        if self.seed is None:
+            raise ValueError("Replaying an episode needs a Dojo created with a seed.")
+        episode_log, self.episode_log = self.episode_log, None
+        try:
+            with self.__seeded_run():
+                self.__start_episode(episode)
+                self.__play_test_hands()
+                # paying out clears the hands
+                hands = [hand.snapshot() for hand in self.agent.get_all_hands()]
+                histories = [list(history.state_action_history) for history in self.agent.all_histories]
+                rewards = self.__test_rewards(expected_value, verbose)
+        finally:
+            self.episode_log = episode_log
+        return EpisodeReplay(episode=episode, true_count=self.__true_count, dealer=self.dealer.get_hand(),
+                             hands=hands, histories=histories, rewards=rewards)
+
+    def ev_by_count(self) -> dict[int, tuple[float, int]]:
+        """
+        Average reward per episode of the last test run for each true count bucket,
+        with the number of episodes. Buckets no round started in are left out.
+        """
+        return {bucket - MAX_TRUE_COUNT: (float(self.count_rewards[bucket] / self.count_episodes[bucket]),
+                                          int(self.count_episodes[bucket]))
+                for bucket in np.flatnonzero(self.count_episodes)}
 
-            sub_episode_count += len(rewards)
-            avg_reward += sum(rewards)
-            win_rate += sum(1 for r in rewards if r > 0)
+    def test_batch(self, episodes: int = 1000000, batch_size: int = 100000, seed: int = None):
+        """
+        Test the agent's policy with the vectorized engine.
+        Same rules and rewards as `test`, but cards come from an infinite shoe
+        and episodes are played `batch_size` at a time.
+        :param episodes: Number of testing episodes.
+        """
+        logging.info(f"Batch testing agent for {episodes} episodes...")
+        table = batch.compile_policy(self.agent.policy)
+        total_reward, wins, sub_episode_count = batch.evaluate(
+            table, episodes, batch_size, np.random.default_rng(seed))
 
-        avg_reward /= sub_episode_count
-        win_rate /= sub_episode_count
+        avg_reward = total_reward / sub_episode_count
+        win_rate = wins / sub_episode_count
 
         logging.info(
-            f"Testing finished, total episodes:{sub_episode_count}, average reward: {avg_reward}, win rate: {win_rate}.")
+            f"Batch testing finished, total episodes:{sub_episode_count}, average reward: {avg_reward}, win rate: {win_rate}.")
         return avg_reward, win_rate
 
-
     # ============================== Helper methods ==============================
 
+    def __new_progress(self, name: str, total_episodes: int) -> ProgressReporter:
+        return ProgressReporter(name, total_episodes, self.report_every, self.progress_sink,
+                                states_discovered=lambda: len(self.agent.Q))
+
+    def __finish_progress(self, progress: ProgressReporter) -> tuple[float, float]:
+        """
+        Report the final stats of a run.
+        :return: average reward and win rate per hand.
+        """
+        self.progress = progress
+        progress.finish()
+        if self.profiler is not None:
+            self.profiler.log_summary()
+        return progress.avg_reward, progress.win_rate
+
+    def __checkpoint(self, mode: LearnMode, episode: int, total_episodes: int,
+                     progress: ProgressReporter, starts: dict = None, epsilon: float = None) -> TrainingCheckpoint:
+        """
+        Snapshot of the run between two episodes, copied so the writer thread can save it later.
+        """
+        return TrainingCheckpoint(
+            mode=mode.name, episode=episode, total_episodes=total_episodes,
+            tables=self.agent.get_tables(),
+            rng_state=self.rng.get_state(), agent_rng_state=self.__own_agent_rng().get_state(),
+            deck_state=self.deck.get_state(),
+            progress={"episodes": progress.episodes, "hands": progress.hands,
+                      "reward_sum": progress.reward_sum, "wins": progress.wins},
+            starts=starts, epsilon=epsilon)
+
+    def __load_checkpoint(self, path: str, mode: LearnMode, total_episodes: int,
+                          epsilon: float = None) -> TrainingCheckpoint:
+        """
+        Checkpoint of an unfinished run with the same settings, None when there is nothing to resume.
+        A checkpoint of a finished run is ignored, the new run starts over and replaces it.
+        """
+        if path is None or not os.path.exists(path):
+            return None
+        checkpoint = TrainingCheckpoint.load(path)
+        if checkpoint.mode != mode.name:
+            raise ValueError(f"Checkpoint {path} is a {checkpoint.mode} run, not {mode.name}.")
+        if checkpoint.total_episodes != total_episodes:
+            raise ValueError(f"Checkpoint {path} is a run of {checkpoint.total_episodes} episodes, "
+                             f"not {total_episodes}.")
+        if checkpoint.epsilon != epsilon:
+            raise ValueError(f"Checkpoint {path} is a run with epsilon {checkpoint.epsilon}, not {epsilon}.")
+        if checkpoint.episode >= checkpoint.total_episodes:
+            logging.info(f"Checkpoint {path} is of a finished run, starting a new run.")
+            return None
+        return checkpoint
+
+    def __restore_checkpoint(self, checkpoint: TrainingCheckpoint, progress: ProgressReporter) -> int:
+        """
+        Put the agent, streams, deck and stats back to the checkpoint.
+        :return: index of the next episode.
+        """
+        self.agent.set_tables(checkpoint.tables)
+        self.rng.set_state(checkpoint.rng_state)
+        self.agent.rng.set_state(checkpoint.agent_rng_state)
+        self.deck.set_state(checkpoint.deck_state)
+        self.__shoe_cards = len(self.deck)
+        progress.add(**checkpoint.progress)
+        logging.info(f"Resumed from checkpoint at episode {checkpoint.episode}.")
+        return checkpoint.episode
+
     def __init_hands(self, cards: list[Card]):
         """
         Initialize the player and dealer hands with the given start cards.
@@ -207,103 +614,171 @@ class Dojo:
             [cards[1], cards[3]])
 
 
-    def __generate_exploring_starts(self):
-        start_state_actions: list[tuple[tuple, Action]] = []
-
-        delear_up_cards: list[Card] = [
-            Card(choice([suit for suit in Suit]), rank) for rank in Rank]
-
-        # agent cards
-        # have useable ace
-        player_first_cards = [Card(choice([suit for suit in Suit]), Rank.ACE)]
-        # second card can be any rank, maximum sum 21, two aces count as 12
-        player_second_cards = [Card(choice([suit for suit in Suit]), rank)
-                               for rank in Rank]
-
-        soft_start_cards = [(player_first_card, player_second_card, delar_card)
-                            for player_first_card, player_second_card, delar_card in product(
-            player_first_cards, player_second_cards, delear_up_cards)]
-        soft_actions = [Action.Stand, Action.Hit, Action.Double]
-        start_state_actions.extend(
-            [(state, action) for state, action in product(soft_start_cards, soft_actions)])
-
-        # have pair
-        player_first_cards = [
-            Card(choice([suit for suit in Suit]), rank) for rank in Rank]
-        split_cards = [(player_first_card, player_first_card, delar_card)
-                       for player_first_card, delar_card in product(player_first_cards, delear_up_cards)]
-        ten_points_cards = [Card(choice([suit for suit in Suit]), rank) for rank in [
-            Rank.TEN, Rank.JACK, Rank.KING, Rank.QUEEN]]
-        split_cards.extend([(player_1st_card, player_2ed_card, dealer_card)
-                           for player_1st_card, player_2ed_card, dealer_card
-                           in product(ten_points_cards, ten_points_cards, delear_up_cards)])
-        split_actions = [Action.Split, Action.Stand, Action.Hit, Action.Double]
-
-        start_state_actions.extend(
-            [(state, action) for state, action in product(split_cards, split_actions)])
-
-
-        # have no useable ace, no pair
-        player_first_cards = [Card(choice([suit for suit in Suit]), rank)
-                              for rank in Rank if rank != Rank.ACE]
-        player_second_cards = [Card(choice([suit for suit in Suit]), rank)
-                               for rank in Rank if rank != Rank.ACE]
-        hard_cards = [(player_first_card, player_second_card, delar_card) for
-                      player_first_card, player_second_card, delar_card in product(
-            player_first_cards, player_second_cards, delear_up_cards)]
-        hard_actions = [Action.Stand, Action.Hit, Action.Double]
-        start_state_actions.extend(
-            [(state, action) for state, action in product(hard_cards, hard_actions)])
-
-        # remove duplicates
-        return start_state_actions
-
     def __build_current_state(self) -> BaseState:
         """
         Build the base state from the current player and dealer hands.
         """
+        profiler = self.profiler
+        if profiler is not None:
+            start = perf_counter()
         try:
-            return BaseState(
+            state = intern_state(
                 player_sum=self.agent.get_hand().points,
                 dealer_card=self.dealer.get_face_point(),
                 usible_ace=self.agent.get_hand().is_soft,
-                splitable=self.agent.can_split()
+                splitable=self.agent.can_split(),
+                true_count=self.__true_count if self.count_states else 0
             )
         except ValueError as e:
             logging.error(f"Error building state: {e}")
             raise ValueError("Cannot build state from current hands.")
+        if profiler is not None:
+            profiler.add("build_state", start)
+        return state
+
+    def __play_hands(self, first_action: Action = None, stand_on_21: bool = False):
+        """
+        Let the agent play until all its hands are done.
+        :param first_action: Action taken on the first decision, for exploring starts.
+        :param stand_on_21: Finish hands of 21 or more without asking the agent.
+        """
+        profiler = self.profiler
+        if profiler is not None:
+            start = perf_counter()
+        if first_action is not None:
+            self.agent.first_play(self.__build_current_state(), first_action, self.deck)
+        while not self.agent.is_all_done():
+            if stand_on_21 and self.agent.get_hand().points >= 21:
+                self.agent.done_with_hand()
+                continue
+            self.agent.play(self.__build_current_state(), self.deck)
+        if profiler is not None:
+            profiler.add("agent_play", start)
+
+    def __dealer_hits(self):
+        profiler = self.profiler
+        if profiler is not None:
+            start = perf_counter()
+        self.dealer.hits(self.deck)
+        if profiler is not None:
+            profiler.add("dealer_hits", start)
+
+    def __start_episode(self, episode: int) -> RandomStream:
+        """
+        Get the shoe ready for episode `episode`.
+        With a run seed the agent and the shoe get the episode's own stream.
+        :return: stream for the other random draws of the episode.
+        """
+        profiler = self.profiler
+        if profiler is not None:
+            start, deck = perf_counter(), self.deck
+            # cards dealt from the old shoe, a refill starts the count over
+            self.__count_cards_dealt()
+        if self.__streams is None:
+            self.__refill_deck()
+            rng = self.rng
+        else:
+            # the agent already plays from the stream, see `__seeded_run`
+            rng = self.__streams.seek(episode)
+            if self.deck.rng is rng:
+                self.deck.reshuffle()
+            else:
+                self.deck = Deck(8, rng)
+            # cards of earlier rounds of the shoe
+            self.deck.discard(rng.below(len(self.deck) - RESHUFFLE_AT + 1))
+            self.__true_count = self.deck.true_count_bucket()
+        if profiler is not None:
+            profiler.add("refill_deck", start)
+            profiler.count("deck_refills", self.__streams is not None or self.deck is not deck)
+            self.__shoe_cards = len(self.deck)
+        return rng
+
+    @contextmanager
+    def __seeded_run(self):
+        """
+        With a run seed, let the agent draw from the episode streams and put its own stream back afterwards.
+        """
+        if self.__streams is None or self.__agent_rng is not None:
+            yield
+            return
+        self.__agent_rng, self.agent.rng = self.agent.rng, self.__streams.stream
+        try:
+            yield
+        finally:
+            self.agent.rng, self.__agent_rng = self.__agent_rng, None
+
+    def __own_agent_rng(self) -> RandomStream:
+        return self.__agent_rng if self.__agent_rng is not None else self.agent.rng
+
+    def __play_test_hands(self):
+        """
+        Deal a test episode from the current shoe and play the player's hands.
+        """
+        self.agent.clear_episode_history()
+        self.agent.set_bank_amount(1e10)
+        self.dealer.reset()
+
+        # deal initial cards
+        self.__init_hands([self.deck.deal_card() for _ in range(4)])
+        # run the game until the player has no hands left
+        self.__play_hands(stand_on_21=True)
+
+    def __test_rewards(self, expected_value: bool, verbose: bool) -> list[float]:
+        """
+        Finish the dealer's hand if needed and pay the player's hands out.
+        :return: reward of every hand.
+        """
+        if expected_value:
+            rewards = self.__compute_expected_reward()
+        else:
+            self.__dealer_hits()
+            if verbose:
+                self.__print_final_state()
+            # compute the reward
+            rewards = self.__compute_reward()
+        if verbose:
+            print(f"Gain reward:{sum(rewards)}")
+            print("=======================")
+        return rewards
 
     def __refill_deck(self):
         """
-        Refill the deck if it is empty.
+        Refill the deck if it is empty, then note the true count the round starts with.
         """
-        if len(self.deck.cards) < 30:
-            self.deck = Deck(8)
+        if len(self.deck) < RESHUFFLE_AT:
+            self.deck = Deck(8, self.rng)
             logging.debug("Deck refilled.")
+        self.__true_count = self.deck.true_count_bucket()
 
-    def __get_hand_reward(self, player_hand: PlayerHand) -> float:
+    def __reset_count_stats(self):
+        self.count_rewards[:] = 0
+        self.count_episodes[:] = 0
+
+    @staticmethod
+    def __get_hand_reward(player_hand: PlayerHand, dealer_points: int, dealer_blackjack: bool) -> float:
         main_bet_reward = 0
+        points = player_hand.points
         # blackjack
         if player_hand.is_blackjack():
-            if self.dealer.is_blackjack():
+            if dealer_blackjack:
                 main_bet_reward = 0
             else:
                 main_bet_reward = 1.5
-        elif self.dealer.is_blackjack():
+        elif dealer_blackjack:
             main_bet_reward = -1
         # bust
-        elif player_hand.is_bust():
+        elif points > 21:
             main_bet_reward = -1
         # win
-        elif self.dealer.is_bust():
+        elif dealer_points > 21:
             main_bet_reward = 1
-        elif player_hand.points > self.dealer.reveal_hand():
+        elif points > dealer_points:
             main_bet_reward = 1
         # lose
-        elif player_hand.points < self.dealer.reveal_hand():
+        elif points < dealer_points:
             main_bet_reward = -1
         # push
-        elif player_hand.points == self.dealer.reveal_hand():
+        else:
             main_bet_reward = 0
         # double
         if player_hand.doubled:
@@ -314,13 +789,64 @@ class Dojo:
         """
         Compute the reward
         """
-        rewards = [self.__get_hand_reward(hand)
-                   for hand in self.agent.get_all_hands()]
+        if self.profiler is not None:
+            start = perf_counter()
+        # the dealer is read once per episode, not once per hand and comparison
+        dealer_blackjack = self.dealer.is_blackjack()
+        dealer_points = self.dealer.reveal_hand()
+        hands = self.agent.get_all_hands()
+        rewards = [self.__get_hand_reward(hand, dealer_points, dealer_blackjack) for hand in hands]
+        if self.episode_log is not None:
+            self.episode_log.record(self.agent.all_histories, hands, rewards, dealer_points)
+        if self.profiler is not None:
+            self.__count_hands(hands)
         # disable insurance
         rewards.append(0)
         self.agent.pay_out(rewards)
+        if self.profiler is not None:
+            self.profiler.add("reward", start)
         return rewards[:-1]
 
+    def __compute_expected_reward(self):
+        """
+        Expected reward of every hand, the dealer's hole card is still unknown and stays in the shoe.
+        """
+        if self.profiler is not None:
+            start = perf_counter()
+        counts = self.deck.remaining_counts()
+        counts[self.dealer.get_hiden_card().point] += 1
+        dist = self.dealer_cache.get(self.dealer.get_face_point(), counts)
+        hands = self.agent.get_all_hands()
+        rewards = [expected_hand_reward(dist, hand.points, hand.is_blackjack(), hand.doubled)
+                   for hand in hands]
+        if self.episode_log is not None:
+            self.episode_log.record(self.agent.all_histories, hands, rewards)
+        if self.profiler is not None:
+            self.__count_hands(hands)
+        # disable insurance
+        rewards.append(0)
+        self.agent.pay_out(rewards)
+        if self.profiler is not None:
+            self.profiler.add("reward", start)
+        return rewards[:-1]
+
+    def __count_hands(self, hands: list[PlayerHand]):
+        """
+        Add the finished hands of the episode to the profiler's counters.
+        """
+        profiler = self.profiler
+        profiler.count("splits", len(hands) - 1)
+        profiler.count("doubles", sum(hand.doubled for hand in hands))
+        profiler.count("busts", sum(hand.is_bust() for hand in hands))
+        self.__count_cards_dealt()
+
+    def __count_cards_dealt(self):
+        """
+        Add the cards dealt from the shoe since the last call to the profiler's cards_dealt.
+        """
+        self.profiler.count("cards_dealt", self.__shoe_cards - len(self.deck))
+        self.__shoe_cards = len(self.deck)
+
     def __print_final_state(self):
         print("\nFinal state:")
         print("Dealer's hand:", self.dealer.get_hand())
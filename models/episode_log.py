@@ -0,0 +1,199 @@
+"""
+Columnar log of played episodes for offline analysis.
+A log is a directory with one raw little endian file per column and a schema.json
+holding the dtypes and row counts, so a whole log loads with `np.fromfile`/`np.memmap`
+and goes into pandas as `pd.DataFrame(load_episode_log(path)["hands"])`.
+
+Two tables are written:
+- steps: one row per (state, action) the agent took.
+- hands: one row per finished hand, with its reward.
+Rows are buffered in fixed-size arrays and appended to the column files a batch at a time.
+"""
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+from .hand import PlayerHand
+from .agent import EpisodeHistory
+
+LOG_FORMAT = "blackjack-episode-log"
+LOG_VERSION = 3
+SCHEMA_FILE = "schema.json"
+NO_DEALER_TOTAL = -1
+
+LOG_TABLES: dict[str, dict[str, str]] = {
+    "steps": {
+        "episode": "<i8",
+        "hand": "<i1",
+        "player_sum": "<i1",
+        "dealer_card": "<i1",
+        "usible_ace": "|b1",
+        "splitable": "|b1",
+        # true count bucket of the state, 0 when the agent does not count
+        "true_count": "<i1",
+        "action": "<i1",
+    },
+    "hands": {
+        "episode": "<i8",
+        "hand": "<i1",
+        "reward": "<f4",
+        "doubled": "|b1",
+        # number of splits the hand went through, 0 for a hand that was never split
+        "split_depth": "<i1",
+        # the episode had a split, the same for all its hands
+        "episode_split": "|b1",
+        # dealer's final points, NO_DEALER_TOTAL when the dealer's hand was not played out
+        "dealer_total": "<i1",
+    },
+}
+
+
+def _column_path(directory: str, table: str, column: str) -> str:
+    return os.path.join(directory, f"{table}.{column}.bin")
+
+
+class _TableBuffer(object):
+    """
+    Fixed-size column buffers of one table.
+    """
+
+    def __init__(self, columns: dict[str, str], size: int):
+        self.columns = {name: np.zeros(size, dtype=dtype) for name, dtype in columns.items()}
+        self.size = size
+        self.length = 0
+
+    def full(self) -> bool:
+        return self.length == self.size
+
+
+class EpisodeLogWriter(object):
+    """
+    Append episodes to the log in `directory`, see the module docstring.
+    Memory use is bounded by `batch_size` rows per table.
+    :param append: Continue an existing log instead of replacing it.
+    """
+
+    def __init__(self, directory: str, batch_size: int = 65536, append: bool = False):
+        if batch_size <= 0:
+            raise ValueError("Batch size must be positive.")
+        self.directory = directory
+        self.batch_size = batch_size
+        self.episodes = 0
+        self.rows = {table: 0 for table in LOG_TABLES}
+        os.makedirs(directory, exist_ok=True)
+        if append and os.path.exists(os.path.join(directory, SCHEMA_FILE)):
+            schema = read_schema(directory)
+            self.episodes = schema["episodes"]
+            self.rows = {table: spec["rows"] for table, spec in schema["tables"].items()}
+            # drop rows of a batch that was only partly written
+            for table, columns in LOG_TABLES.items():
+                for column, dtype in columns.items():
+                    with open(_column_path(directory, table, column), "ab") as f:
+                        f.truncate(self.rows[table] * np.dtype(dtype).itemsize)
+        else:
+            for table, columns in LOG_TABLES.items():
+                for column in columns:
+                    open(_column_path(directory, table, column), "wb").close()
+            self.__write_schema()
+        self.__buffers = {table: _TableBuffer(columns, batch_size) for table, columns in LOG_TABLES.items()}
+
+    def record(self, histories: list[EpisodeHistory], hands: list[PlayerHand],
+               rewards: list[float], dealer_total: int = NO_DEALER_TOTAL):
+        """
+        Log one episode.
+        :param histories: The agent's (state, action) history of every hand.
+        :param hands: Finished hands, in the same order as `histories` and `rewards`.
+        :param dealer_total: Dealer's final points, NO_DEALER_TOTAL when the dealer did not play.
+        """
+        episode = self.episodes
+        episode_split = len(hands) > 1
+        for i, history in enumerate(histories):
+            for state, action in history.state_action_history:
+                self.__append("steps", episode, i, state.player_sum, state.dealer_card,
+                              state.usible_ace, state.splitable, state.true_count, action.value)
+        for i, (hand, reward) in enumerate(zip(hands, rewards)):
+            self.__append("hands", episode, i, reward, hand.doubled, hand.split_depth, episode_split,
+                          dealer_total)
+        self.episodes += 1
+
+    def flush(self):
+        """
+        Append the buffered rows to the column files and update the schema.
+        """
+        for table, buffer in self.__buffers.items():
+            if buffer.length == 0:
+                continue
+            for column, values in buffer.columns.items():
+                with open(_column_path(self.directory, table, column), "ab") as f:
+                    values[:buffer.length].tofile(f)
+            self.rows[table] += buffer.length
+            buffer.length = 0
+        self.__write_schema()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __append(self, table: str, *row):
+        buffer = self.__buffers[table]
+        for values, value in zip(buffer.columns.values(), row):
+            values[buffer.length] = value
+        buffer.length += 1
+        if buffer.full():
+            self.flush()
+
+    def __write_schema(self):
+        schema = {
+            "format": LOG_FORMAT,
+            "version": LOG_VERSION,
+            "episodes": self.episodes,
+            "tables": {table: {"rows": self.rows[table], "columns": columns}
+                       for table, columns in LOG_TABLES.items()},
+        }
+        path = os.path.join(self.directory, SCHEMA_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(schema, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+
+def read_schema(directory: str) -> dict:
+    with open(os.path.join(directory, SCHEMA_FILE)) as f:
+        schema = json.load(f)
+    if schema.get("format") != LOG_FORMAT:
+        raise ValueError(f"{directory} is not an episode log.")
+    if schema["version"] != LOG_VERSION:
+        raise ValueError(f"Unsupported episode log version {schema['version']}.")
+    return schema
+
+
+def load_episode_log(directory: str, mmap: bool = True,
+                     tables: Optional[list[str]] = None) -> dict[str, dict[str, np.ndarray]]:
+    """
+    Columns of a log written by `EpisodeLogWriter`, as {table: {column: array}}.
+    Only rows recorded in the schema are returned, rows still buffered by a running writer are not.
+    :param mmap: Map the column files read-only instead of reading them.
+    """
+    schema = read_schema(directory)
+    result = {}
+    for table, spec in schema["tables"].items():
+        if tables is not None and table not in tables:
+            continue
+        rows = spec["rows"]
+        columns = {}
+        for column, dtype in spec["columns"].items():
+            path = _column_path(directory, table, column)
+            if rows == 0:
+                columns[column] = np.zeros(0, dtype=dtype)
+            elif mmap:
+                columns[column] = np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
+            else:
+                columns[column] = np.fromfile(path, dtype=dtype, count=rows)
+        result[table] = columns
+    return result
@@ -1,52 +1,96 @@
 from .card import Card, Rank, Suit
+from dataclasses import dataclass
 import itertools
 
 
+def _potential_points(cards) -> list[int]:
+    total = 0
+    ace_count = 0
+    for card in cards:
+        if card.rank is not Rank.ACE:
+            total += card.point
+        else:
+            ace_count += 1
+    potential_points = [total + i +
+                        (ace_count-i)*11 for i in range(ace_count+1)]
+    if potential_points[-1] > 21:
+        # if all combinations are over 21, return the last one
+        return potential_points[-1:]
+    potential_points = [point for point in potential_points if point <= 21]
+    return potential_points
+
+
 class Hand(object):
-    def __init__(self, cards:list[Card]):
-        self.is_soft: bool = False
+    """
+    Cards of one hand.
+    The hard total (aces as 1) and the ace count are kept up to date by every card change,
+    so reading points and softness does not walk the cards.
+    """
 
+    def __init__(self, cards:list[Card]):
         if not (1 <= len(cards) <= 2):
             raise ValueError("Wrong cards number!")
         self.cards: list[Card] = cards
+        self.__hard_total: int = 0
+        self.__ace_count: int = 0
+        for card in cards:
+            self.__count_in(card)
+
+    def reset(self, cards: list[Card]):
+        """
+        Reuse this hand for new cards, the cards list is refilled in place.
+        """
+        if not (1 <= len(cards) <= 2):
+            raise ValueError("Wrong cards number!")
+        if cards is self.cards:
+            # copied before the list is cleared, `hand.reset(hand.cards)` keeps its cards
+            cards = list(cards)
+        self.cards.clear()
+        self.__hard_total = 0
+        self.__ace_count = 0
+        for card in cards:
+            self.add_card(card)
 
     def add_card(self, card:Card):
         self.cards.append(card)
-
-    def __evalue(self):
-        total = 0
-        ace_count = 0
-        # consider multi ace scenario
-        for card in self.cards:
-            total += card.point
-            ace_count += int(card.rank is Rank.ACE)
-        
-        # count on 11 as many as possible
-        while total > 21 and ace_count > 0:
-            total -= 10
-            ace_count -= 1
-        self.is_soft = ace_count > 0
-        return total
+        self.__count_in(card)
+
+    def insert_card(self, index: int, card: Card):
+        self.cards.insert(index, card)
+        self.__count_in(card)
+
+    def pop_card(self, index: int = -1) -> Card:
+        card = self.cards.pop(index)
+        self.__count_out(card)
+        return card
+
+    def __count_in(self, card: Card):
+        if card.rank is Rank.ACE:
+            self.__hard_total += 1
+            self.__ace_count += 1
+        else:
+            self.__hard_total += card.point
+
+    def __count_out(self, card: Card):
+        if card.rank is Rank.ACE:
+            self.__hard_total -= 1
+            self.__ace_count -= 1
+        else:
+            self.__hard_total -= card.point
 
     def __potential_evalue(self):
-        total = 0
-        ace_count = 0
-        for card in self.cards:
-            if card.rank is not Rank.ACE:
-                total += card.point
-            else:
-                ace_count += 1
-        potential_points = [total + i +
-                            (ace_count-i)*11 for i in range(ace_count+1)]
-        if potential_points[-1] > 21:
-            # if all combinations are over 21, return the last one
-            return potential_points[-1:]
-        potential_points = [point for point in potential_points if point <= 21]
-        return potential_points
+        return _potential_points(self.cards)
 
     @property
     def points(self):
-        return self.__evalue()
+        # at most one ace can count as 11
+        if self.__ace_count and self.__hard_total <= 11:
+            return self.__hard_total + 10
+        return self.__hard_total
+
+    @property
+    def is_soft(self) -> bool:
+        return self.__ace_count > 0 and self.__hard_total <= 11
 
     @property
     def potiential_points(self):
@@ -68,6 +112,36 @@ class Hand(object):
     def __eq__(self, value):
         return isinstance(value, Hand) and self.potiential_points == value.potiential_points
 
+    def snapshot(self) -> "HandSnapshot":
+        return HandSnapshot(tuple(self.cards), self.points, self.is_soft)
+
+
+@dataclass(frozen=True)
+class HandSnapshot:
+    """
+    Read-only copy of a hand at one moment, cheap to make since cards are immutable.
+    """
+    cards: tuple[Card, ...]
+    points: int
+    is_soft: bool
+
+    @property
+    def potiential_points(self):
+        return _potential_points(self.cards)
+
+    def is_blackjack(self):
+        return len(self.cards) == 2 and self.points == 21
+
+    def is_bust(self):
+        return self.points > 21
+
+    def __str__(self):
+        res = ""
+        for card in self.cards:
+            res += f"{card}, "
+        res += f"Points: {self.potiential_points}"
+        return res
+
 
 class PlayerHand(Hand):
     def __init__(self, cards: list[Card], chips_bet_on: int):
@@ -79,6 +153,23 @@ class PlayerHand(Hand):
         self.__bet = chips_bet_on
         self.__doubled = False
         self.__is_initial = True
+        # number of splits this hand went through
+        self.__split_depth = 0
+
+    def reset(self, cards: list[Card], chips_bet_on: int = None):
+        """
+        Reuse this hand for new cards and a new bet, the current bet is kept when not given.
+        """
+        if chips_bet_on is not None:
+            if not isinstance(chips_bet_on, int):
+                raise ValueError("Bet amount must be an integer!")
+            if chips_bet_on < 0:
+                raise ValueError("Bet amount must be positive!")
+            self.__bet = chips_bet_on
+        super().reset(cards)
+        self.__doubled = False
+        self.__is_initial = True
+        self.__split_depth = 0
 
     @property
     def bet(self):
@@ -97,6 +188,10 @@ class PlayerHand(Hand):
     def doubled(self):
         return self.__doubled
 
+    @property
+    def split_depth(self) -> int:
+        return self.__split_depth
+
     def add_bet(self, bet_amount):
         if not isinstance(bet_amount, int):
             raise ValueError("Bet amount must be an integer!")
@@ -113,10 +208,21 @@ class PlayerHand(Hand):
         return len(self.cards) == 2 and self.cards[0].point == self.cards[1].point
 
     # TODO its better to split as player
-    def split(self):
+    def split(self, into: "PlayerHand" = None):
+        """
+        Move the second card to a new hand with the same bet.
+        Both hands are one split deeper than this hand was.
+        :param into: Spare hand to reuse instead of allocating a new one.
+        """
         if not self.has_pair():
             raise ValueError("Have No pair!")
-        return PlayerHand([self.cards.pop(1)], self.__bet)
+        if into is None:
+            into = PlayerHand([self.pop_card(1)], self.__bet)
+        else:
+            into.reset([self.pop_card(1)], self.__bet)
+        self.__split_depth += 1
+        into.__split_depth = self.__split_depth
+        return into
 
 
 if __name__ == "__main__":
@@ -0,0 +1,128 @@
+"""
+Progress reporting for Dojo runs.
+Results are aggregated per episode and only reported every `every` episodes,
+so instrumentation costs a few additions per episode instead of a log line.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+@dataclass
+class ProgressStats:
+    name: str
+    episodes: int
+    total_episodes: int
+    hands: int
+    avg_reward: float
+    win_rate: float
+    episodes_per_sec: float
+    states_discovered: int
+    final: bool
+
+    def __str__(self):
+        total = f"/{self.total_episodes}" if self.total_episodes > 0 else ""
+        return (f"{self.name}: episode {self.episodes}{total}, {self.episodes_per_sec:.0f} episodes/s, "
+                f"average reward: {self.avg_reward:.4f}, win rate: {self.win_rate:.4f}, "
+                f"states discovered: {self.states_discovered}")
+
+
+def log_sink(stats: ProgressStats):
+    logging.info("%s", stats)
+
+
+class RateLimitedSink(object):
+    """
+    Forward stats to `sink` at most once every `min_interval` seconds.
+    Final stats are always forwarded.
+    """
+
+    def __init__(self, sink: Callable[[ProgressStats], None], min_interval: float = 1.0):
+        self.sink = sink
+        self.min_interval = min_interval
+        self.__last_emit = float("-inf")
+
+    def __call__(self, stats: ProgressStats):
+        now = time.perf_counter()
+        if stats.final or now - self.__last_emit >= self.min_interval:
+            self.__last_emit = now
+            self.sink(stats)
+
+
+class ProgressReporter(object):
+    """
+    Running totals of a train or test run, reported to `sink` every `every` episodes.
+    :param every: Episodes between reports, 0 only reports the final stats.
+    :param sink: Receives ProgressStats, logs at INFO level by default.
+    :param states_discovered: Returns the number of states the agent has seen so far.
+    """
+
+    def __init__(self, name: str, total_episodes: int = -1, every: int = 10000,
+                 sink: Optional[Callable[[ProgressStats], None]] = None,
+                 states_discovered: Optional[Callable[[], int]] = None):
+        self.name = name
+        self.total_episodes = total_episodes
+        self.every = every
+        self.sink = sink if sink is not None else log_sink
+        self.states_discovered = states_discovered
+
+        self.episodes = 0
+        self.hands = 0
+        self.reward_sum = 0.0
+        self.wins = 0
+        self.__start = time.perf_counter()
+        self.__next_report = every if every > 0 else -1
+
+    def update(self, rewards: list[float]):
+        """
+        Add the per-hand rewards of one episode.
+        """
+        self.episodes += 1
+        self.hands += len(rewards)
+        for reward in rewards:
+            self.reward_sum += reward
+            if reward > 0:
+                self.wins += 1
+        if self.episodes == self.__next_report:
+            self.__next_report += self.every
+            self.sink(self.stats())
+
+    def add(self, episodes: int, hands: int, reward_sum: float, wins: int):
+        """
+        Add totals of several episodes at once, e.g. from a worker process.
+        """
+        self.episodes += episodes
+        self.hands += hands
+        self.reward_sum += reward_sum
+        self.wins += wins
+        if self.__next_report > 0 and self.episodes >= self.__next_report:
+            self.__next_report = (self.episodes // self.every + 1) * self.every
+            self.sink(self.stats())
+
+    def finish(self) -> ProgressStats:
+        stats = self.stats(final=True)
+        self.sink(stats)
+        return stats
+
+    @property
+    def avg_reward(self) -> float:
+        return self.reward_sum / self.hands if self.hands else 0.0
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.hands if self.hands else 0.0
+
+    def stats(self, final: bool = False) -> ProgressStats:
+        elapsed = time.perf_counter() - self.__start
+        return ProgressStats(
+            name=self.name,
+            episodes=self.episodes,
+            total_episodes=self.total_episodes,
+            hands=self.hands,
+            avg_reward=self.avg_reward,
+            win_rate=self.win_rate,
+            episodes_per_sec=self.episodes / elapsed if elapsed > 0 else 0.0,
+            states_discovered=self.states_discovered() if self.states_discovered else 0,
+            final=final,
+        )
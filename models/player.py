@@ -5,14 +5,21 @@ from .deck import Deck
 MAX_SPLIT_NUM = 3
 
 class Player(object):
-    def __init__(self, id: int, bank_money: int):
+    def __init__(self, id: int, bank_money: int, reuse: bool = False):
+        """
+        :param reuse: Keep finished hands after `pay_out` and reset them in place for the next rounds
+            instead of allocating new ones. Lists returned by `get_all_hands` are then cleared by `pay_out`.
+        """
         if not isinstance(bank_money, int) or bank_money <= 0:
             raise ValueError("Bank money must be a positive integer!")
         self.__id = id
         self.__bank = bank_money
+        self.reuse = reuse
 
         self.__hand = None
         self.__all_hands = []
+        # spare hands for the reuse mode
+        self.__hand_pool: list[PlayerHand] = []
 
         # split related
         self.__split_num = MAX_SPLIT_NUM  # max split hands
@@ -34,7 +41,11 @@ class Player(object):
         if bet_money > self.__bank:
             raise ValueError("Don't have enough chips to bet!!!")
         self.__main_bet = bet_money
-        self.__hand = PlayerHand(cards, bet_money)
+        if self.__hand_pool:
+            self.__hand = self.__hand_pool.pop()
+            self.__hand.reset(cards, bet_money)
+        else:
+            self.__hand = PlayerHand(cards, bet_money)
         self.__bank -= bet_money
 
     def get_bank_amount(self):
@@ -98,7 +109,8 @@ class Player(object):
             raise ValueError("Don't have enough chips!!!")
 
         # Add card to 2
-        splited_hand = self.__hand.split()
+        splited_hand = self.__hand.split(
+            self.__hand_pool.pop() if self.__hand_pool else None)
         splited_hand.add_card(card1)
         self.__hand.add_card(card2)
 
@@ -184,8 +196,13 @@ class Player(object):
 
     def __reset(self):
         self.__hand = None
-        self.__splited_hands = []
-        self.__all_hands = []
+        if self.reuse:
+            self.__hand_pool.extend(self.__all_hands)
+            self.__splited_hands.clear()
+            self.__all_hands.clear()
+        else:
+            self.__splited_hands = []
+            self.__all_hands = []
         self.__insuranced = 0
         self.__main_bet = 0
         self.__split_num = 3
@@ -0,0 +1,76 @@
+"""
+Frozen policies for inference.
+A CompiledPolicy is a decision table indexed by state code (see `qtable.state_index`)
+and whether the hand can still double, so playing a hand is one array lookup and
+nothing learned is read or written while testing.
+"""
+from typing import Optional
+
+import numpy as np
+
+from .qtable import QTable, N_ACTIONS, N_STATES, NO_ACTION, ACTIONS, MAX_POINTS, MAX_DEALER_CARD, state_index
+from .utils import Action, BaseState
+
+
+class CompiledPolicy(object):
+    """
+    Action for every (state, can double) pair, always one the hand is allowed to take.
+    Build it with `compile`, it is read only afterwards and can be pickled to worker processes.
+    """
+
+    def __init__(self, actions: np.ndarray):
+        """
+        :param actions: Action values indexed by [state code, can double].
+        """
+        self.actions = actions
+        self.actions.setflags(write=False)
+
+    @classmethod
+    def compile(cls, tables: QTable, fallback: Optional[dict[BaseState, Action]] = None) -> "CompiledPolicy":
+        """
+        Take the learned policy where it is allowed, otherwise the allowed action with the best seen Q value.
+        States without either use `fallback` (e.g. `solver.solve().policy`),
+        then stand on hard 17 or soft 18 and more, hit below.
+        Fallback states without a count apply to every true count.
+        """
+        n_states = len(tables.policy)
+        codes = np.arange(n_states)
+        splitable = (codes % 2).astype(bool)
+        soft = (codes // 2 % 2).astype(bool)
+        player_sum = codes // 4 // MAX_DEALER_CARD % MAX_POINTS
+        rule = np.where(player_sum >= np.where(soft, 18, 17), Action.Stand.value, Action.Hit.value)
+
+        actions = np.empty((n_states, 2), dtype=np.int8)
+        for can_double in (False, True):
+            legal = np.zeros((n_states, N_ACTIONS), dtype=bool)
+            legal[:, Action.Stand.value] = True
+            legal[:, Action.Hit.value] = True
+            legal[:, Action.Split.value] = splitable
+            legal[:, Action.Double.value] = can_double
+
+            chosen = rule.astype(np.int8)
+            if fallback:
+                for state, action in fallback.items():
+                    index = state_index(state)
+                    if not legal[index, action.value]:
+                        continue
+                    if state.true_count == 0:
+                        # the same state in every count block
+                        chosen[index % N_STATES::N_STATES] = action.value
+                    else:
+                        chosen[index] = action.value
+
+            seen = tables.seen & legal
+            best = np.argmax(np.where(seen, tables.values, -np.inf), axis=1)
+            chosen = np.where(seen.any(axis=1), best, chosen)
+
+            learned = tables.policy.astype(np.int64)
+            allowed = (learned != NO_ACTION) & legal[codes, np.maximum(learned, 0)]
+            actions[:, int(can_double)] = np.where(allowed, learned, chosen)
+        return cls(actions)
+
+    def action(self, state: BaseState, can_double: bool) -> Action:
+        return ACTIONS[self.actions[state_index(state), int(can_double)]]
+
+    def __len__(self):
+        return len(self.actions)
@@ -0,0 +1,74 @@
+"""
+Opt-in profiling of Dojo runs.
+A Dojo created with a Profiler times its phases with explicit hooks,
+without one each hook is a single `is not None` check.
+Phases are cumulative wall time and call counts, they nest (e.g. `build_state` runs inside
+`agent_play`), so their shares can add up to more than 100%.
+"""
+import json
+import logging
+import os
+from collections import defaultdict
+from time import perf_counter
+
+
+class Profiler(object):
+    """
+    Per-phase cumulative time and calls, plus event counters
+    (cards_dealt, deck_refills, splits, doubles, busts), see `Dojo` for the phases.
+    """
+
+    def __init__(self):
+        self.times: dict[str, float] = defaultdict(float)
+        self.calls: dict[str, int] = defaultdict(int)
+        self.counters: dict[str, int] = defaultdict(int)
+        self.__start = perf_counter()
+
+    def reset(self):
+        self.times.clear()
+        self.calls.clear()
+        self.counters.clear()
+        self.__start = perf_counter()
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] += n
+
+    def add(self, name: str, start: float):
+        """
+        Add the time since `start`, a `perf_counter` value, to phase `name`.
+        """
+        self.times[name] += perf_counter() - start
+        self.calls[name] += 1
+
+    def to_dict(self) -> dict:
+        elapsed = perf_counter() - self.__start
+        counters = dict(self.counters)
+        return {
+            "elapsed_s": elapsed,
+            "phases": {name: {"calls": self.calls[name], "total_s": total,
+                              "per_call_us": total / self.calls[name] * 1e6 if self.calls[name] else 0.0,
+                              "share": total / elapsed if elapsed > 0 else 0.0}
+                       for name, total in sorted(self.times.items(), key=lambda item: -item[1])},
+            "counters": counters,
+        }
+
+    def save_json(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def summary(self) -> str:
+        """
+        Phases by total time, then the counters, as a text table.
+        """
+        data = self.to_dict()
+        lines = [f"Profile of {data['elapsed_s']:.3f}s",
+                 f"{'phase':<14}{'calls':>12}{'total s':>10}{'us/call':>10}{'share':>8}"]
+        for name, phase in data["phases"].items():
+            lines.append(f"{name:<14}{phase['calls']:>12}{phase['total_s']:>10.3f}"
+                         f"{phase['per_call_us']:>10.2f}{phase['share']:>8.1%}")
+        lines.extend(f"{name:<14}{value:>12}" for name, value in sorted(data["counters"].items()))
+        return "\n".join(lines)
+
+    def log_summary(self):
+        logging.info("%s", self.summary())
@@ -0,0 +1,396 @@
+"""
+Dense tabular storage for the agent.
+States are small and bounded, so Q values, visit counts, the policy and the
+action space live in NumPy arrays indexed by an integer state code.
+The *View classes give the arrays the dict interface the rest of the code uses,
+e.g. `agent.Q[state][action]` and `state in agent.policy`.
+"""
+import json
+import os
+import struct
+from typing import Optional
+
+import numpy as np
+
+from .utils import Action, BaseState, MAX_TRUE_COUNT, N_COUNT_BUCKETS, MAX_POINTS, MAX_DEALER_CARD, intern_state
+
+N_STATES = MAX_POINTS * MAX_DEALER_CARD * 2 * 2
+# a counting table holds one block of N_STATES per true count bucket
+N_COUNT_STATES = N_STATES * N_COUNT_BUCKETS
+N_ACTIONS = len(Action)
+NO_ACTION = -1
+
+ACTIONS: tuple[Action, ...] = tuple(sorted(Action, key=lambda action: action.value))
+
+# table file: FILE_MAGIC, header length (uint32), JSON header, then the arrays.
+# Every array starts at a multiple of FILE_ALIGNMENT so it can be memory mapped.
+FILE_MAGIC = b"BJQTABLE"
+FILE_VERSION = 1
+FILE_ALIGNMENT = 64
+# array name -> dtype in the file, Q values are stored exactly unless `save` is asked for float32
+FILE_ARRAYS: dict[str, str] = {"values": "<f8", "counts": "<i8", "seen": "|b1",
+                               "policy": "|i1", "action_space": "|b1"}
+
+
+def state_index(state: BaseState) -> int:
+    """
+    Integer code of a state, same layout as `batch.compile_policy`:
+    [player_sum, dealer_card, usible_ace, splitable] in C order.
+    The true count picks the block, negative counts wrap around like Python indices,
+    so states without a count stay in the first block and fit a table without counting.
+    This is `BaseState.id`, computed once per state.
+    """
+    return state.id
+
+
+def index_state(index: int) -> BaseState:
+    index, splitable = divmod(index, 2)
+    index, usible_ace = divmod(index, 2)
+    index, dealer_card = divmod(index, MAX_DEALER_CARD)
+    block, player_sum = divmod(index, MAX_POINTS)
+    true_count = block if block <= MAX_TRUE_COUNT else block - N_COUNT_BUCKETS
+    return intern_state(player_sum, dealer_card, usible_ace, splitable, true_count)
+
+
+def _align(offset: int) -> int:
+    return -(-offset // FILE_ALIGNMENT) * FILE_ALIGNMENT
+
+
+def read_header(path: str) -> dict:
+    """
+    JSON header of a table file, see `QTable.save`.
+    """
+    with open(path, "rb") as f:
+        return _read_header(f, path)
+
+
+def _read_header(f, path: str) -> dict:
+    if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+        raise ValueError(f"{path} is not a Q table file.")
+    (length,) = struct.unpack("<I", f.read(4))
+    header = json.loads(f.read(length).decode("utf-8"))
+    if header["version"] != FILE_VERSION:
+        raise ValueError(f"Unsupported Q table file version {header['version']}.")
+    if header["n_states"] not in (N_STATES, N_COUNT_STATES) or header["actions"] != [action.name for action in ACTIONS]:
+        raise ValueError("Q table file was written with a different state or action layout.")
+    header["data_offset"] = _align(len(FILE_MAGIC) + 4 + length)
+    return header
+
+
+class QTable(object):
+    """
+    Q values, visit counts, greedy policy and possible actions of every state.
+    :param counting: Also index states by their true count bucket.
+    """
+
+    def __init__(self, counting: bool = False):
+        n_states = N_COUNT_STATES if counting else N_STATES
+        self.values = np.zeros((n_states, N_ACTIONS), dtype=np.float64)
+        self.counts = np.zeros((n_states, N_ACTIONS), dtype=np.int64)
+        # (state, action) pairs that have a Q value or count
+        self.seen = np.zeros((n_states, N_ACTIONS), dtype=bool)
+        self.policy = np.full(n_states, NO_ACTION, dtype=np.int8)
+        self.action_space = np.zeros((n_states, N_ACTIONS), dtype=bool)
+
+    @property
+    def counting(self) -> bool:
+        return len(self.policy) == N_COUNT_STATES
+
+    def copy(self) -> "QTable":
+        table = QTable.__new__(QTable)
+        table.values = self.values.copy()
+        table.counts = self.counts.copy()
+        table.seen = self.seen.copy()
+        table.policy = self.policy.copy()
+        table.action_space = self.action_space.copy()
+        return table
+
+    def add_return(self, state: int, action: int, episode_return: float):
+        """
+        Add one return of a (state, action) pair to its incremental mean.
+        """
+        count = self.counts[state, action] + 1
+        self.counts[state, action] = count
+        self.values[state, action] += (episode_return - self.values[state, action]) / count
+        self.seen[state, action] = True
+
+    def greedy_action(self, state: int) -> int:
+        """
+        Action with the highest Q value among the seen actions of one state.
+        """
+        values = self.values[state].tolist()
+        return max((a for a, seen in enumerate(self.seen[state].tolist()) if seen),
+                   key=values.__getitem__)
+
+    def add_returns(self, states: np.ndarray, actions: np.ndarray, returns: np.ndarray) -> np.ndarray:
+        """
+        Add one return per (state, action) pair to the incremental means.
+        Pairs may repeat, the result doesn't depend on their order.
+        :return: the updated states.
+        """
+        pairs, inverse = np.unique(states * N_ACTIONS + actions, return_inverse=True)
+        returns_sum = np.bincount(inverse, weights=returns)
+        visits = np.bincount(inverse)
+        rows, cols = np.divmod(pairs, N_ACTIONS)
+
+        old_counts = self.counts[rows, cols]
+        new_counts = old_counts + visits
+        self.values[rows, cols] = (self.values[rows, cols] * old_counts + returns_sum) / new_counts
+        self.counts[rows, cols] = new_counts
+        self.seen[rows, cols] = True
+        return np.unique(rows)
+
+    def greedy(self, states: np.ndarray) -> np.ndarray:
+        """
+        Action with the highest Q value among the seen actions of each state.
+        """
+        values = np.where(self.seen[states], self.values[states], -np.inf)
+        return np.argmax(values, axis=1).astype(np.int8)
+
+    def merge(self, base: "QTable", workers: list["QTable"]):
+        """
+        Merge tables learned by workers that all started from `base`.
+        Q is an incremental mean, so each worker's new returns are Q*count minus base Q*count.
+        The merged Q equals learning from all workers' episodes in one table.
+        """
+        base_sum = base.values * base.counts
+        returns_sum = base_sum.copy()
+        counts = base.counts.copy()
+        seen = base.seen.copy()
+        action_space = base.action_space.copy()
+        for table in workers:
+            returns_sum += table.values * table.counts - base_sum
+            counts += table.counts - base.counts
+            seen |= table.seen
+            action_space |= table.action_space
+
+        # pairs set without any visit keep the value of the last worker that set them
+        values = base.values.copy()
+        for table in workers:
+            values = np.where(table.seen & (table.counts == 0), table.values, values)
+        self.policy[:] = NO_ACTION
+        self.values[:] = np.where(counts > 0, returns_sum / np.maximum(counts, 1), values)
+        self.counts[:] = counts
+        self.seen[:] = seen
+        self.action_space[:] = action_space
+        rows = np.flatnonzero(seen.any(axis=1))
+        self.policy[rows] = self.greedy(rows)
+
+    def save(self, path: str, metadata: Optional[dict] = None, values_dtype: str = FILE_ARRAYS["values"]):
+        """
+        Write the table to a binary file, replacing it atomically.
+        :param metadata: JSON serializable extra information stored in the header.
+        :param values_dtype: dtype of the stored Q values, "<f4" halves their size but rounds them.
+        """
+        dtypes = dict(FILE_ARRAYS, values=values_dtype)
+        arrays = []
+        offset = 0
+        for name, dtype in dtypes.items():
+            array = np.ascontiguousarray(getattr(self, name), dtype=dtype)
+            arrays.append((array, offset))
+            offset = _align(offset + array.nbytes)
+        header = {
+            "version": FILE_VERSION,
+            "n_states": len(self.policy),
+            "state_layout": (["true_count"] if self.counting else [])
+            + ["player_sum", "dealer_card", "usible_ace", "splitable"],
+            "state_shape": ([N_COUNT_BUCKETS] if self.counting else []) + [MAX_POINTS, MAX_DEALER_CARD, 2, 2],
+            "actions": [action.name for action in ACTIONS],
+            "arrays": [{"name": name, "dtype": dtype, "shape": list(array.shape), "offset": array_offset}
+                       for (name, dtype), (array, array_offset) in zip(dtypes.items(), arrays)],
+            "metadata": metadata or {},
+        }
+        encoded = json.dumps(header).encode("utf-8")
+        data_offset = _align(len(FILE_MAGIC) + 4 + len(encoded))
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(FILE_MAGIC)
+            f.write(struct.pack("<I", len(encoded)))
+            f.write(encoded)
+            for array, array_offset in arrays:
+                f.seek(data_offset + array_offset)
+                f.write(array.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def open(cls, path: str, mmap: bool = False) -> "QTable":
+        """
+        Read a table written by `save`.
+        :param mmap: Map the arrays copy-on-write instead of reading them, so processes opening
+            the same file share its pages. Q values then keep the dtype they were stored with.
+        """
+        return cls.open_with_header(path, mmap)[0]
+
+    @classmethod
+    def open_with_header(cls, path: str, mmap: bool = False) -> tuple["QTable", dict]:
+        """
+        Same as `open`, also returns the header. Both come from the same open file,
+        so they match even when the file is replaced meanwhile.
+        """
+        table = cls.__new__(cls)
+        with open(path, "rb") as f:
+            header = _read_header(f, path)
+            for spec in header["arrays"]:
+                offset = header["data_offset"] + spec["offset"]
+                shape = tuple(spec["shape"])
+                if mmap:
+                    array = np.memmap(f, dtype=spec["dtype"], mode="c", offset=offset, shape=shape)
+                else:
+                    f.seek(offset)
+                    array = np.fromfile(f, dtype=spec["dtype"], count=int(np.prod(shape))).reshape(shape)
+                    if spec["name"] == "values":
+                        array = array.astype(np.float64)
+                setattr(table, spec["name"], array)
+        return table, header
+
+    def load(self, other: "QTable"):
+        """
+        Copy another table into this one.
+        Arrays are always updated in place, so views on them stay valid.
+        """
+        if other.counting != self.counting:
+            raise ValueError("Cannot load a table with a different state layout, check `counting`.")
+        self.values[:] = other.values
+        self.counts[:] = other.counts
+        self.seen[:] = other.seen
+        self.policy[:] = other.policy
+        self.action_space[:] = other.action_space
+
+
+class ActionRowView(object):
+    """
+    One state's row of a state-action array, used like dict[Action, value].
+    """
+
+    def __init__(self, array: np.ndarray, seen: np.ndarray, index: int):
+        self.__array = array
+        self.__seen = seen
+        self.__index = index
+
+    def __getitem__(self, action: Action):
+        return self.__array[self.__index, action.value].item()
+
+    def __setitem__(self, action: Action, value):
+        self.__array[self.__index, action.value] = value
+        self.__seen[self.__index, action.value] = True
+
+    def __contains__(self, action: Action):
+        return bool(self.__seen[self.__index, action.value])
+
+    def keys(self) -> list[Action]:
+        return [ACTIONS[a] for a in np.flatnonzero(self.__seen[self.__index])]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return int(self.__seen[self.__index].sum())
+
+    def items(self) -> list[tuple[Action, float]]:
+        return [(action, self[action]) for action in self.keys()]
+
+    def values(self) -> list:
+        return [self[action] for action in self.keys()]
+
+
+class StateActionView(object):
+    """
+    A state-action array used like dict[BaseState, dict[Action, value]].
+    Missing states read as an empty row, like a nested defaultdict.
+    """
+
+    def __init__(self, array: np.ndarray, seen: np.ndarray):
+        self.__array = array
+        self.__seen = seen
+
+    def __getitem__(self, state: BaseState) -> ActionRowView:
+        return ActionRowView(self.__array, self.__seen, state_index(state))
+
+    def __contains__(self, state: BaseState):
+        return bool(self.__seen[state_index(state)].any())
+
+    def keys(self) -> list[BaseState]:
+        return [index_state(i) for i in np.flatnonzero(self.__seen.any(axis=1))]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return int(self.__seen.any(axis=1).sum())
+
+    def items(self) -> list[tuple[BaseState, ActionRowView]]:
+        return [(state, self[state]) for state in self.keys()]
+
+
+class PolicyView(object):
+    """
+    The policy array used like dict[BaseState, Action].
+    """
+
+    def __init__(self, policy: np.ndarray):
+        self.__policy = policy
+
+    def __getitem__(self, state: BaseState) -> Action:
+        action = self.__policy[state_index(state)]
+        if action == NO_ACTION:
+            raise KeyError(state)
+        return ACTIONS[action]
+
+    def __setitem__(self, state: BaseState, action: Action):
+        self.__policy[state_index(state)] = action.value
+
+    def __contains__(self, state: BaseState):
+        return self.__policy[state_index(state)] != NO_ACTION
+
+    def get(self, state: BaseState, default=None):
+        return self[state] if state in self else default
+
+    def keys(self) -> list[BaseState]:
+        return [index_state(i) for i in np.flatnonzero(self.__policy != NO_ACTION)]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return int((self.__policy != NO_ACTION).sum())
+
+    def items(self) -> list[tuple[BaseState, Action]]:
+        return [(state, self[state]) for state in self.keys()]
+
+    @property
+    def array(self) -> np.ndarray:
+        return self.__policy
+
+
+class ActionSpaceView(object):
+    """
+    The possible-action mask used like dict[BaseState, set[Action]].
+    """
+
+    def __init__(self, action_space: np.ndarray):
+        self.__action_space = action_space
+
+    def __getitem__(self, state: BaseState) -> set[Action]:
+        return {ACTIONS[a] for a in np.flatnonzero(self.__action_space[state_index(state)])}
+
+    def __setitem__(self, state: BaseState, actions):
+        row = state_index(state)
+        self.__action_space[row] = False
+        for action in actions:
+            self.__action_space[row, action.value] = True
+
+    def __contains__(self, state: BaseState):
+        return bool(self.__action_space[state_index(state)].any())
+
+    def keys(self) -> list[BaseState]:
+        return [index_state(i) for i in np.flatnonzero(self.__action_space.any(axis=1))]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return int(self.__action_space.any(axis=1).sum())
+
+    def items(self) -> list[tuple[BaseState, set[Action]]]:
+        return [(state, self[state]) for state in self.keys()]
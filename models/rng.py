@@ -0,0 +1,174 @@
+"""
+Buffered random streams for the simulators.
+Numbers are drawn from a numpy Generator in blocks and handed out one at a time,
+so a card draw or an exploration coin flip is a list lookup instead of a call into `random`.
+Every stream has its own seed, `spawn` gives independent child streams for parallel runs.
+"""
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+BIT_GENERATORS = {"PCG64": np.random.PCG64, "Philox": np.random.Philox}
+BLOCK_SIZE = 4096
+# an episode draws a few dozen numbers, a smaller block keeps per-episode streams cheap
+EPISODE_BLOCK_SIZE = 64
+N_RANKS = 13
+
+
+class RandomStream(object):
+    """
+    :param seed: Seed or SeedSequence of the stream, fresh entropy when None.
+    :param bit_generator: "PCG64" or "Philox".
+    :param block_size: Number of values drawn at once per buffer.
+    """
+
+    def __init__(self, seed: Union[int, np.random.SeedSequence, None] = None,
+                 bit_generator: str = "PCG64", block_size: int = BLOCK_SIZE):
+        if bit_generator not in BIT_GENERATORS:
+            raise ValueError(f"Unknown bit generator {bit_generator}, use one of {list(BIT_GENERATORS)}.")
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.bit_generator = bit_generator
+        self.block_size = block_size
+        self.generator = np.random.Generator(BIT_GENERATORS[bit_generator](self.seed_sequence))
+
+        self.__uniforms: list[float] = []
+        self.__uniform_pos = 0
+        self.__ranks: list[int] = []
+        self.__rank_pos = 0
+
+    def random(self) -> float:
+        """
+        Uniform float in [0, 1).
+        """
+        if self.__uniform_pos >= len(self.__uniforms):
+            self.__uniforms = self.generator.random(self.block_size).tolist()
+            self.__uniform_pos = 0
+        value = self.__uniforms[self.__uniform_pos]
+        self.__uniform_pos += 1
+        return value
+
+    def below(self, n: int) -> int:
+        """
+        Uniform integer in [0, n).
+        """
+        return int(self.random() * n)
+
+    def choice(self, seq: Sequence):
+        return seq[int(self.random() * len(seq))]
+
+    def rank(self) -> int:
+        """
+        Uniform card rank index in [0, 13).
+        """
+        if self.__rank_pos >= len(self.__ranks):
+            self.__ranks = self.generator.integers(0, N_RANKS, self.block_size).tolist()
+            self.__rank_pos = 0
+        value = self.__ranks[self.__rank_pos]
+        self.__rank_pos += 1
+        return value
+
+    def shuffle(self, array: np.ndarray):
+        self.generator.shuffle(array)
+
+    def get_state(self) -> dict:
+        """
+        JSON serializable state, including the values left in the buffers.
+        """
+        return {
+            "bit_generator": _arrays_to_lists(self.generator.bit_generator.state),
+            "uniforms": self.__uniforms[self.__uniform_pos:],
+            "ranks": self.__ranks[self.__rank_pos:],
+        }
+
+    def set_state(self, state: dict):
+        """
+        Restore a state from `get_state`, the stream then continues exactly where it was.
+        """
+        self.generator.bit_generator.state = _lists_to_arrays(state["bit_generator"])
+        self.__uniforms = list(state["uniforms"])
+        self.__uniform_pos = 0
+        self.__ranks = list(state["ranks"])
+        self.__rank_pos = 0
+
+    def set_bit_generator_state(self, state: dict):
+        """
+        Set the bit generator's state as numpy takes it and drop the buffered values.
+        """
+        self.generator.bit_generator.state = state
+        self.__uniforms = []
+        self.__uniform_pos = 0
+        self.__ranks = []
+        self.__rank_pos = 0
+
+    def spawn(self, n: int) -> list["RandomStream"]:
+        """
+        Independent child streams, e.g. one per worker process.
+        """
+        return [RandomStream(child, self.bit_generator, self.block_size)
+                for child in self.seed_sequence.spawn(n)]
+
+
+class EpisodeStreams(object):
+    """
+    Streams of the episodes of one run, each a function of (run seed, episode index) only.
+    They are Philox streams with a key derived from the seed, episode `i` starts at counter block `i << 64`,
+    so no two episodes share numbers. One stream object is reused, `seek` only moves its counter.
+    """
+
+    def __init__(self, seed: int):
+        self.seed = seed
+        self.stream = RandomStream(seed, "Philox", EPISODE_BLOCK_SIZE)
+        self.__key = np.random.SeedSequence(seed).generate_state(2, np.uint64)
+        self.__counter = np.zeros(4, dtype=np.uint64)
+        self.__empty_buffer = np.zeros(4, dtype=np.uint64)
+
+    def seek(self, episode: int) -> RandomStream:
+        """
+        Move the stream to the start of episode `episode`, values buffered for another episode are dropped.
+        """
+        self.__counter[1] = episode
+        self.stream.set_bit_generator_state({
+            "bit_generator": "Philox", "state": {"counter": self.__counter, "key": self.__key},
+            "buffer": self.__empty_buffer, "buffer_pos": 4, "has_uint32": 0, "uinteger": 0})
+        return self.stream
+
+
+def episode_stream(seed: int, episode: int) -> RandomStream:
+    """
+    A new stream of episode `episode` of the run with seed `seed`, see `EpisodeStreams`.
+    """
+    return EpisodeStreams(seed).seek(episode)
+
+
+def _arrays_to_lists(state: dict) -> dict:
+    # Philox keeps its counter, key and buffer as uint64 arrays
+    return {key: _arrays_to_lists(value) if isinstance(value, dict)
+            else value.tolist() if isinstance(value, np.ndarray) else value
+            for key, value in state.items()}
+
+
+def _lists_to_arrays(state: dict) -> dict:
+    return {key: _lists_to_arrays(value) if isinstance(value, dict)
+            else np.asarray(value, dtype=np.uint64) if isinstance(value, list) else value
+            for key, value in state.items()}
+
+
+_default_stream: Optional[RandomStream] = None
+
+
+def default_stream() -> RandomStream:
+    """
+    Stream used when no stream is passed explicitly, seeded from fresh entropy unless `seed` was called.
+    """
+    global _default_stream
+    if _default_stream is None:
+        _default_stream = RandomStream()
+    return _default_stream
+
+
+def seed(value: Optional[int] = None, bit_generator: str = "PCG64"):
+    """
+    Reseed the default stream.
+    """
+    global _default_stream
+    _default_stream = RandomStream(value, bit_generator)
@@ -0,0 +1,206 @@
+"""
+Exact solver for the MDP the Agent learns by Monte Carlo.
+Card draws come from a fixed rank distribution (infinite deck, or a shoe composition
+that is not depleted), so the dealer's final totals and the player's transitions
+can be computed directly instead of sampled.
+"""
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+from .player import MAX_SPLIT_NUM
+from .utils import Action, BaseState
+
+# card points, aces are 11
+POINTS = tuple(range(2, 12))
+
+# index of the dealer outcomes in a dealer distribution
+DEALER_TOTALS = (17, 18, 19, 20, 21)
+BUST = len(DEALER_TOTALS)
+BLACKJACK = BUST + 1
+N_OUTCOMES = BLACKJACK + 1
+
+MAX_POINTS = 22
+MAX_DEALER_CARD = 12
+
+
+def card_probabilities(counts: Optional[dict[int, int]] = None) -> np.ndarray:
+    """
+    Probability of drawing each card point, indexed by point.
+    :param counts: Cards left per point (2..11), one deck when not given.
+    """
+    if counts is None:
+        counts = {point: 4 for point in POINTS}
+        counts[10] = 16
+    probs = np.zeros(MAX_DEALER_CARD)
+    for point, count in counts.items():
+        probs[point] = count
+    return probs / probs.sum()
+
+
+def add_card(total: int, soft: bool, card: int) -> tuple[int, bool]:
+    """
+    Hand total and softness after adding a card, same rule as `Hand.points`.
+    """
+    hard = total - 10 if soft else total
+    has_ace = soft or card == 11
+    hard += 1 if card == 11 else card
+    if has_ace and hard <= 11:
+        return hard + 10, True
+    return hard, False
+
+
+def dealer_distribution(up_card: int, probs: np.ndarray, hit_soft17: bool = False) -> np.ndarray:
+    """
+    Distribution of the dealer's final outcome for one up card, see `Dealer.hits`.
+    The hole card is drawn from `probs` too, a two card 21 is BLACKJACK.
+    """
+    memo: dict[tuple[int, bool], np.ndarray] = {}
+
+    def finish(total: int, soft: bool) -> np.ndarray:
+        if (total, soft) in memo:
+            return memo[(total, soft)]
+        dist = np.zeros(N_OUTCOMES)
+        if total > 21:
+            dist[BUST] = 1.0
+        elif total > 17 or (total == 17 and not (soft and hit_soft17)):
+            dist[total - DEALER_TOTALS[0]] = 1.0
+        else:
+            for card in POINTS:
+                if probs[card] > 0:
+                    dist += probs[card] * finish(*add_card(total, soft, card))
+        memo[(total, soft)] = dist
+        return dist
+
+    up_total, up_soft = add_card(0, False, up_card)
+    dist = np.zeros(N_OUTCOMES)
+    for hole in POINTS:
+        if probs[hole] == 0:
+            continue
+        total, soft = add_card(up_total, up_soft, hole)
+        if total == 21:
+            dist[BLACKJACK] += probs[hole]
+        else:
+            dist += probs[hole] * finish(total, soft)
+    return dist
+
+
+def stand_values(dealer: np.ndarray) -> np.ndarray:
+    """
+    Expected reward of standing on each total 0..21 against each up card, without blackjack.
+    :param dealer: dealer distributions indexed by up card.
+    """
+    values = np.zeros((MAX_POINTS, MAX_DEALER_CARD))
+    for total in range(MAX_POINTS):
+        values[total] = dealer[:, BUST] - dealer[:, BLACKJACK]
+        for i, dealer_total in enumerate(DEALER_TOTALS):
+            values[total] += dealer[:, i] * np.sign(total - dealer_total)
+    return values
+
+
+@dataclass
+class SolveResult:
+    # best action of every decision state
+    policy: dict[BaseState, Action]
+    # expected reward of every action in every decision state
+    Q: dict[BaseState, dict[Action, float]]
+    # expected reward per initial hand when following the policy
+    ev: float
+    # dealer outcome distribution per up card
+    dealer: dict[int, np.ndarray] = field(repr=False)
+    # value iteration sweeps until convergence
+    iterations: int = 0
+
+
+def solve(probs: Optional[np.ndarray] = None, hit_soft17: bool = False,
+          tol: float = 1e-12, max_iter: int = 100) -> SolveResult:
+    """
+    Value iteration over the BaseState/Action space, with Dojo's rules and rewards.
+    Like `Agent.play` does with a policy action, Double is allowed on any hand.
+    Split hands are valued independently, each one with one split less left.
+    :param probs: Card point probabilities from `card_probabilities`, infinite deck by default.
+    """
+    probs = card_probabilities() if probs is None else probs
+    cards = [card for card in POINTS if probs[card] > 0]
+
+    dealer = np.zeros((MAX_DEALER_CARD, N_OUTCOMES))
+    for up_card in POINTS:
+        dealer[up_card] = dealer_distribution(up_card, probs, hit_soft17)
+    stand = stand_values(dealer)
+    blackjack = 1.5 * (1 - dealer[:, BLACKJACK])
+
+    # value of a hand with at least two cards and no split, indexed by [total, soft]
+    value = np.zeros((MAX_POINTS, 2, MAX_DEALER_CARD))
+    # value of a fresh pair, indexed by [card, splits left]
+    pair_value = np.zeros((MAX_DEALER_CARD, MAX_SPLIT_NUM + 1, MAX_DEALER_CARD))
+
+    def settled(total: int, soft: bool) -> np.ndarray:
+        # a hand of 21 or more is done
+        if total > 21:
+            return np.full(MAX_DEALER_CARD, -1.0)
+        if total == 21:
+            return stand[21]
+        return value[total, int(soft)]
+
+    def action_values(total: int, soft: bool) -> dict[Action, np.ndarray]:
+        hit = np.zeros(MAX_DEALER_CARD)
+        double = np.zeros(MAX_DEALER_CARD)
+        for card in cards:
+            next_total, next_soft = add_card(total, soft, card)
+            hit += probs[card] * settled(next_total, next_soft)
+            double += probs[card] * (stand[next_total] if next_total <= 21 else -1.0)
+        return {Action.Stand: stand[total], Action.Hit: hit, Action.Double: 2 * double}
+
+    def fresh_hand(card: int, new_card: int, splits_left: int) -> np.ndarray:
+        total, soft = add_card(*add_card(0, False, card), new_card)
+        if total == 21:
+            return blackjack
+        if card == new_card and splits_left > 0:
+            return pair_value[card, splits_left]
+        return settled(total, soft)
+
+    def split_value(card: int, splits_left: int) -> np.ndarray:
+        return 2 * sum(probs[new_card] * fresh_hand(card, new_card, splits_left - 1) for new_card in cards)
+
+    hands = [(total, soft) for total in range(4, 21) for soft in (False, True)
+             if not soft or total >= 12]
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        delta = 0.0
+        for total, soft in hands:
+            best = np.max(list(action_values(total, soft).values()), axis=0)
+            delta = max(delta, np.abs(best - value[total, int(soft)]).max())
+            value[total, int(soft)] = best
+        for card in POINTS:
+            total, soft = add_card(*add_card(0, False, card), card)
+            for splits_left in range(1, MAX_SPLIT_NUM + 1):
+                best = np.maximum(value[total, int(soft)], split_value(card, splits_left))
+                delta = max(delta, np.abs(best - pair_value[card, splits_left]).max())
+                pair_value[card, splits_left] = best
+        if delta < tol:
+            break
+
+    policy: dict[BaseState, Action] = {}
+    Q: dict[BaseState, dict[Action, float]] = {}
+
+    def add_state(state: BaseState, q: dict[Action, np.ndarray]):
+        Q[state] = {action: float(values[state.dealer_card]) for action, values in q.items()}
+        policy[state] = max(Q[state], key=Q[state].get)
+
+    for up_card in POINTS:
+        for total, soft in hands:
+            add_state(BaseState(total, up_card, soft, False), action_values(total, soft))
+        for card in POINTS:
+            total, soft = add_card(*add_card(0, False, card), card)
+            q = action_values(total, soft)
+            q[Action.Split] = split_value(card, MAX_SPLIT_NUM)
+            add_state(BaseState(total, up_card, soft, True), q)
+
+    ev = 0.0
+    for first in cards:
+        for second in cards:
+            initial = fresh_hand(first, second, MAX_SPLIT_NUM)
+            ev += probs[first] * probs[second] * float(np.dot(probs, initial))
+
+    return SolveResult(policy, Q, ev, {up_card: dealer[up_card] for up_card in POINTS}, iterations)
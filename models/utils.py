@@ -1,5 +1,5 @@
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from .hand import Hand, PlayerHand
 
 class Action(Enum):
@@ -9,12 +9,72 @@ class Action(Enum):
     Double = 3  # -> done with this hand
     Insurance = 4  # Insurance -> hit or stand
 
+# true counts beyond this share the outermost bucket
+MAX_TRUE_COUNT = 5
+N_COUNT_BUCKETS = 2 * MAX_TRUE_COUNT + 1
+# player sums and dealer cards are below these
+MAX_POINTS = 32
+MAX_DEALER_CARD = 12
+
+
+def _state_id(player_sum: int, dealer_card: int, usible_ace: bool, splitable: bool, true_count: int) -> int:
+    """
+    Row of the state, the fields must already be Python ints and bools.
+    """
+    if not (0 <= player_sum < MAX_POINTS and 0 <= dealer_card < MAX_DEALER_CARD
+            and -MAX_TRUE_COUNT <= true_count <= MAX_TRUE_COUNT):
+        raise ValueError(f"State out of range: player_sum={player_sum}, dealer_card={dealer_card}, "
+                         f"true_count={true_count}.")
+    # [true_count, player_sum, dealer_card, usible_ace, splitable] in C order,
+    # negative counts wrap around so states without a count come first
+    return (((true_count % N_COUNT_BUCKETS) * MAX_POINTS + player_sum) * MAX_DEALER_CARD
+            + dealer_card) * 4 + usible_ace * 2 + splitable
+
+
 @dataclass(frozen=True)
 class BaseState:
+    """
+    Decision state of a hand. `id` is a small integer unique per state, also used as its hash
+    and as the row of the state in `QTable`. Use `intern_state` on hot paths.
+    Fields out of range raise ValueError, so states with the same id are equal.
+    """
     player_sum: int
     dealer_card: int
     usible_ace: bool
     splitable: bool
+    # Hi-Lo true count bucket when the round started, -MAX_TRUE_COUNT..MAX_TRUE_COUNT, 0 without counting
+    true_count: int = 0
+    id: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "id", _state_id(
+            int(self.player_sum), int(self.dealer_card), bool(self.usible_ace), bool(self.splitable),
+            int(self.true_count)))
+
+    def __eq__(self, other):
+        return self is other or (isinstance(other, BaseState) and self.id == other.id)
+
+    def __hash__(self):
+        return self.id
+
+
+# canonical states by id, filled on first use
+_interned_states: list = [None] * (N_COUNT_BUCKETS * MAX_POINTS * MAX_DEALER_CARD * 4)
+
+
+def intern_state(player_sum: int, dealer_card: int, usible_ace: bool, splitable: bool,
+                 true_count: int = 0) -> BaseState:
+    """
+    The one shared BaseState with these fields, created on the first call.
+    Numpy scalars are converted first, fields out of range raise ValueError.
+    """
+    player_sum, dealer_card, true_count = int(player_sum), int(dealer_card), int(true_count)
+    usible_ace, splitable = bool(usible_ace), bool(splitable)
+    state = _interned_states[_state_id(player_sum, dealer_card, usible_ace, splitable, true_count)]
+    if state is None:
+        state = BaseState(player_sum, dealer_card, usible_ace, splitable, true_count)
+        _interned_states[state.id] = state
+    return state
 
 
 class ShowState(object):
@@ -34,4 +94,4 @@ class ShowState(object):
         splitable = self.__player_hand.has_pair()
 
         dealer_card = self.__dealer_hand.cards[0].point
-        return BaseState(player_sum, dealer_card, usable_ace, splitable)
+        return intern_state(player_sum, dealer_card, usable_ace, splitable)
@@ -0,0 +1,161 @@
+import os
+import tempfile
+import unittest
+from models.agent import Agent
+from models.card import Card, Suit, Rank
+from models.deck import Deck
+from models.qtable import read_header
+from models.utils import Action, BaseState
+
+
+class TestAgent(unittest.TestCase):
+
+    def setUp(self):
+        self.state = BaseState(12, 10, False, False)
+        self.other_state = BaseState(20, 6, False, True)
+
+    def test_reuse_hands_and_histories(self):
+        agent = Agent("test", bank=10000, reuse=True)
+        cards = [Card(Suit.Spades, Rank.TEN), Card(Suit.Hearts, Rank.SEVEN)]
+        agent.init_hand(list(cards), 1)
+        agent.first_play(BaseState(17, 10, False, False), Action.Stand, Deck(1))
+        hand = agent.get_hand()
+        history = agent.all_histories[0]
+        next_history = agent.current_hand_history
+        agent.set_episodes_return([1.0])
+        agent.pay_out([1.0, 0])
+        agent.clear_episode_history()
+        self.assertEqual(agent.all_histories, [])
+
+        agent.init_hand(list(cards), 1)
+        self.assertIs(agent.get_hand(), hand)
+        agent.policy[BaseState(17, 10, False, False)] = Action.Stand
+        agent.play(BaseState(17, 10, False, False), Deck(1))
+        self.assertIs(agent.all_histories[0], next_history)
+        self.assertEqual(len(next_history.state_action_history), 1)
+        self.assertIs(agent.current_hand_history, history)
+        self.assertEqual(history.state_action_history, [])
+
+    def test_dict_like_tables(self):
+        agent = Agent("test", bank=100)
+        self.assertNotIn(self.state, agent.policy)
+        self.assertNotIn(self.state, agent.Q)
+        self.assertEqual(agent.Q[self.state][Action.Hit], 0.0)
+
+        agent.Q[self.state][Action.Hit] = 0.5
+        agent.state_action_count[self.state][Action.Hit] = 3
+        agent.state_action_space[self.state] = {Action.Hit, Action.Stand}
+        agent.policy[self.state] = Action.Hit
+
+        self.assertIn(self.state, agent.Q)
+        self.assertEqual(dict(agent.Q[self.state]), {Action.Hit: 0.5})
+        self.assertEqual(agent.state_action_count[self.state][Action.Hit], 3)
+        self.assertEqual(agent.state_action_space[self.state], {Action.Hit, Action.Stand})
+        self.assertEqual(dict(agent.policy), {self.state: Action.Hit})
+        with self.assertRaises(KeyError):
+            agent.policy[self.other_state]
+
+    def test_learn_exploring_starts(self):
+        agent = Agent("test", bank=100)
+        agent.all_histories = []
+        for action, reward in [(Action.Hit, 1.0), (Action.Hit, -1.0), (Action.Stand, 0.5)]:
+            agent.current_hand_history.state_action_history.append((self.state, action))
+            agent.all_histories.append(agent.current_hand_history)
+            agent.current_hand_history = type(agent.current_hand_history)([], 0)
+        agent.set_episodes_return([1.0, -1.0, 0.5])
+        agent.learn_exploring_starts()
+
+        self.assertEqual(agent.state_action_count[self.state][Action.Hit], 2)
+        self.assertAlmostEqual(agent.Q[self.state][Action.Hit], 0.0)
+        self.assertAlmostEqual(agent.Q[self.state][Action.Stand], 0.5)
+        self.assertEqual(agent.policy[self.state], Action.Stand)
+
+    def test_tables_round_trip(self):
+        agent = Agent("test", bank=100)
+        agent.Q[self.state][Action.Hit] = 0.5
+        agent.state_action_count[self.state][Action.Hit] = 3
+        agent.policy[self.state] = Action.Hit
+
+        copy = Agent("copy", bank=100)
+        copy.set_tables(agent.get_tables())
+        self.assertEqual(copy.Q[self.state][Action.Hit], 0.5)
+        self.assertEqual(copy.state_action_count[self.state][Action.Hit], 3)
+        self.assertEqual(copy.policy[self.state], Action.Hit)
+
+    def test_save_and_load(self):
+        agent = Agent("test", bank=100)
+        agent.Q[self.state][Action.Hit] = 0.25
+        agent.state_action_count[self.state][Action.Hit] = 3
+        agent.policy[self.state] = Action.Hit
+        agent.state_action_space[self.state] = [Action.Stand, Action.Hit]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = agent.save(os.path.join(tmp_dir, "agent", "tables.bin"))
+            for mmap in (False, True):
+                loaded = Agent("loaded", bank=100)
+                loaded.load(path, mmap=mmap)
+                self.assertEqual(loaded.Q[self.state][Action.Hit], 0.25)
+                self.assertEqual(loaded.state_action_count[self.state][Action.Hit], 3)
+                self.assertEqual(loaded.policy[self.state], Action.Hit)
+                self.assertEqual(set(loaded.state_action_space[self.state]), {Action.Stand, Action.Hit})
+                self.assertNotIn(self.other_state, loaded.policy)
+                # mapped tables are copy-on-write
+                loaded.policy[self.state] = Action.Stand
+                del loaded
+            self.assertEqual(read_header(path)["metadata"], {"name": "test"})
+
+            bad_path = os.path.join(tmp_dir, "bad.bin")
+            with open(bad_path, "wb") as f:
+                f.write(b"not a table")
+            with self.assertRaises(ValueError):
+                Agent("bad", bank=100).load(bad_path)
+
+    def test_saved_values_exact(self):
+        agent = Agent("test", bank=100)
+        agent.Q[self.state][Action.Hit] = 0.1
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = agent.save(os.path.join(tmp_dir, "tables.bin"))
+            self.assertEqual(read_header(path)["arrays"][0]["dtype"], "<f8")
+            for mmap in (False, True):
+                loaded = Agent("loaded", bank=100)
+                loaded.load(path, mmap=mmap)
+                self.assertEqual(loaded.Q[self.state][Action.Hit], 0.1)
+            # float32 is opt-in
+            small_path = agent.save(os.path.join(tmp_dir, "small.bin"), values_dtype="<f4")
+            self.assertLess(os.path.getsize(small_path), os.path.getsize(path))
+            loaded = Agent("loaded", bank=100)
+            loaded.load(small_path)
+            self.assertNotEqual(loaded.Q[self.state][Action.Hit], 0.1)
+            self.assertAlmostEqual(loaded.Q[self.state][Action.Hit], 0.1, places=6)
+
+    def test_merge_tables(self):
+        agent = Agent("test", bank=100)
+        agent.Q[self.state][Action.Hit] = 1.0
+        agent.state_action_count[self.state][Action.Hit] = 2
+        base = agent.get_tables()
+
+        # worker 1 saw two more returns summing to 6, worker 2 one return of -0.5
+        worker1 = Agent("worker1", bank=100)
+        worker1.set_tables(base)
+        worker1.Q[self.state][Action.Hit] = 2.0
+        worker1.state_action_count[self.state][Action.Hit] = 4
+        worker2 = Agent("worker2", bank=100)
+        worker2.set_tables(base)
+        worker2.Q[self.state][Action.Hit] = 0.5
+        worker2.state_action_count[self.state][Action.Hit] = 3
+        worker2.Q[self.state][Action.Stand] = -1.0
+        worker2.state_action_count[self.state][Action.Stand] = 1
+        worker2.Q[self.other_state][Action.Split] = 0.25
+        worker2.state_action_count[self.other_state][Action.Split] = 1
+
+        agent.merge_tables(base, [worker1.get_tables(), worker2.get_tables()])
+        self.assertEqual(agent.state_action_count[self.state][Action.Hit], 5)
+        self.assertAlmostEqual(agent.Q[self.state][Action.Hit], 7.5 / 5)
+        self.assertAlmostEqual(agent.Q[self.state][Action.Stand], -1.0)
+        self.assertAlmostEqual(agent.Q[self.other_state][Action.Split], 0.25)
+        self.assertEqual(agent.policy[self.state], Action.Hit)
+        self.assertEqual(agent.policy[self.other_state], Action.Split)
+
+
+if __name__ == '__main__':
+    unittest.main()
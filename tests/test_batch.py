@@ -0,0 +1,73 @@
+import unittest
+import numpy as np
+from models.agent import Agent
+from models.batch import compile_policy, play_batch, evaluate, UNKNOWN_ACTION, MAX_HANDS
+from models.dojo import Dojo
+from models.rng import RandomStream
+from models.solver import solve
+from models.utils import Action, BaseState
+
+
+def full_policy(action_of):
+    return {BaseState(ps, dc, ace, sp): action_of(ps, ace, sp)
+            for ps in range(2, 32) for dc in range(2, 12)
+            for ace in (False, True) for sp in (False, True)}
+
+
+class TestBatch(unittest.TestCase):
+
+    def test_compile_policy(self):
+        table = compile_policy({BaseState(16, 10, False, False): Action.Hit,
+                                BaseState(18, 2, True, True): Action.Split})
+        self.assertEqual(table[16, 10, 0, 0], Action.Hit.value)
+        self.assertEqual(table[18, 2, 1, 1], Action.Split.value)
+        self.assertEqual(table[16, 10, 1, 0], UNKNOWN_ACTION)
+
+    def test_always_stand(self):
+        table = compile_policy(full_policy(lambda ps, ace, sp: Action.Stand))
+        rewards, played = play_batch(table, 20000, np.random.default_rng(0))
+        # no split, only the first hand is played
+        self.assertTrue(played[:, 0].all())
+        self.assertFalse(played[:, 1:].any())
+        self.assertTrue(np.isin(rewards, [-1.0, 0.0, 1.0, 1.5]).all())
+
+    def test_always_double(self):
+        table = compile_policy(full_policy(lambda ps, ace, sp: Action.Double))
+        rewards, played = play_batch(table, 20000, np.random.default_rng(0))
+        # every hand is doubled unless it is a blackjack
+        self.assertTrue(np.isin(rewards[played], [-2.0, 0.0, 2.0, 1.5]).all())
+
+    def test_split_limit(self):
+        table = compile_policy(full_policy(
+            lambda ps, ace, sp: Action.Split if sp else Action.Stand))
+        rewards, played = play_batch(table, 50000, np.random.default_rng(0))
+        hands = played.sum(axis=1)
+        self.assertEqual(hands.max(), MAX_HANDS)
+        self.assertTrue((hands >= 1).all())
+
+    def test_evaluate_is_reproducible(self):
+        table = compile_policy({})
+        first = evaluate(table, 5000, 1000, np.random.default_rng(7))
+        second = evaluate(table, 5000, 1000, np.random.default_rng(7))
+        self.assertEqual(first, second)
+        self.assertGreaterEqual(first[2], 5000)
+
+
+    def test_same_results_as_dojo_test(self):
+        solver_policy = solve().policy
+        for name, policy in (("solver", solver_policy),
+                             ("stand", {state: Action.Stand for state in solver_policy})):
+            with self.subTest(policy=name):
+                agent = Agent("test", bank=10000, rng=RandomStream(3))
+                for state, action in policy.items():
+                    agent.policy[state] = action
+                dojo = Dojo(agent, report_every=0, progress_sink=lambda stats: None)
+                avg_reward, win_rate = dojo.test(20000)
+                batch_avg_reward, batch_win_rate = dojo.test_batch(400000, seed=1)
+                # 4 standard errors of the 20000 episode run (reward sd about 1.15, win rate sd about 0.5),
+                # which also covers the 8 deck shoe against the infinite one
+                self.assertAlmostEqual(avg_reward, batch_avg_reward, delta=0.035)
+                self.assertAlmostEqual(win_rate, batch_win_rate, delta=0.015)
+
+if __name__ == '__main__':
+    unittest.main()
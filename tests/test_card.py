@@ -0,0 +1,44 @@
+import unittest
+import copy
+import pickle
+from models.card import Card, Suit, Rank, CARDS, RANK_POINTS
+
+
+class TestCard(unittest.TestCase):
+
+    def test_cards_are_interned(self):
+        self.assertIs(Card(Suit.Clubs, Rank.ACE), Card(Suit.Clubs, Rank.ACE))
+        self.assertIsNot(Card(Suit.Clubs, Rank.ACE), Card(Suit.Hearts, Rank.ACE))
+        self.assertEqual(len(CARDS), 52)
+        self.assertEqual(len(set(CARDS)), 52)
+
+    def test_points(self):
+        self.assertEqual(Card(Suit.Spades, Rank.ACE).point, 11)
+        self.assertEqual(Card(Suit.Spades, Rank.KING).point, 10)
+        self.assertEqual(Card(Suit.Spades, Rank.TEN).point, 10)
+        self.assertEqual(Card(Suit.Spades, Rank.SEVEN).point, 7)
+        for rank in Rank:
+            self.assertEqual(Card.get_point(rank), RANK_POINTS[rank])
+
+    def test_code(self):
+        for code, card in enumerate(CARDS):
+            self.assertEqual(card.code, code)
+
+    def test_immutable(self):
+        card = Card(Suit.Hearts, Rank.FIVE)
+        with self.assertRaises(AttributeError):
+            card.point = 11
+        with self.assertRaises(AttributeError):
+            card.extra = 1
+
+    def test_copy_and_pickle_keep_identity(self):
+        card = Card(Suit.Diamonds, Rank.QUEEN)
+        self.assertIs(copy.deepcopy(card), card)
+        self.assertIs(pickle.loads(pickle.dumps(card)), card)
+
+    def test_str(self):
+        self.assertEqual(str(Card(Suit.Clubs, Rank.TEN)), "♣10")
+
+
+if __name__ == '__main__':
+    unittest.main()
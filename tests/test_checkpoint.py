@@ -0,0 +1,143 @@
+import os
+import tempfile
+import threading
+import unittest
+import numpy as np
+from models.agent import Agent
+from models.checkpoint import TrainingCheckpoint, CheckpointWriter
+from models.dojo import Dojo, LearnMode
+from models.rng import RandomStream
+
+
+class Interrupted(Exception):
+    pass
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "run.bin")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def make_dojo(self):
+        agent = Agent("test", bank=10000, reuse=True, rng=RandomStream(4))
+        return agent, Dojo(agent, reuse=True, report_every=0, progress_sink=lambda line: None)
+
+    def interrupt_after(self, agent: Agent, method: str, episodes: int):
+        learn = getattr(agent, method)
+        done = [0]
+
+        def hook(*args):
+            learn(*args)
+            done[0] += 1
+            if done[0] == episodes:
+                raise Interrupted()
+        setattr(agent, method, hook)
+
+    def check_resume(self, mode: LearnMode, method: str):
+        agent, dojo = self.make_dojo()
+        expected = dojo.train(3000, mode, 0.05)
+
+        agent, dojo = self.make_dojo()
+        self.interrupt_after(agent, method, 2300)
+        with self.assertRaises(Interrupted):
+            dojo.train(3000, mode, 0.05, checkpoint_path=self.path, checkpoint_every=500)
+        # the last checkpoint before the interruption is written and the writer thread stopped
+        self.assertGreater(TrainingCheckpoint.load(self.path).episode, 0)
+        self.assertFalse([thread for thread in threading.enumerate() if thread.name == "checkpoint-writer"])
+
+        resumed, dojo = self.make_dojo()
+        result = dojo.train(3000, mode, 0.05, checkpoint_path=self.path, checkpoint_every=500, resume=True)
+        self.assertEqual(result, expected)
+        fresh, dojo = self.make_dojo()
+        dojo.train(3000, mode, 0.05)
+        np.testing.assert_array_equal(resumed.tables.values, fresh.tables.values)
+        np.testing.assert_array_equal(resumed.tables.counts, fresh.tables.counts)
+        np.testing.assert_array_equal(resumed.tables.policy, fresh.tables.policy)
+        checkpoint = TrainingCheckpoint.load(self.path)
+        self.assertEqual(checkpoint.episode, checkpoint.total_episodes)
+
+    def test_resume_epsilon_greedy(self):
+        self.check_resume(LearnMode.MCE, "learn_epsilon_greedy")
+
+    def test_resume_exploring_starts(self):
+        self.check_resume(LearnMode.MCES, "learn_exploring_starts")
+
+    def test_resume_without_checkpoint_starts_fresh(self):
+        agent, dojo = self.make_dojo()
+        expected = dojo.train(500, LearnMode.MCE, 0.05)
+        agent, dojo = self.make_dojo()
+        result = dojo.train(500, LearnMode.MCE, 0.05, checkpoint_path=self.path, resume=True)
+        self.assertEqual(result, expected)
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_resume_other_mode(self):
+        agent, dojo = self.make_dojo()
+        dojo.train(200, LearnMode.MCE, 0.05, checkpoint_path=self.path)
+        with self.assertRaises(ValueError):
+            dojo.train(200, LearnMode.MCES, checkpoint_path=self.path, resume=True)
+
+    def test_resume_other_settings(self):
+        agent, dojo = self.make_dojo()
+        self.interrupt_after(agent, "learn_epsilon_greedy", 300)
+        with self.assertRaises(Interrupted):
+            dojo.train(1000, LearnMode.MCE, 0.05, checkpoint_path=self.path, checkpoint_every=100)
+        agent, dojo = self.make_dojo()
+        with self.assertRaises(ValueError):
+            dojo.train(2000, LearnMode.MCE, 0.05, checkpoint_path=self.path, resume=True)
+        with self.assertRaises(ValueError):
+            dojo.train(1000, LearnMode.MCE, 0.1, checkpoint_path=self.path, resume=True)
+
+        agent, dojo = self.make_dojo()
+        self.interrupt_after(agent, "learn_exploring_starts", 300)
+        with self.assertRaises(Interrupted):
+            dojo.train(1000, LearnMode.MCES, checkpoint_path=self.path, checkpoint_every=100)
+        agent, dojo = self.make_dojo()
+        with self.assertRaises(ValueError):
+            dojo.train(2000, LearnMode.MCES, checkpoint_path=self.path, resume=True)
+
+    def test_resume_finished_run_starts_over(self):
+        agent, dojo = self.make_dojo()
+        expected = dojo.train(500, LearnMode.MCE, 0.05)
+        fresh, dojo = self.make_dojo()
+        dojo.train(500, LearnMode.MCE, 0.05, checkpoint_path=self.path)
+        resumed, dojo = self.make_dojo()
+        result = dojo.train(500, LearnMode.MCE, 0.05, checkpoint_path=self.path, resume=True)
+        self.assertEqual(result, expected)
+        np.testing.assert_array_equal(resumed.tables.counts, fresh.tables.counts)
+
+    def test_parallel_checkpoint_rejected(self):
+        agent, dojo = self.make_dojo()
+        with self.assertRaises(ValueError):
+            dojo.train(200, LearnMode.MCE, workers=2, checkpoint_path=self.path)
+
+    def test_writer(self):
+        agent, dojo = self.make_dojo()
+        checkpoint = TrainingCheckpoint("MCE", 1, 2, agent.get_tables(), agent.rng.get_state(),
+                                        agent.rng.get_state(), {"codes": [1, 2, 3], "running_count": 1},
+                                        {"episodes": 1, "hands": 1, "reward_sum": 0.5, "wins": 1})
+        writer = CheckpointWriter(self.path)
+        writer.submit(checkpoint)
+        writer.close()
+        self.assertGreaterEqual(writer.written, 1)
+        self.assertEqual(os.listdir(self.dir.name), ["run.bin"])
+        loaded = TrainingCheckpoint.load(self.path)
+        self.assertEqual(loaded.deck_state, {"codes": [1, 2, 3], "running_count": 1})
+        self.assertEqual(loaded.progress["reward_sum"], 0.5)
+        self.assertIsNone(loaded.starts)
+
+    def test_writer_error(self):
+        agent, dojo = self.make_dojo()
+        checkpoint = TrainingCheckpoint("MCE", 1, 2, agent.get_tables(), {}, {}, [], {})
+        # the path is a directory, replacing it fails
+        writer = CheckpointWriter(self.dir.name)
+        writer.submit(checkpoint)
+        with self.assertRaises(RuntimeError):
+            writer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from models.agent import Agent
+from models.card import Card, Suit, Rank
+from models.deck import Deck, HI_LO
+from models.dojo import Dojo, LearnMode
+from models.qtable import QTable, state_index, index_state, N_STATES, N_COUNT_STATES
+from models.rng import RandomStream
+from models.utils import BaseState, MAX_TRUE_COUNT
+
+
+class TestCounting(unittest.TestCase):
+
+    def test_running_count(self):
+        deck = Deck(2, RandomStream(5))
+        dealt = [deck.deal_card() for _ in range(60)]
+        self.assertEqual(deck.running_count, sum(HI_LO[card.code] for card in dealt))
+        self.assertAlmostEqual(deck.true_count(), deck.running_count * 52 / len(deck))
+        card = dealt[-1]
+        deck.insert_card(0, card)
+        self.assertEqual(deck.running_count, sum(HI_LO[card.code] for card in dealt[:-1]))
+
+    def test_hi_lo_tags(self):
+        self.assertEqual(HI_LO[Card(Suit.Hearts, Rank.TWO).code], 1)
+        self.assertEqual(HI_LO[Card(Suit.Hearts, Rank.SIX).code], 1)
+        self.assertEqual(HI_LO[Card(Suit.Hearts, Rank.EIGHT).code], 0)
+        self.assertEqual(HI_LO[Card(Suit.Hearts, Rank.QUEEN).code], -1)
+        self.assertEqual(HI_LO[Card(Suit.Hearts, Rank.ACE).code], -1)
+        # a full deck counts to zero
+        self.assertEqual(sum(HI_LO), 0)
+
+    def test_true_count_bucket(self):
+        deck = Deck(1, RandomStream(1))
+        buckets = set()
+        while len(deck):
+            buckets.add(deck.true_count_bucket())
+            deck.deal_card()
+        self.assertTrue(all(-MAX_TRUE_COUNT <= bucket <= MAX_TRUE_COUNT for bucket in buckets))
+
+    def test_deck_state(self):
+        deck = Deck(1, RandomStream(2))
+        for _ in range(10):
+            deck.deal_card()
+        restored = Deck(1, RandomStream(3))
+        restored.set_state(deck.get_state())
+        self.assertEqual(restored.running_count, deck.running_count)
+        self.assertEqual(restored.deal_card(), deck.deal_card())
+
+    def test_state_index(self):
+        state = BaseState(12, 10, False, True)
+        self.assertLess(state_index(state), N_STATES)
+        for count in range(-MAX_TRUE_COUNT, MAX_TRUE_COUNT + 1):
+            counted = BaseState(12, 10, False, True, count)
+            self.assertLess(state_index(counted), N_COUNT_STATES)
+            self.assertEqual(index_state(state_index(counted)), counted)
+        self.assertEqual(len({state_index(BaseState(12, 10, False, True, count))
+                              for count in range(-MAX_TRUE_COUNT, MAX_TRUE_COUNT + 1)}),
+                         2 * MAX_TRUE_COUNT + 1)
+
+    def test_counting_tables(self):
+        self.assertFalse(QTable().counting)
+        self.assertTrue(QTable(counting=True).counting)
+        with self.assertRaises(ValueError):
+            QTable().load(QTable(counting=True))
+        agent = Agent("counting", bank=10000, counting=True)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = agent.save(os.path.join(tmp_dir, "tables.bin"))
+            other = Agent("plain", bank=10000)
+            other.load(path)
+            self.assertTrue(other.tables.counting)
+
+    def test_count_states(self):
+        with self.assertRaises(ValueError):
+            Dojo(Agent("plain", bank=10000), count_states=True)
+        agent = Agent("counting", bank=10000, rng=RandomStream(6), counting=True)
+        dojo = Dojo(agent, report_every=0, progress_sink=lambda stats: None, count_states=True)
+        dojo.train(3000, LearnMode.MCE, 0.1)
+        self.assertGreater(len({state.true_count for state in agent.policy.keys()}), 1)
+
+        dojo.test(3000)
+        ev = dojo.ev_by_count()
+        self.assertEqual(sum(episodes for _, episodes in ev.values()), 3000)
+        total = sum(reward * episodes for reward, episodes in ev.values())
+        self.assertAlmostEqual(total, dojo.progress.reward_sum)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -244,6 +244,40 @@ class TestDealer(unittest.TestCase):
         self.assertIsNone(dealer._Dealer__hand)
         self.assertIsNone(dealer._Dealer__hiden_card)
 
+    def test_reset_reuse(self):
+        dealer = Dealer(reuse=True)
+        dealer.init_hand([self.king_spades, self.five_hearts])
+        hand = dealer._Dealer__hand
+        dealer.reset()
+        self.assertIsNone(dealer._Dealer__hand)
+        dealer.init_hand([self.ace_spades, self.nine_clubs])
+        self.assertIs(dealer._Dealer__hand, hand)
+        self.assertEqual(dealer.get_hiden_card(), self.ace_spades)
+        self.assertEqual(dealer.reveal_hand(), 20)
+
+    def test_get_hand_snapshot(self):
+        dealer = Dealer()
+        self.assertIsNone(dealer.get_hand())
+        dealer.init_hand([self.king_spades, self.five_hearts])
+        snapshot = dealer.get_hand()
+        # only the face card is visible
+        self.assertEqual(snapshot.cards, (self.five_hearts,))
+        self.assertEqual(snapshot.points, 5)
+        self.assertIs(dealer.get_hand(), snapshot)
+        with self.assertRaises(AttributeError):
+            snapshot.points = 21
+
+        dealer.hits(MockDeck(cards_to_deal=[self.two_spades]))
+        revealed = dealer.get_hand()
+        self.assertEqual(revealed.cards, (self.king_spades, self.five_hearts, self.two_spades))
+        self.assertEqual(revealed.points, 17)
+        self.assertFalse(revealed.is_bust())
+        self.assertEqual(snapshot.cards, (self.five_hearts,))
+        self.assertEqual(str(revealed), "♠K, ♥5, ♠2, Points: [17]")
+
+        dealer.reset()
+        self.assertIsNone(dealer.get_hand())
+
     def test_coner_case(self):
         delear = Dealer()
         delear.init_hand([self.ace_spades, self.three_clubs])
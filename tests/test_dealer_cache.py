@@ -0,0 +1,131 @@
+import time
+import unittest
+import numpy as np
+from models.agent import Agent
+from models.dealer_cache import DealerOutcomeCache, exact_dealer_distribution, expected_hand_reward
+from models.deck import Deck
+from models.dojo import Dojo
+from models.rng import RandomStream
+from models.solver import (add_card, card_probabilities, dealer_distribution, BUST, BLACKJACK,
+                           DEALER_TOTALS, N_OUTCOMES)
+
+
+def counts_of(**points):
+    counts = np.zeros(12, dtype=np.int64)
+    for point, count in points.items():
+        counts[int(point[1:])] = count
+    return counts
+
+
+def drawn_one_by_one(up_card: int, counts: np.ndarray, hit_soft17: bool = False) -> np.ndarray:
+    """
+    Dealer outcome distribution following every card drawn, as a reference.
+    """
+    counts = [int(count) for count in counts]
+
+    def draw(total: int, soft: bool, two_cards: bool) -> np.ndarray:
+        dist = np.zeros(N_OUTCOMES)
+        left = sum(counts)
+        for card in range(2, 12):
+            if counts[card] == 0:
+                continue
+            p = counts[card] / left
+            next_total, next_soft = add_card(total, soft, card)
+            if two_cards and next_total == 21:
+                dist[BLACKJACK] += p
+            elif next_total > 21:
+                dist[BUST] += p
+            elif next_total > 17 or (next_total == 17 and not (next_soft and hit_soft17)):
+                dist[next_total - DEALER_TOTALS[0]] += p
+            else:
+                counts[card] -= 1
+                dist += p * draw(next_total, next_soft, False)
+                counts[card] += 1
+        return dist
+
+    return draw(*add_card(0, False, up_card), True)
+
+
+class TestDealerCache(unittest.TestCase):
+
+    def test_remaining_counts(self):
+        deck = Deck(1)
+        counts = deck.remaining_counts()
+        self.assertEqual(counts.sum(), 51)
+        card = deck.deal_card()
+        counts_after = deck.remaining_counts()
+        self.assertEqual(counts[card.point] - 1, counts_after[card.point])
+
+    def test_exact_distribution(self):
+        # up card 10, only tens and a six left: 20 or 16 then bust on a ten
+        dist = exact_dealer_distribution(10, counts_of(p10=1, p6=1))
+        self.assertAlmostEqual(dist[DEALER_TOTALS.index(20)], 0.5)
+        self.assertAlmostEqual(dist[BUST], 0.5)
+        # ace up and a ten as the only card left is a blackjack
+        dist = exact_dealer_distribution(11, counts_of(p10=1))
+        self.assertEqual(dist[BLACKJACK], 1.0)
+        with self.assertRaises(ValueError):
+            exact_dealer_distribution(6, counts_of(p2=1))
+
+    def test_matches_drawing_one_by_one(self):
+        counts = counts_of(p2=2, p3=1, p4=1, p5=2, p6=1, p7=1, p8=1, p9=1, p10=4, p11=2)
+        for up_card in (2, 6, 10, 11):
+            for hit_soft17 in (False, True):
+                np.testing.assert_allclose(exact_dealer_distribution(up_card, counts, hit_soft17),
+                                           drawn_one_by_one(up_card, counts, hit_soft17), atol=1e-12)
+
+    def test_large_shoe_close_to_infinite_deck(self):
+        counts = Deck(8).remaining_counts() * 50
+        exact = exact_dealer_distribution(6, counts)
+        infinite = dealer_distribution(6, card_probabilities(dict(enumerate(counts))))
+        np.testing.assert_allclose(exact, infinite, atol=1e-3)
+        self.assertAlmostEqual(exact.sum(), 1.0)
+
+    def test_cache(self):
+        cache = DealerOutcomeCache()
+        counts = Deck(1).remaining_counts()
+        first = cache.get(6, counts)
+        second = cache.get(6, counts)
+        self.assertIs(first, second)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertIsNot(cache.get(6, counts, hit_soft17=True), first)
+        self.assertIsNot(cache.get(6), first)
+
+    def test_lru_eviction(self):
+        cache = DealerOutcomeCache(max_bytes=1)
+        counts = Deck(1).remaining_counts()
+        cache.get(5, counts)
+        cache.get(6, counts)
+        self.assertEqual(len(cache), 1)
+        cache.get(6, counts)
+        self.assertEqual(cache.hits, 1)
+
+    def test_dojo_run(self):
+        agent = Agent("test", bank=10000, rng=RandomStream(3))
+        dojo = Dojo(agent, report_every=0, progress_sink=lambda stats: None)
+        start = time.perf_counter()
+        dojo.test(2000)
+        plain = time.perf_counter() - start
+        start = time.perf_counter()
+        dojo.test(2000, expected_value=True)
+        expected_value = time.perf_counter() - start
+        cache = dojo.dealer_cache
+        # compositions do not repeat, the dealer's draws are enumerated once per up card
+        self.assertEqual(cache.hits + cache.misses, 2000)
+        self.assertLessEqual(cache.draw_misses, 10)
+        self.assertGreater(cache.draw_hits / (cache.draw_hits + cache.draw_misses), 0.99)
+        self.assertLess(expected_value, 20 * plain + 0.5)
+
+    def test_expected_hand_reward(self):
+        dist = np.zeros(len(DEALER_TOTALS) + 2)
+        dist[DEALER_TOTALS.index(18)] = 0.5
+        dist[BLACKJACK] = 0.5
+        self.assertAlmostEqual(expected_hand_reward(dist, 20, False), 0.0)
+        self.assertAlmostEqual(expected_hand_reward(dist, 20, False, doubled=True), 0.0)
+        self.assertAlmostEqual(expected_hand_reward(dist, 17, False), -1.0)
+        self.assertAlmostEqual(expected_hand_reward(dist, 21, True), 0.75)
+        self.assertAlmostEqual(expected_hand_reward(dist, 22, False, doubled=True), -2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
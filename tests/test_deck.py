@@ -0,0 +1,43 @@
+import unittest
+from collections import Counter
+from models.card import Card, Suit, Rank
+from models.deck import Deck
+
+
+class TestDeck(unittest.TestCase):
+
+    def test_deck_size(self):
+        # one card burned after shuffle
+        self.assertEqual(len(Deck(1)), 51)
+        self.assertEqual(len(Deck(8)), 8*52 - 1)
+
+    def test_deal_card(self):
+        deck = Deck(1)
+        card = deck.deal_card()
+        self.assertIsInstance(card, Card)
+        self.assertEqual(len(deck), 50)
+
+    def test_deal_all_cards(self):
+        deck = Deck(2)
+        dealt = Counter(deck.deal_card() for _ in range(len(deck)))
+        self.assertEqual(len(deck), 0)
+        self.assertEqual(sum(dealt.values()), 2*52 - 1)
+        # every card appears at most deck_num times
+        self.assertTrue(all(count <= 2 for count in dealt.values()))
+        with self.assertRaises(IndexError):
+            deck.deal_card()
+
+    def test_insert_card(self):
+        deck = Deck(1)
+        ten_clubs = Card(Suit.Clubs, Rank.TEN)
+        deck.deal_card()
+        deck.insert_card(0, ten_clubs)
+        deck.insert_card(2, ten_clubs)
+        self.assertEqual(len(deck), 52)
+        self.assertEqual(deck.deal_card(), ten_clubs)
+        deck.deal_card()
+        self.assertEqual(deck.deal_card(), ten_clubs)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from models.agent import Agent
+from models.dojo import Dojo, LearnMode
+from models.episode_log import EpisodeLogWriter, load_episode_log, LOG_TABLES, NO_DEALER_TOTAL
+from models.rng import RandomStream
+
+
+class TestEpisodeLog(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "log")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def run_dojo(self, episodes: int, batch_size: int, append: bool = False, counting: bool = False):
+        agent = Agent("test", bank=10000, rng=RandomStream(8), counting=counting)
+        with EpisodeLogWriter(self.path, batch_size=batch_size, append=append) as log:
+            dojo = Dojo(agent, report_every=0, progress_sink=lambda stats: None, episode_log=log,
+                        count_states=counting)
+            dojo.train(episodes, LearnMode.MCE, 0.1)
+        return dojo.progress
+
+    def test_training_log(self):
+        for counting in (False, True):
+            with self.subTest(counting=counting):
+                self.path = os.path.join(self.dir.name, f"log_{counting}")
+                self.check_training_log(counting)
+
+    def check_training_log(self, counting: bool):
+        progress = self.run_dojo(500, batch_size=64, counting=counting)
+        log = load_episode_log(self.path)
+        self.assertEqual(set(log), set(LOG_TABLES))
+        hands = log["hands"]
+        self.assertEqual(len(hands["reward"]), progress.hands)
+        self.assertAlmostEqual(float(hands["reward"].sum()), progress.reward_sum, places=4)
+        self.assertEqual(len(np.unique(hands["episode"])), 500)
+        self.assertTrue(np.all(hands["dealer_total"] >= 17))
+        # a doubled hand wins or loses twice the bet
+        doubled = hands["reward"][hands["doubled"]]
+        self.assertTrue(np.all(np.isin(doubled, [-2, 0, 2, 3])))
+        steps = log["steps"]
+        self.assertTrue(np.all(np.isin(steps["action"], [0, 1, 2, 3])))
+        self.assertTrue(np.all(steps["player_sum"] <= 21))
+        # every split episode has several hands, and only its hands went through splits
+        split_episodes = np.unique(hands["episode"][hands["episode_split"]])
+        self.assertGreater(len(split_episodes), 0)
+        self.assertTrue(np.all(np.bincount(hands["episode"])[split_episodes] > 1))
+        self.assertTrue(np.all(hands["split_depth"][~hands["episode_split"]] == 0))
+        self.assertTrue(np.all(hands["split_depth"][hands["episode_split"]] > 0))
+        if not counting:
+            self.assertTrue(np.all(steps["true_count"] == 0))
+            return
+        self.assertTrue(np.all(np.abs(steps["true_count"]) <= 5))
+        # rows only differing by the count are different states
+        rows = np.stack([steps[column] for column in ("player_sum", "dealer_card", "usible_ace",
+                                                      "splitable", "true_count")], axis=1)
+        self.assertGreater(len(np.unique(rows, axis=0)), len(np.unique(rows[:, :4], axis=0)))
+
+    def test_expected_value_log(self):
+        agent = Agent("test", bank=10000, rng=RandomStream(8))
+        with EpisodeLogWriter(self.path) as log:
+            Dojo(agent, report_every=0, progress_sink=lambda stats: None, episode_log=log).test(
+                100, expected_value=True)
+        # the dealer's hand is not played out
+        self.assertTrue(np.all(load_episode_log(self.path)["hands"]["dealer_total"] == NO_DEALER_TOTAL))
+
+    def test_append_and_read_modes(self):
+        self.run_dojo(100, batch_size=7)
+        first = load_episode_log(self.path, mmap=False)
+        self.run_dojo(100, batch_size=1000, append=True)
+        log = load_episode_log(self.path, mmap=False)
+        self.assertEqual(log["hands"]["episode"].max(), 199)
+        rows = len(first["hands"]["reward"])
+        np.testing.assert_array_equal(log["hands"]["reward"][:rows], first["hands"]["reward"])
+        mapped = load_episode_log(self.path, tables=["steps"])
+        self.assertEqual(list(mapped), ["steps"])
+        np.testing.assert_array_equal(mapped["steps"]["action"], log["steps"]["action"])
+
+    def test_unflushed_rows_not_loaded(self):
+        agent = Agent("test", bank=10000, rng=RandomStream(8))
+        log = EpisodeLogWriter(self.path, batch_size=100000)
+        Dojo(agent, report_every=0, progress_sink=lambda stats: None, episode_log=log).test(50)
+        self.assertEqual(len(load_episode_log(self.path)["hands"]["reward"]), 0)
+        log.close()
+        self.assertGreaterEqual(len(load_episode_log(self.path)["hands"]["reward"]), 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from collections import Counter
+from models.dojo import ExploringStarts, exploring_start_table
+from models.hand import PlayerHand
+from models.rng import RandomStream
+from models.utils import Action
+
+
+def start_key(start):
+    (first, second, dealer_card), action = start
+    hand = PlayerHand([first, second], 1)
+    return hand.points, hand.is_soft, hand.has_pair(), dealer_card.point, action
+
+
+class TestExploringStarts(unittest.TestCase):
+
+    def test_table_is_canonical(self):
+        table = exploring_start_table()
+        self.assertIs(table, exploring_start_table())
+        keys = [start_key(start) for start in table]
+        self.assertEqual(len(keys), len(set(keys)))
+        # split only on pairs, stand, hit and double everywhere
+        for points, soft, pair, dealer_point, action in keys:
+            if action == Action.Split:
+                self.assertTrue(pair)
+        self.assertEqual({key[3] for key in keys}, set(range(2, 12)))
+        self.assertIn((20, False, True, 10, Action.Split), keys)
+        self.assertIn((12, True, True, 11, Action.Split), keys)
+        self.assertIn((9, False, False, 6, Action.Double), keys)
+
+    def test_exact_length_and_cycles(self):
+        table = exploring_start_table()
+        self.assertEqual(len(list(ExploringStarts(RandomStream(1)))), len(table))
+        episodes = 2 * len(table) + 5
+        starts = list(ExploringStarts(RandomStream(1), episodes))
+        self.assertEqual(len(starts), episodes)
+        counts = Counter(starts[:2 * len(table)])
+        self.assertEqual(set(counts.values()), {2})
+        self.assertNotEqual(starts[:len(table)], starts[len(table):2 * len(table)])
+
+    def test_fixed_table_and_state(self):
+        table = [(start, Action.Hit) for start in range(5)]
+        self.assertEqual(list(ExploringStarts(RandomStream(1), table=table, shuffle=False)), table)
+
+        stream = ExploringStarts(RandomStream(2), 12)
+        head = [next(stream) for _ in range(4)]
+        state = stream.get_state()
+        rest = list(stream)
+        resumed = ExploringStarts(RandomStream(2), 12)
+        resumed.set_state(state)
+        self.assertEqual(list(resumed), rest)
+        self.assertEqual(len(head + rest), 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+import numpy as np
+import full_simulation as sim
+from full_simulation import Action, BlackjackEnv, MAX_HANDS, N_STATES, N_ACTIONS
+from models.rng import RandomStream
+
+
+class _FixedRanks(object):
+    """
+    Card source that always draws the same rank, for both engines.
+    """
+
+    def __init__(self, rank: int):
+        self.rank_index = rank
+
+    def rank(self) -> int:
+        return self.rank_index
+
+    def integers(self, low, high, size):
+        return np.full(size, self.rank_index)
+
+
+def _policy(state) -> Action:
+    """
+    Split 8s and aces, double on 10 and 11, stand on 17.
+    """
+    if state.splitable and (state.player_sum == 16 or (state.usible_ace and state.player_sum == 12)):
+        return Action.Split
+    if state.can_double and not state.usible_ace and state.player_sum in (10, 11):
+        return Action.Double
+    return Action.Stand if state.player_sum >= 17 else Action.Hit
+
+
+def _policy_table(policy) -> np.ndarray:
+    return np.array([policy(sim.index_state(index)).value for index in range(N_STATES)], dtype=np.int8)
+
+
+def _always(action: Action, state) -> Action:
+    if action == Action.Split and state.splitable:
+        return Action.Split
+    if action == Action.Double and state.can_double:
+        return Action.Double
+    return Action.Stand
+
+
+class TestFullSimulation(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = sim.rng
+
+    def tearDown(self):
+        sim.rng = self.rng
+
+    def play_serial(self, policy, rank: int) -> tuple[BlackjackEnv, list[float]]:
+        sim.rng = _FixedRanks(rank)
+        env = BlackjackEnv()
+        env.reset()
+        done = False
+        while not done:
+            hand = env.hands[env.current]
+            state = sim.BaseState(sim.sum_hand(hand), env.dealer_up, sim.usable_ace(hand),
+                                  env.can_split(), sim.can_double(hand))
+            _, _, done, _ = env.step(policy(state))
+        return env, env.finish()
+
+    def play_batch(self, policy, rank: int):
+        return sim.play_batch(_policy_table(policy), 1, 0.0, _FixedRanks(rank), learning=False)
+
+    def test_split_limit(self):
+        policy = lambda state: _always(Action.Split, state)
+        env, serial_rewards = self.play_serial(policy, 7)
+        self.assertEqual(len(env.hands), MAX_HANDS)
+
+        hand_ids, states, actions, rewards, played = self.play_batch(policy, 7)
+        self.assertEqual(int(played.sum()), MAX_HANDS)
+        self.assertEqual(int((actions == Action.Split.value).sum()), MAX_HANDS - 1)
+        # the dealer busts 8 + 8 + 8, every hand of 16 wins
+        self.assertEqual(rewards[played].tolist(), serial_rewards)
+        self.assertEqual(serial_rewards, [1.0] * MAX_HANDS)
+
+        # every split hand is played and learned from
+        sim.rng = _FixedRanks(7)
+        table = {sim.index_state(index): policy(sim.index_state(index)) for index in range(N_STATES)}
+        sub_episodes, episode_rewards = sim.generate_sub_episodes(BlackjackEnv(), table, learning=False)
+        self.assertEqual(len(sub_episodes), MAX_HANDS)
+        self.assertEqual(sum(len(episode) for episode in sub_episodes), len(actions))
+        self.assertEqual(episode_rewards, serial_rewards)
+
+    def test_double(self):
+        policy = lambda state: _always(Action.Double, state)
+        env, serial_rewards = self.play_serial(policy, 4)
+        self.assertEqual(env.doubled, [True])
+        self.assertEqual(env.hands[0][sim.N_CARDS], 3)
+
+        hand_ids, states, actions, rewards, played = self.play_batch(policy, 4)
+        self.assertEqual(actions.tolist(), [Action.Double.value])
+        # 15 against the dealer's 20, doubled
+        self.assertEqual(rewards[played].tolist(), serial_rewards)
+        self.assertEqual(serial_rewards, [-2.0])
+
+    def test_first_visit_returns(self):
+        table = _policy_table(lambda state: _always(Action.Split, state))
+        hand_ids, states, actions, rewards, played = sim.play_batch(
+            table, 20000, 0.3, np.random.default_rng(3))
+        returns_sum, returns_count = sim.first_visit_returns(hand_ids, states, actions, rewards)
+
+        expected_sum = np.zeros((N_STATES, N_ACTIONS))
+        expected_count = np.zeros((N_STATES, N_ACTIONS), dtype=np.int64)
+        visited = set()
+        for hand_id, state, action in zip(hand_ids.tolist(), states.tolist(), actions.tolist()):
+            if (hand_id, state, action) in visited:
+                continue
+            visited.add((hand_id, state, action))
+            expected_sum[state, action] += rewards.ravel()[hand_id]
+            expected_count[state, action] += 1
+        # some hands visit a (state, action) twice, e.g. by splitting the same pair again
+        self.assertLess(len(visited), len(hand_ids))
+        np.testing.assert_array_equal(returns_count, expected_count)
+        np.testing.assert_allclose(returns_sum, expected_sum)
+
+    def test_mean_reward_matches_serial(self):
+        policy = {sim.index_state(index): _policy(sim.index_state(index)) for index in range(N_STATES)}
+        sim.rng = RandomStream(11)
+        env = BlackjackEnv()
+        serial_rewards = []
+        serial_hands = 0
+        n_serial = 40000
+        for _ in range(n_serial):
+            _, rewards = sim.generate_sub_episodes(env, policy, learning=False)
+            serial_rewards.extend(rewards)
+            serial_hands += len(env.hands)
+
+        n_batch = 200000
+        _, _, _, rewards, played = sim.play_batch(_policy_table(_policy), n_batch, 0.0,
+                                                  np.random.default_rng(11), learning=False)
+        self.assertAlmostEqual(float(rewards[played].mean()), float(np.mean(serial_rewards)), delta=0.03)
+        self.assertAlmostEqual(float(played.sum()) / n_batch, serial_hands / n_serial, delta=0.01)
+        self.assertLessEqual(int(played.sum(axis=1).max()), MAX_HANDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
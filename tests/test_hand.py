@@ -21,8 +21,8 @@ class TestHand(unittest.TestCase):
         hand1 = Hand([self.ace_clubs])
         self.assertEqual(len(hand1.cards), 1)
         self.assertEqual(hand1.cards[0], self.ace_clubs)
-        # is_soft is determined by points calculation
-        self.assertFalse(hand1.is_soft)
+        # a single ace counts as 11
+        self.assertTrue(hand1.is_soft)
 
         hand2 = Hand([self.king_spades, self.queen_diamonds])
         self.assertEqual(len(hand2.cards), 2)
@@ -125,6 +125,19 @@ class TestHand(unittest.TestCase):
         self.assertEqual(hand2.points, 23)
         self.assertFalse(hand2.is_soft)  # All aces reduced, so not soft
 
+    def test_pop_and_insert_card(self):
+        hand = Hand([self.ace_clubs, self.five_hearts])
+        self.assertEqual(hand.points, 16)
+        ace = hand.pop_card(0)
+        self.assertIs(ace, self.ace_clubs)
+        self.assertEqual(hand.points, 5)
+        self.assertFalse(hand.is_soft)
+        hand.add_card(self.king_spades)
+        hand.insert_card(0, ace)
+        self.assertEqual(hand.cards[0], self.ace_clubs)
+        self.assertEqual(hand.points, 16)
+        self.assertFalse(hand.is_soft)
+
     def test_potential_points(self):
         # Test potential points with no aces
         hand1 = Hand([self.five_hearts, self.seven_diamonds])
@@ -0,0 +1,62 @@
+import unittest
+from models.metrics import ProgressReporter, RateLimitedSink
+
+
+class TestProgressReporter(unittest.TestCase):
+
+    def test_totals(self):
+        reports = []
+        progress = ProgressReporter("test", 4, every=2, sink=reports.append)
+        progress.update([1.0])
+        progress.update([-1.0, 1.5])
+        progress.update([0.0])
+        self.assertEqual(len(reports), 1)
+        self.assertEqual(reports[0].episodes, 2)
+
+        stats = progress.finish()
+        self.assertTrue(stats.final)
+        self.assertEqual(len(reports), 2)
+        self.assertEqual(stats.episodes, 3)
+        self.assertEqual(stats.hands, 4)
+        self.assertAlmostEqual(stats.avg_reward, 1.5 / 4)
+        self.assertAlmostEqual(stats.win_rate, 2 / 4)
+
+    def test_add(self):
+        reports = []
+        progress = ProgressReporter("test", every=10, sink=reports.append)
+        progress.add(25, 30, 3.0, 12)
+        self.assertEqual(len(reports), 1)
+        progress.add(5, 3, 0.0, 0)
+        self.assertEqual(len(reports), 2)
+        self.assertAlmostEqual(progress.avg_reward, 3.0 / 33)
+
+    def test_no_periodic_reports(self):
+        reports = []
+        progress = ProgressReporter("test", every=0, sink=reports.append)
+        for _ in range(100):
+            progress.update([1.0])
+        self.assertEqual(reports, [])
+        progress.finish()
+        self.assertEqual(len(reports), 1)
+
+    def test_states_discovered(self):
+        progress = ProgressReporter("test", every=0, sink=lambda stats: None,
+                                    states_discovered=lambda: 42)
+        self.assertEqual(progress.finish().states_discovered, 42)
+
+
+class TestRateLimitedSink(unittest.TestCase):
+
+    def test_rate_limit(self):
+        reports = []
+        sink = RateLimitedSink(reports.append, min_interval=3600)
+        progress = ProgressReporter("test", every=1, sink=sink)
+        for _ in range(10):
+            progress.update([1.0])
+        self.assertEqual(len(reports), 1)
+        progress.finish()
+        self.assertEqual(len(reports), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
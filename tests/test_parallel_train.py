@@ -0,0 +1,77 @@
+import unittest
+import numpy as np
+from models.agent import Agent
+from models.dojo import Dojo, LearnMode, ExploringStarts, _TrainJob, _train_worker
+from models.qtable import QTable
+from models.rng import RandomStream
+
+
+class TestParallelTrain(unittest.TestCase):
+
+    def make_dojo(self):
+        agent = Agent("parallel", bank=10000, rng=RandomStream(4))
+        return agent, Dojo(agent, report_every=0, progress_sink=lambda stats: None)
+
+    def expected_run(self, mode: LearnMode, episodes: int, epsilon: float, workers: int,
+                     sync_every: int, seed: int, starts: list):
+        """
+        The jobs of `Dojo.train` played one after another in this process, merged round by round.
+        :return: merged tables, the per-job results and the visits added by all jobs.
+        """
+        tables = QTable()
+        n_jobs = -(-episodes // sync_every)
+        seeds = [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(n_jobs)]
+        results = []
+        visits = np.zeros_like(tables.counts)
+        job_idx = 0
+        for round_start in range(0, episodes, workers * sync_every):
+            base = tables.copy()
+            round_results = []
+            for lo in range(round_start, min(round_start + workers * sync_every, episodes), sync_every):
+                hi = min(lo + sync_every, episodes)
+                job = _TrainJob(base, mode, hi - lo, starts[lo:hi] if starts else None, epsilon,
+                                seeds[job_idx], False)
+                round_results.append(_train_worker(job))
+                job_idx += 1
+            tables.merge(base, [result[0] for result in round_results])
+            for result in round_results:
+                visits += result[0].counts - base.counts
+            results.extend(round_results)
+        return tables, results, visits
+
+    def check_parallel(self, mode: LearnMode):
+        episodes, workers, sync_every, seed = 2500, 2, 400, 9
+        agent, dojo = self.make_dojo()
+        starts = None
+        if mode == LearnMode.MCES:
+            # the parent draws the starts from its own stream before splitting them over the jobs
+            rng = RandomStream(0)
+            rng.set_state(dojo.rng.get_state())
+            starts = list(ExploringStarts(rng, episodes))
+        dojo.train(episodes, mode, 0.1, workers=workers, sync_every=sync_every, seed=seed)
+        tables, results, visits = self.expected_run(mode, episodes, 0.1, workers, sync_every, seed, starts)
+
+        self.assertEqual(len(results), 7)
+        progress = dojo.progress
+        self.assertEqual(progress.episodes, episodes)
+        self.assertEqual(progress.episodes, sum(result[1] for result in results))
+        self.assertEqual(progress.hands, sum(result[2] for result in results))
+        self.assertEqual(progress.reward_sum, sum(result[3] for result in results))
+        self.assertEqual(progress.wins, sum(result[4] for result in results))
+
+        # every job's first visits end up in the merged counts
+        np.testing.assert_array_equal(agent.tables.counts, visits)
+        np.testing.assert_array_equal(agent.tables.counts, tables.counts)
+        np.testing.assert_allclose(agent.tables.values, tables.values)
+        np.testing.assert_array_equal(agent.tables.policy, tables.policy)
+        self.assertGreater(int(agent.tables.counts.sum()), episodes)
+
+    def test_parallel_epsilon_greedy(self):
+        self.check_parallel(LearnMode.MCE)
+
+    def test_parallel_exploring_starts(self):
+        self.check_parallel(LearnMode.MCES)
+
+
+if __name__ == "__main__":
+    unittest.main()
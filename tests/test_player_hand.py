@@ -80,6 +80,51 @@ class TestPlayerHand(unittest.TestCase):
         no_pair_hand3 = PlayerHand([self.king_spades], 10)
         self.assertFalse(no_pair_hand3.has_pair())
 
+    def test_reset(self):
+        hand = PlayerHand([self.king_spades, self.king_hearts], 50)
+        hand.add_bet(50)
+        hand.mark_as_doubled()
+        hand.is_initial = False
+        cards = hand.cards
+        hand.reset([self.ace_clubs, self.five_hearts], 10)
+        self.assertIs(hand.cards, cards)
+        self.assertEqual(hand.points, 16)
+        self.assertTrue(hand.is_soft)
+        self.assertEqual(hand.bet, 10)
+        self.assertFalse(hand.doubled)
+        self.assertTrue(hand.is_initial)
+        with self.assertRaises(ValueError):
+            hand.reset([])
+
+    def test_reset_with_own_cards(self):
+        hand = PlayerHand([self.ace_clubs, self.five_hearts], 10)
+        hand.mark_as_doubled()
+        hand.reset(hand.cards)
+        self.assertEqual(hand.cards, [self.ace_clubs, self.five_hearts])
+        self.assertEqual(hand.points, 16)
+        self.assertTrue(hand.is_soft)
+        self.assertFalse(hand.doubled)
+
+    def test_split_into_spare_hand(self):
+        pair_hand = PlayerHand([self.king_spades, self.king_hearts], 50)
+        spare = PlayerHand([self.two_spades, self.nine_clubs], 10)
+        new_hand = pair_hand.split(spare)
+        self.assertIs(new_hand, spare)
+        self.assertEqual(new_hand.cards, [self.king_hearts])
+        self.assertEqual(new_hand.bet, 50)
+        self.assertEqual(pair_hand.points, 10)
+
+    def test_split_depth(self):
+        pair_hand = PlayerHand([self.king_spades, self.king_hearts], 50)
+        self.assertEqual(pair_hand.split_depth, 0)
+        new_hand = pair_hand.split()
+        self.assertEqual((pair_hand.split_depth, new_hand.split_depth), (1, 1))
+        pair_hand.add_card(self.queen_diamonds)
+        resplit = pair_hand.split()
+        self.assertEqual((pair_hand.split_depth, resplit.split_depth, new_hand.split_depth), (2, 2, 1))
+        resplit.reset([self.two_spades, self.nine_clubs], 10)
+        self.assertEqual(resplit.split_depth, 0)
+
     def test_split(self):
         # Valid split
         original_bet = 50
@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+from models.agent import Agent
+from models.dojo import Dojo, LearnMode
+from models.policy import CompiledPolicy
+from models.qtable import QTable, state_index
+from models.rng import RandomStream
+from models.utils import Action, BaseState
+
+
+class TestCompiledPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.tables = QTable()
+        self.pair = BaseState(16, 10, False, True)
+        self.hard = BaseState(11, 6, False, False)
+
+    def test_learned_and_fallback_actions(self):
+        self.tables.policy[state_index(self.hard)] = Action.Double.value
+        policy = CompiledPolicy.compile(self.tables)
+        self.assertEqual(policy.action(self.hard, True), Action.Double)
+        # double not allowed any more, no Q values: rule
+        self.assertEqual(policy.action(self.hard, False), Action.Hit)
+        self.assertEqual(policy.action(BaseState(17, 10, False, False), True), Action.Stand)
+        self.assertEqual(policy.action(BaseState(17, 10, True, False), True), Action.Hit)
+        self.assertEqual(policy.action(BaseState(18, 10, True, False), True), Action.Stand)
+
+    def test_best_allowed_q_value(self):
+        index = state_index(self.hard)
+        self.tables.policy[index] = Action.Double.value
+        self.tables.values[index] = [0.1, 0.3, 0.0, 0.5, 0.0]
+        self.tables.seen[index, [Action.Stand.value, Action.Hit.value, Action.Double.value]] = True
+        policy = CompiledPolicy.compile(self.tables)
+        self.assertEqual(policy.action(self.hard, False), Action.Hit)
+
+    def test_fallback_policy(self):
+        fallback = {self.pair: Action.Split, self.hard: Action.Double}
+        policy = CompiledPolicy.compile(self.tables, fallback)
+        self.assertEqual(policy.action(self.pair, False), Action.Split)
+        self.assertEqual(policy.action(self.hard, True), Action.Double)
+        self.assertEqual(policy.action(self.hard, False), Action.Hit)
+        counting = CompiledPolicy.compile(QTable(counting=True), fallback)
+        self.assertEqual(counting.action(BaseState(16, 10, False, True, -2), True), Action.Split)
+
+    def test_read_only(self):
+        policy = CompiledPolicy.compile(self.tables)
+        with self.assertRaises(ValueError):
+            policy.actions[0, 0] = 1
+
+    def test_frozen_agent(self):
+        agent = Agent("test", bank=10000, rng=RandomStream(2))
+        dojo = Dojo(agent, report_every=0, progress_sink=lambda stats: None)
+        dojo.train(2000, LearnMode.MCE, 0.1)
+        agent.freeze()
+        self.assertTrue(agent.frozen)
+        tables = agent.get_tables()
+        dojo.test(2000)
+        np.testing.assert_array_equal(agent.tables.policy, tables.policy)
+        np.testing.assert_array_equal(agent.tables.action_space, tables.action_space)
+        with self.assertRaises(RuntimeError):
+            agent.learn_epsilon_greedy()
+        agent.unfreeze()
+        self.assertFalse(agent.frozen)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from models.agent import Agent
+from models.deck import Deck
+from models.dojo import Dojo, LearnMode
+from models.hand import Hand
+from models.profiling import Profiler
+from models.rng import RandomStream
+
+
+class TestProfiler(unittest.TestCase):
+
+    def make_dojo(self, profiler: Profiler = None, seed: int = 3):
+        agent = Agent("test", bank=10000, rng=RandomStream(seed))
+        return Dojo(agent, report_every=0, progress_sink=lambda stats: None, profiler=profiler)
+
+    def test_phases_and_counters(self):
+        profiler = Profiler()
+        dojo = self.make_dojo(profiler)
+        dojo.train(1000, LearnMode.MCE, 0.1)
+        for phase in ("refill_deck", "build_state", "agent_play", "dealer_hits", "reward", "learn"):
+            self.assertGreater(profiler.calls[phase], 0, phase)
+        self.assertEqual(profiler.calls["learn"], 1000)
+        self.assertEqual(profiler.calls["reward"], 1000)
+        self.assertEqual(profiler.calls["agent_play"], 1000)
+        data = profiler.to_dict()
+        # at least the four cards of every start
+        self.assertGreaterEqual(data["counters"]["cards_dealt"], 4000)
+        self.assertGreater(data["counters"]["deck_refills"], 0)
+        self.assertIn("doubles", data["counters"])
+        self.assertIn("busts", data["counters"])
+        self.assertIn("build_state", profiler.summary())
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "profile.json")
+            profiler.save_json(path)
+            with open(path) as f:
+                self.assertEqual(json.load(f)["counters"], data["counters"])
+
+    def test_no_patching(self):
+        points = Hand.__dict__["points"]
+        dojo = self.make_dojo(Profiler())
+        dojo.train(200, LearnMode.MCE, 0.1)
+        self.assertIs(Hand.__dict__["points"], points)
+        self.assertNotIn("deal_card", dojo.deck.__dict__)
+        self.assertFalse([name for name, value in vars(dojo).items() if callable(value) and name != "progress_sink"])
+        self.assertFalse([name for name, value in vars(dojo.agent).items() if callable(value)])
+
+    def test_seeded_refills(self):
+        profiler = Profiler()
+        agent = Agent("test", bank=10000, rng=RandomStream(3))
+        Dojo(agent, report_every=0, progress_sink=lambda stats: None, profiler=profiler, seed=5).test(300)
+        self.assertEqual(profiler.calls["refill_deck"], 300)
+        self.assertEqual(profiler.counters["deck_refills"], 300)
+
+    def test_same_results(self):
+        profiled = self.make_dojo(Profiler()).train(500, LearnMode.MCE, 0.1)
+        self.assertEqual(profiled, self.make_dojo().train(500, LearnMode.MCE, 0.1))
+        profiled = self.make_dojo(Profiler()).train(500, LearnMode.MCES)
+        self.assertEqual(profiled, self.make_dojo().train(500, LearnMode.MCES))
+
+    def test_cards_dealt(self):
+        deal_card = Deck.deal_card
+        for seed in (None, 5):
+            with self.subTest(seed=seed):
+                profiler = Profiler()
+                agent = Agent("test", bank=10000, rng=RandomStream(3))
+                dojo = Dojo(agent, report_every=0, progress_sink=lambda stats: None, profiler=profiler, seed=seed)
+                with mock.patch.object(Deck, "deal_card", autospec=True, side_effect=deal_card) as dealt:
+                    dojo.train(1000, LearnMode.MCE, 0.1)
+                    dojo.test(1000)
+                # every refill happened, the cards of every shoe are counted but not the discarded ones
+                self.assertGreater(profiler.counters["deck_refills"], 1)
+                self.assertEqual(profiler.counters["cards_dealt"], dealt.call_count)
+                profiler.reset()
+                self.assertFalse(profiler.counters)
+
+if __name__ == "__main__":
+    unittest.main()
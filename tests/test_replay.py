@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+from models.agent import Agent
+from models.deck import Deck, HI_LO
+from models.checkpoint import TrainingCheckpoint
+from models.dojo import Dojo, LearnMode
+from models.episode_log import EpisodeLogWriter, load_episode_log
+from models.rng import RandomStream, EpisodeStreams, episode_stream
+
+
+def _dojo(seed=7, **kwargs):
+    agent = Agent("replay", bank=10000, rng=RandomStream(1))
+    return Dojo(agent, report_every=0, progress_sink=lambda stats: None, seed=seed, **kwargs)
+
+
+class TestReplay(unittest.TestCase):
+
+    def test_episode_stream(self):
+        first, second = episode_stream(3, 10), episode_stream(3, 10)
+        self.assertEqual([first.random() for _ in range(5)], [second.random() for _ in range(5)])
+        self.assertNotEqual(episode_stream(3, 10).random(), episode_stream(3, 11).random())
+        self.assertNotEqual(episode_stream(3, 10).random(), episode_stream(4, 10).random())
+        # seeking back to an episode starts its stream over, whatever was drawn before
+        streams = EpisodeStreams(3)
+        expected = [streams.seek(2).random() for _ in range(100)]
+        streams.seek(5).rank()
+        self.assertEqual([streams.seek(2).random() for _ in range(100)], expected)
+        self.assertEqual(episode_stream(3, 2).random(), expected[0])
+
+    def test_reshuffle(self):
+        streams = EpisodeStreams(6)
+        deck = Deck(2, streams.seek(0))
+        expected = deck.get_state()
+        deck.discard(30)
+        deck.insert_card(0, deck.deal_card())
+        # the same stream state gives the same shoe, whatever happened to the old one
+        streams.seek(0)
+        deck.reshuffle()
+        self.assertEqual(deck.get_state(), expected)
+        streams.seek(0)
+        deck.deal_card()
+        deck.reshuffle()
+        self.assertEqual(deck.get_state(), expected)
+
+    def test_discard_counts(self):
+        deck = Deck(2, RandomStream(4))
+        codes = deck.get_state()["codes"]
+        deck.discard(40)
+        self.assertEqual(len(deck), len(codes) - 40)
+        self.assertEqual(deck.running_count, sum(HI_LO[code] for code in codes[:40]))
+        with self.assertRaises(IndexError):
+            deck.discard(len(deck) + 1)
+
+    def test_seeded_test_is_reproducible(self):
+        self.assertEqual(_dojo().test(300), _dojo().test(300))
+        self.assertNotEqual(_dojo().test(300), _dojo(seed=8).test(300))
+        # episodes only depend on their index, a run can be split anywhere
+        whole = _dojo()
+        whole.test(300)
+        head, tail = _dojo(), _dojo()
+        head.test(200)
+        tail.test(100, first_episode=200)
+        self.assertEqual(whole.progress.reward_sum, head.progress.reward_sum + tail.progress.reward_sum)
+        self.assertEqual(whole.progress.hands, head.progress.hands + tail.progress.hands)
+
+    def test_replay_matches_logged_episode(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "log")
+            with EpisodeLogWriter(path) as log:
+                dojo = _dojo(episode_log=log)
+                dojo.test(50)
+            hands = load_episode_log(path, mmap=False)["hands"]
+            replayed = _dojo()
+            for episode in (0, 17, 49):
+                replay = replayed.replay(episode)
+                self.assertEqual(replay.episode, episode)
+                logged = hands["reward"][hands["episode"] == episode].tolist()
+                self.assertEqual(replay.rewards, logged)
+                self.assertEqual(len(replay.hands), len(logged))
+                self.assertEqual(len(replay.histories), len(logged))
+            self.assertEqual(replayed.replay(17), replayed.replay(17))
+            # replays are not logged
+            self.assertEqual(load_episode_log(path)["hands"]["episode"].max(), 49)
+
+    def test_agent_stream_restored(self):
+        dojo = _dojo()
+        own = dojo.agent.rng
+        state = own.get_state()
+        dojo.test(50)
+        self.assertIs(dojo.agent.rng, own)
+        dojo.train(50, LearnMode.MCE, 0.1)
+        dojo.replay(3)
+        self.assertIs(dojo.agent.rng, own)
+        # episodes do not draw from the agent's own stream
+        self.assertEqual(own.get_state(), state)
+        dojo.train(50, LearnMode.MCES)
+        self.assertIs(dojo.agent.rng, own)
+
+    def test_worker_count_independent(self):
+        results = []
+        for workers in (1, 2, 3):
+            dojo = _dojo()
+            result = dojo.test(600, workers=workers)
+            results.append((result, dojo.progress.hands, dojo.progress.reward_sum,
+                            dojo.count_episodes.tolist()))
+        self.assertEqual(results[1], results[0])
+        self.assertEqual(results[2], results[0])
+
+    def test_seeded_training_resume(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "checkpoint.bin")
+            expected = _dojo().train(400, LearnMode.MCE, 0.1)
+            dojo = _dojo()
+            dojo.train(400, LearnMode.MCE, 0.1, checkpoint_path=path, checkpoint_every=100)
+            self.assertEqual(dojo.progress.avg_reward, expected[0])
+            # a checkpoint holds the agent's own stream, not an episode stream
+            self.assertEqual(TrainingCheckpoint.load(path).agent_rng_state["bit_generator"]["bit_generator"],
+                             "PCG64")
+
+    def test_replay_needs_seed(self):
+        with self.assertRaises(ValueError):
+            _dojo(seed=None).replay(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
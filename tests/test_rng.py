@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+from models import rng
+from models.rng import RandomStream
+from models.deck import Deck
+
+
+class TestRandomStream(unittest.TestCase):
+
+    def test_seeded_streams_repeat(self):
+        first = RandomStream(11)
+        second = RandomStream(11)
+        self.assertEqual([first.random() for _ in range(5000)],
+                         [second.random() for _ in range(5000)])
+        self.assertEqual([first.rank() for _ in range(100)],
+                         [second.rank() for _ in range(100)])
+
+    def test_ranges(self):
+        stream = RandomStream(0, block_size=64)
+        values = [stream.random() for _ in range(1000)]
+        self.assertTrue(all(0 <= value < 1 for value in values))
+        ranks = {stream.rank() for _ in range(1000)}
+        self.assertEqual(ranks, set(range(13)))
+        self.assertTrue(all(0 <= stream.below(3) < 3 for _ in range(100)))
+        self.assertIn(stream.choice(["a", "b"]), ("a", "b"))
+
+    def test_bit_generators(self):
+        philox = RandomStream(1, bit_generator="Philox")
+        self.assertIsInstance(philox.generator.bit_generator, np.random.Philox)
+        with self.assertRaises(ValueError):
+            RandomStream(1, bit_generator="MT")
+
+    def test_spawn_independent(self):
+        children = RandomStream(3).spawn(2)
+        self.assertNotEqual([children[0].random() for _ in range(10)],
+                            [children[1].random() for _ in range(10)])
+        again = RandomStream(3).spawn(2)
+        self.assertEqual([again[0].random() for _ in range(10)][0],
+                         RandomStream(3).spawn(2)[0].random())
+
+    def test_seeded_deck(self):
+        first = Deck(2, RandomStream(5))
+        second = Deck(2, RandomStream(5))
+        self.assertEqual([first.deal_card() for _ in range(50)],
+                         [second.deal_card() for _ in range(50)])
+
+    def test_default_stream(self):
+        rng.seed(9)
+        first = rng.default_stream().random()
+        rng.seed(9)
+        self.assertEqual(first, rng.default_stream().random())
+
+
+if __name__ == '__main__':
+    unittest.main()
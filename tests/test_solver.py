@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+from models.batch import compile_policy, evaluate
+from models.solver import (solve, card_probabilities, dealer_distribution, add_card,
+                           BUST, BLACKJACK, DEALER_TOTALS)
+from models.utils import Action, BaseState
+
+
+class TestSolver(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.result = solve()
+
+    def test_card_probabilities(self):
+        probs = card_probabilities()
+        self.assertAlmostEqual(probs.sum(), 1.0)
+        self.assertAlmostEqual(probs[10], 4 / 13)
+        self.assertAlmostEqual(probs[11], 1 / 13)
+        probs = card_probabilities({10: 1, 11: 1})
+        self.assertAlmostEqual(probs[10], 0.5)
+        self.assertEqual(probs[2], 0.0)
+
+    def test_add_card(self):
+        self.assertEqual(add_card(0, False, 11), (11, True))
+        self.assertEqual(add_card(11, True, 11), (12, True))
+        self.assertEqual(add_card(16, True, 10), (16, False))
+        self.assertEqual(add_card(10, False, 11), (21, True))
+
+    def test_dealer_distribution(self):
+        probs = card_probabilities()
+        for up_card in range(2, 12):
+            for hit_soft17 in (False, True):
+                dist = dealer_distribution(up_card, probs, hit_soft17)
+                self.assertAlmostEqual(dist.sum(), 1.0)
+        self.assertEqual(dealer_distribution(6, probs)[BLACKJACK], 0.0)
+        self.assertAlmostEqual(dealer_distribution(11, probs)[BLACKJACK], 4 / 13)
+        self.assertAlmostEqual(dealer_distribution(6, probs)[BUST], 0.4232, places=4)
+        # hitting soft 17 never ends on 17 from a lone ace
+        s17 = dealer_distribution(11, probs)
+        h17 = dealer_distribution(11, probs, hit_soft17=True)
+        self.assertLess(h17[DEALER_TOTALS.index(17)], s17[DEALER_TOTALS.index(17)])
+
+    def test_policy(self):
+        policy = self.result.policy
+        self.assertEqual(policy[BaseState(20, 10, False, False)], Action.Stand)
+        self.assertEqual(policy[BaseState(16, 10, False, False)], Action.Hit)
+        self.assertEqual(policy[BaseState(11, 6, False, False)], Action.Double)
+        self.assertEqual(policy[BaseState(16, 8, False, True)], Action.Split)
+        self.assertEqual(policy[BaseState(12, 7, True, True)], Action.Split)
+        self.assertNotEqual(policy[BaseState(20, 6, False, True)], Action.Split)
+        for state, action in policy.items():
+            self.assertEqual(action, max(self.result.Q[state], key=self.result.Q[state].get))
+
+    def test_ev_matches_simulation(self):
+        episodes = 400000
+        total, _, _ = evaluate(compile_policy(self.result.policy), episodes,
+                               rng=np.random.default_rng(0))
+        self.assertAlmostEqual(total / episodes, self.result.ev, delta=0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import pickle
+import unittest
+import warnings
+import numpy as np
+from models.qtable import state_index, index_state, N_COUNT_STATES
+from models.utils import BaseState, intern_state
+
+
+class TestState(unittest.TestCase):
+
+    def test_intern_returns_same_instance(self):
+        state = intern_state(16, 10, False, False)
+        self.assertIs(state, intern_state(16, 10, False, False))
+        self.assertIs(state, intern_state(np.int64(16), np.int8(10), np.bool_(False), 0))
+        self.assertIsNot(state, intern_state(16, 10, False, False, true_count=2))
+
+    def test_intern_small_numpy_ints(self):
+        # int8 arithmetic would overflow if the id was computed before converting
+        for index in range(0, N_COUNT_STATES):
+            index_state(index)
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            state = intern_state(np.int8(20), np.int8(10), np.bool_(False), np.bool_(False), np.int8(-3))
+        self.assertEqual(state, BaseState(20, 10, False, False, -3))
+        self.assertEqual((state.player_sum, state.dealer_card, state.true_count), (20, 10, -3))
+
+    def test_out_of_range(self):
+        for fields in ((32, 2, False, False, 0), (-1, 2, False, False, 0), (5, 12, False, False, 0),
+                       (5, 2, False, False, 6), (5, 2, False, False, -6), (5, 2, False, False, 11)):
+            with self.assertRaises(ValueError):
+                BaseState(*fields)
+            with self.assertRaises(ValueError):
+                intern_state(*fields)
+
+    def test_interned_fields_are_python_types(self):
+        state = intern_state(np.int64(13), np.int8(5), np.bool_(True), np.bool_(False), np.int64(-1))
+        self.assertIs(type(state.player_sum), int)
+        self.assertIs(type(state.usible_ace), bool)
+        self.assertIs(type(state.true_count), int)
+
+    def test_equal_to_constructed_state(self):
+        state = BaseState(20, 11, True, True, -3)
+        interned = intern_state(20, 11, True, True, -3)
+        self.assertEqual(state, interned)
+        self.assertEqual(hash(state), hash(interned))
+        self.assertEqual({state: 1}[interned], 1)
+        self.assertNotEqual(state, BaseState(20, 11, True, False, -3))
+
+    def test_id_is_table_row(self):
+        ids = set()
+        for index in range(0, N_COUNT_STATES, 7):
+            state = index_state(index)
+            self.assertEqual(state.id, index)
+            self.assertEqual(state_index(state), index)
+            self.assertEqual(BaseState(state.player_sum, state.dealer_card, state.usible_ace,
+                                       state.splitable, state.true_count).id, index)
+            ids.add(hash(state))
+        self.assertEqual(len(ids), len(range(0, N_COUNT_STATES, 7)))
+
+    def test_pickle(self):
+        state = intern_state(12, 2, False, True, 4)
+        copy = pickle.loads(pickle.dumps(state))
+        self.assertEqual(copy, state)
+        self.assertEqual(copy.id, state.id)
+        self.assertNotIn("id", repr(state))
+
+
+if __name__ == "__main__":
+    unittest.main()
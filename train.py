@@ -1,18 +1,25 @@
 from models.agent import Agent
 from models.dojo import Dojo, LearnMode
 from models.utils import Action, BaseState
+import argparse
 import logging
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run from its checkpoint")
+    args = parser.parse_args()
 
     learn_mode = LearnMode.MCES
 
     agent = Agent(name=f"{learn_mode.name}1", bank=10000)
     dojo = Dojo(agent)
 
-    # Train the agent with exploring starts
-    dojo.train(episodes=100000, start_mode=learn_mode, epsilon=0.03)
+    # Train the agent with exploring starts, with --resume an interrupted run continues from its checkpoint
+    dojo.train(episodes=100000, start_mode=learn_mode, epsilon=0.03,
+               checkpoint_path=f"results/agent_{agent.name}/checkpoint.bin", resume=args.resume)
     print("Training completed.")
+    agent.save()
 
+    agent.freeze()
     avg_rwd, avg_win_rate = dojo.test(episodes=10000)
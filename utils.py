@@ -1,9 +1,11 @@
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 
 def plot_policy_sns(policy):
+    # 绘图库只在需要画图时导入，训练脚本启动时不加载
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     player_sum = np.arange(4, 22)  # 玩家点数，建议包括低点数
     dealer_show = np.arange(1, 11) # 庄家明牌 1~10
     actions = {0: 'Stand', 1: 'Hit', 2: 'Double', 3: 'Split'}